@@ -0,0 +1,229 @@
+"""
+Task Management System - Async Storage Module
+Asyncio facade over TaskStorage with group-committed writes
+Collaborative implementation between Agent 1 (writer) and Agent 2 (reviewer/tester)
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from task import Task
+from task_events import ChangeEvent
+from storage import TaskSnapshot, TaskStorage
+
+
+# Passed straight through: lazy cursors, subscription management and the
+# change feed's own async iterator
+READ_METHODS = (
+    "iter_tasks", "iter_search", "iter_filter", "change_sequence",
+    "subscribe", "unsubscribe", "watch",
+)
+
+
+class AsyncTaskStorage:
+    """Awaitable TaskStorage for asyncio applications
+
+    Mutations are applied in memory straight away, so reads on the loop
+    see them immediately. Reads are awaitable like everything else but
+    are answered from memory on the loop thread, without the executor,
+    so they never wait behind a flush. Awaiting
+    a mutation waits until it is durable: encoding and disk I/O run on a
+    writer thread, and every mutation made while a flush is in flight is
+    covered by the single flush that follows it, so many concurrent
+    awaiters share one write and fsync.
+
+    The underlying storage uses the ``manual`` durability policy and
+    defaults to journal mode, where a flush appends just the changed
+    tasks without holding the storage lock. In snapshot mode every flush
+    rewrites the whole file under the lock, which briefly blocks
+    mutations on the loop. Not meant for ``shared=True``, whose file
+    locks would block the loop.
+    """
+
+    def __init__(self, storage_file: str = "tasks.json", **options):
+        options.setdefault("journal", True)
+        options["durability"] = "manual"
+        self.storage = TaskStorage(storage_file, **options)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="AsyncTaskStorage")
+        self._next_flush: Optional[asyncio.Future] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    def __getattr__(self, name: str) -> Any:
+        if name in READ_METHODS:
+            return getattr(self.storage, name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    async def __aenter__(self) -> 'AsyncTaskStorage':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def get_task(self, task_id: str, include_archived: bool = False) -> Optional[Task]:
+        """Get a task by ID"""
+        return self.storage.get_task(task_id, include_archived)
+
+    async def get_all_tasks(self) -> List[Task]:
+        """Get all tasks"""
+        return self.storage.get_all_tasks()
+
+    async def search_tasks(self, query: str, include_archived: bool = False) -> List[Task]:
+        """Search tasks by title or description"""
+        return self.storage.search_tasks(query, include_archived)
+
+    async def fuzzy_search(self, query: str, threshold: float = 0.3,
+                           limit: Optional[int] = None) -> List[Tuple[Task, float]]:
+        """Tasks whose title or a tag resembles query, most similar first"""
+        return self.storage.fuzzy_search(query, threshold, limit)
+
+    async def filter_tasks(self, **filters) -> List[Task]:
+        """Filter tasks by various criteria"""
+        return self.storage.filter_tasks(**filters)
+
+    async def query(self, order_by: Union[None, str, Iterable[str]] = None,
+                    limit: Optional[int] = None, offset: int = 0, **filters) -> List[Task]:
+        """Find tasks matching predicates, sorted and paginated"""
+        return self.storage.query(order_by, limit, offset, **filters)
+
+    async def aggregate(self, group_by: Union[None, str, Iterable[str]] = None,
+                        metrics: Union[str, Iterable[str]] = ("count",),
+                        where: Optional[Dict[str, Any]] = None,
+                        now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Compute metrics per group of tasks"""
+        return self.storage.aggregate(group_by, metrics, where, now)
+
+    async def get_overdue_tasks(self, now: Optional[datetime] = None) -> List[Task]:
+        """Get all overdue tasks, earliest due date first"""
+        return self.storage.get_overdue_tasks(now)
+
+    async def get_tasks_due_within(self, hours: float,
+                                   now: Optional[datetime] = None) -> List[Task]:
+        """Get open tasks due in the next ``hours`` hours, earliest first"""
+        return self.storage.get_tasks_due_within(hours, now)
+
+    async def get_tasks_by_status(self, status: str) -> List[Task]:
+        """Get tasks by status"""
+        return self.storage.get_tasks_by_status(status)
+
+    async def get_tasks_by_priority(self, priority: str) -> List[Task]:
+        """Get tasks by priority"""
+        return self.storage.get_tasks_by_priority(priority)
+
+    async def get_statistics(self) -> Dict[str, Any]:
+        """Get task statistics"""
+        return self.storage.get_statistics()
+
+    async def get_statistics_snapshot(self) -> Dict[str, Any]:
+        """Get a point-in-time copy of the maintained counters"""
+        return self.storage.get_statistics_snapshot()
+
+    async def changes_since(self, sequence: int) -> List[ChangeEvent]:
+        """Changes published after a sequence number, oldest first"""
+        return self.storage.changes_since(sequence)
+
+    async def snapshot(self) -> TaskSnapshot:
+        """Consistent, immutable view of all tasks as they are now"""
+        return self.storage.snapshot()
+
+    async def create_task(self, task: Task) -> bool:
+        """Create a new task; True once it is durable"""
+        return self.storage.create_task(task) and await self._durable()
+
+    async def update_task(self, task_id: str, updates: Dict[str, Any],
+                          expected_version: Optional[int] = None) -> bool:
+        """Update an existing task; True once the change is durable"""
+        return (self.storage.update_task(task_id, updates, expected_version)
+                and await self._durable())
+
+    async def delete_task(self, task_id: str, expected_version: Optional[int] = None) -> bool:
+        """Delete a task; True once the deletion is durable"""
+        return self.storage.delete_task(task_id, expected_version) and await self._durable()
+
+    async def create_many(self, tasks: Iterable[Task]) -> int:
+        """Create several tasks; returns how many were new once durable"""
+        created = self.storage.create_many(tasks)
+        return created if await self._durable() else 0
+
+    async def update_many(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Apply updates keyed by task id; returns how many applied once durable"""
+        updated = self.storage.update_many(updates)
+        return updated if await self._durable() else 0
+
+    async def delete_many(self, task_ids: Iterable[str]) -> int:
+        """Delete several tasks; returns how many existed once durable"""
+        deleted = self.storage.delete_many(task_ids)
+        return deleted if await self._durable() else 0
+
+    async def archive_tasks(self, older_than_days: Optional[float] = None,
+                            now: Optional[datetime] = None) -> int:
+        """Move old closed tasks to the cold store off the loop; returns how many once durable"""
+        archived = await self._run(self.storage.archive_tasks, older_than_days, now)
+        return archived if await self._durable() else 0
+
+    async def restore_task(self, task_id: str) -> bool:
+        """Move an archived task back; True once it is durable"""
+        return await self._run(self.storage.restore_task, task_id) and await self._durable()
+
+    async def flush(self) -> bool:
+        """Wait until every mutation made so far is durable"""
+        return await self._durable()
+
+    async def save_tasks(self) -> bool:
+        """Write a full snapshot off the loop"""
+        return await self._run(self.storage.save_tasks)
+
+    async def backup_tasks(self, backup_file: str, parent: Optional[str] = None,
+                           compression: Optional[str] = None) -> bool:
+        """Create a backup of all tasks off the loop"""
+        return await self._run(self.storage.backup_tasks, backup_file, parent, compression)
+
+    async def restore_backup(self, backup_file: str) -> bool:
+        """Replace every task with the contents of a backup off the loop"""
+        return await self._run(self.storage.restore_backup, backup_file)
+
+    async def export_json(self, export_file: str) -> bool:
+        """Export all tasks as JSON off the loop"""
+        return await self._run(self.storage.export_json, export_file)
+
+    async def export_ndjson(self, export_file: str) -> bool:
+        """Export all tasks as NDJSON off the loop"""
+        return await self._run(self.storage.export_ndjson, export_file)
+
+    async def import_ndjson(self, import_file: str, batch_size: int = 1000) -> int:
+        """Create the tasks of an NDJSON file off the loop; returns how many once durable"""
+        created = await self._run(self.storage.import_ndjson, import_file, batch_size)
+        return created if await self._durable() else 0
+
+    async def close(self) -> bool:
+        """Flush what is left, release the files and stop the writer thread"""
+        await self._durable()
+        ok = await self._run(self.storage.close)
+        self._executor.shutdown()
+        return ok
+
+    async def _run(self, function, *args) -> Any:
+        """Run a blocking storage call on the writer thread"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def _durable(self) -> bool:
+        """Wait for a flush that starts after this call
+
+        Callers arriving while a flush is running all join the next one.
+        """
+        if self._next_flush is None:
+            self._next_flush = asyncio.get_running_loop().create_future()
+            if self._flusher is None or self._flusher.done():
+                self._flusher = asyncio.ensure_future(self._flush_loop())
+        return await asyncio.shield(self._next_flush)
+
+    async def _flush_loop(self) -> None:
+        """Run flushes back to back while anyone is waiting for one"""
+        while self._next_flush is not None:
+            waiters, self._next_flush = self._next_flush, None
+            try:
+                ok = await self._run(self.storage.flush)
+            except Exception as e:
+                waiters.set_exception(e)
+            else:
+                waiters.set_result(ok)
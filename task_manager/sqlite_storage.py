@@ -0,0 +1,317 @@
+"""
+Task Management System - SQLite Storage Module
+Drop-in alternative to TaskStorage backed by an embedded SQLite database
+Collaborative implementation between Agent 1 (writer) and Agent 2 (reviewer/tester)
+"""
+
+import json
+import sqlite3
+import threading
+from typing import List, Optional, Dict, Any
+from datetime import datetime
+from task import Task, VersionConflictError
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id     TEXT PRIMARY KEY,
+    title       TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    status      TEXT NOT NULL,
+    priority    TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    updated_at  TEXT NOT NULL,
+    due_date    TEXT,
+    assigned_to TEXT,
+    tags        TEXT NOT NULL DEFAULT '[]',
+    tag_text    TEXT NOT NULL DEFAULT '',
+    version     INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS task_tags (
+    task_id TEXT NOT NULL REFERENCES tasks(task_id) ON DELETE CASCADE,
+    tag     TEXT NOT NULL,
+    PRIMARY KEY (task_id, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_assigned_to ON tasks(assigned_to);
+CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date);
+CREATE INDEX IF NOT EXISTS idx_task_tags_tag ON task_tags(tag);
+"""
+
+COLUMNS = ("task_id", "title", "description", "status", "priority",
+           "created_at", "updated_at", "due_date", "assigned_to", "tags", "version")
+
+INSERT_TASK = (
+    "INSERT INTO tasks (task_id, title, description, status, priority, created_at, "
+    "updated_at, due_date, assigned_to, tags, tag_text, version) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+# Compare-and-swap on the version read before the update
+UPDATE_TASK = (
+    "UPDATE tasks SET title = ?, description = ?, status = ?, priority = ?, "
+    "created_at = ?, updated_at = ?, due_date = ?, assigned_to = ?, tags = ?, "
+    "tag_text = ?, version = ? WHERE task_id = ? AND version = ?"
+)
+SELECT_TASKS = f"SELECT {', '.join(COLUMNS)} FROM tasks"
+
+
+class SqliteTaskStorage:
+    """Handles task persistence using an SQLite database
+
+    Offers the same public surface as TaskStorage, but tasks live in
+    indexed rows instead of an in-memory dict, so startup does not parse
+    the whole dataset and memory stays bounded. The database runs in WAL
+    mode, which lets other processes read while this one writes.
+    """
+
+    def __init__(self, storage_file: str = "tasks.db"):
+        self.storage_file = storage_file
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(storage_file, check_same_thread=False)
+        # SQLite's own lower() only folds ASCII; match TaskStorage's str.lower
+        self._conn.create_function("py_lower", 1, str.lower, deterministic=True)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if "version" not in columns:
+            # Databases created before tasks carried a version
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def load_tasks(self) -> bool:
+        """Rows are read on demand; report whether the database holds tasks"""
+        return self._count() > 0
+
+    def save_tasks(self) -> bool:
+        """Every mutation is committed immediately; kept for API compatibility"""
+        try:
+            with self._lock:
+                self._conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error saving tasks: {e}")
+            return False
+
+    def create_task(self, task: Task) -> bool:
+        """Create a new task"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(INSERT_TASK, self._task_row(task))
+                self._write_tags(task)
+            return True
+        except sqlite3.IntegrityError:
+            return False  # Task already exists
+        except Exception as e:
+            print(f"Error saving tasks: {e}")
+            return False
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        """Get a task by ID"""
+        tasks = self._select("WHERE task_id = ?", (task_id,))
+        return tasks[0] if tasks else None
+
+    def get_all_tasks(self) -> List[Task]:
+        """Get all tasks"""
+        return self._select("ORDER BY rowid")
+
+    def update_task(self, task_id: str, updates: Dict[str, Any],
+                    expected_version: Optional[int] = None) -> bool:
+        """Update an existing task
+
+        With ``expected_version`` the update only applies if the task is
+        still at that version, and raises VersionConflictError otherwise.
+        Without it, an update that races another writer is re-applied on
+        top of the other writer's changes.
+        """
+        while True:
+            task = self.get_task(task_id)
+            if task is None:
+                return False
+            read_version = task.version
+            if expected_version is not None and read_version != expected_version:
+                raise VersionConflictError(task_id, expected_version, read_version)
+
+            # Update allowed fields
+            allowed_fields = ['title', 'description', 'status', 'priority',
+                             'due_date', 'assigned_to', 'tags']
+
+            for field, value in updates.items():
+                if field in allowed_fields:
+                    if field == 'due_date' and value:
+                        # Handle datetime conversion
+                        if isinstance(value, str):
+                            value = datetime.fromisoformat(value)
+
+                    setattr(task, field, value)
+
+            task.updated_at = datetime.now()
+            task.version = read_version + 1
+
+            try:
+                with self._lock, self._conn:
+                    row = self._task_row(task)
+                    cursor = self._conn.execute(UPDATE_TASK, row[1:] + (task_id, read_version))
+                    if cursor.rowcount and 'tags' in updates:
+                        self._conn.execute("DELETE FROM task_tags WHERE task_id = ?", (task_id,))
+                        self._write_tags(task)
+            except Exception as e:
+                print(f"Error saving tasks: {e}")
+                return False
+            if cursor.rowcount:
+                return True
+
+    def delete_task(self, task_id: str, expected_version: Optional[int] = None) -> bool:
+        """Delete a task, only if still at ``expected_version`` when given"""
+        try:
+            with self._lock, self._conn:
+                if expected_version is None:
+                    cursor = self._conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+                else:
+                    cursor = self._conn.execute(
+                        "DELETE FROM tasks WHERE task_id = ? AND version = ?",
+                        (task_id, expected_version))
+        except Exception as e:
+            print(f"Error saving tasks: {e}")
+            return False
+        if cursor.rowcount == 0 and expected_version is not None:
+            task = self.get_task(task_id)
+            if task is not None:
+                raise VersionConflictError(task_id, expected_version, task.version)
+        return cursor.rowcount > 0
+
+    def search_tasks(self, query: str) -> List[Task]:
+        """Search tasks by title or description"""
+        query = query.lower()
+        return self._select(
+            "WHERE instr(py_lower(title), ?) OR instr(py_lower(description), ?) "
+            "OR instr(py_lower(tag_text), ?) ORDER BY rowid",
+            (query, query, query)
+        )
+
+    def filter_tasks(self, **filters) -> List[Task]:
+        """Filter tasks by various criteria"""
+        clauses = []
+        params: List[Any] = []
+
+        for field, value in filters.items():
+            if field not in COLUMNS:
+                continue
+
+            if field == 'tags':
+                # Check if any of the filter tags are in task tags
+                tags = value if isinstance(value, list) else [value]
+                placeholders = ", ".join("?" for _ in tags)
+                clauses.append(
+                    "EXISTS (SELECT 1 FROM task_tags WHERE task_tags.task_id = tasks.task_id "
+                    f"AND tag IN ({placeholders}))"
+                )
+                params.extend(tags)
+            elif value is None:
+                clauses.append(f"{field} IS NULL")
+            else:
+                clauses.append(f"{field} = ?")
+                params.append(value.isoformat() if isinstance(value, datetime) else value)
+
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        return self._select(where + "ORDER BY rowid", tuple(params))
+
+    def get_overdue_tasks(self) -> List[Task]:
+        """Get all overdue tasks"""
+        return self._select(
+            "WHERE due_date IS NOT NULL AND due_date < ? AND status != 'completed' "
+            "ORDER BY rowid",
+            (datetime.now().isoformat(),)
+        )
+
+    def get_tasks_by_status(self, status: str) -> List[Task]:
+        """Get tasks by status"""
+        return self._select("WHERE status = ? ORDER BY rowid", (status,))
+
+    def get_tasks_by_priority(self, priority: str) -> List[Task]:
+        """Get tasks by priority"""
+        return self._select("WHERE priority = ? ORDER BY rowid", (priority,))
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get task statistics"""
+        total_tasks = self._count()
+
+        if total_tasks == 0:
+            return {"total_tasks": 0}
+
+        with self._lock:
+            status_counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM tasks GROUP BY status"))
+            priority_counts = dict(self._conn.execute(
+                "SELECT priority, COUNT(*) FROM tasks GROUP BY priority"))
+            overdue_count = self._conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE due_date IS NOT NULL AND due_date < ? "
+                "AND status != 'completed'", (datetime.now().isoformat(),)).fetchone()[0]
+
+        return {
+            "total_tasks": total_tasks,
+            "by_status": status_counts,
+            "by_priority": priority_counts,
+            "overdue_tasks": overdue_count
+        }
+
+    def backup_tasks(self, backup_file: str) -> bool:
+        """Create a backup of all tasks in the TaskStorage JSON format"""
+        try:
+            tasks = self.get_all_tasks()
+            data = {
+                "backup_created": datetime.now().isoformat(),
+                "original_file": self.storage_file,
+                "task_count": len(tasks),
+                "tasks": [task.to_dict() for task in tasks]
+            }
+
+            with open(backup_file, 'w') as f:
+                json.dump(data, f, indent=2)
+
+            return True
+        except Exception as e:
+            print(f"Error creating backup: {e}")
+            return False
+
+    def _count(self) -> int:
+        """Number of stored tasks"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def _select(self, clause: str = "", params: tuple = ()) -> List[Task]:
+        """Run a SELECT over the tasks table and hydrate the rows"""
+        with self._lock:
+            rows = self._conn.execute(f"{SELECT_TASKS} {clause}", params).fetchall()
+        return [self._row_task(row) for row in rows]
+
+    def _write_tags(self, task: Task) -> None:
+        """Insert the tag rows of a task"""
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO task_tags (task_id, tag) VALUES (?, ?)",
+            [(task.task_id, tag) for tag in task.tags]
+        )
+
+    @staticmethod
+    def _task_row(task: Task) -> tuple:
+        """Convert a task to the column values of the tasks table"""
+        data = task.to_dict()
+        return (
+            data["task_id"], data["title"], data["description"], data["status"],
+            data["priority"], data["created_at"], data["updated_at"], data["due_date"],
+            data["assigned_to"], json.dumps(data["tags"]), ' '.join(task.tags), data["version"]
+        )
+
+    @staticmethod
+    def _row_task(row: tuple) -> Task:
+        """Convert a tasks table row back to a task"""
+        data = dict(zip(COLUMNS, row))
+        data["tags"] = json.loads(data["tags"])
+        return Task.from_dict(data)
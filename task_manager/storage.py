@@ -4,197 +4,1962 @@ Handles persistence and retrieval of tasks
 Collaborative implementation between Agent 1 (writer) and Agent 2 (reviewer/tester)
 """
 
+import asyncio
+import atexit
+import fcntl
+import functools
+import glob
+import heapq
 import json
 import os
-from typing import List, Optional, Dict, Any
-from datetime import datetime
-from task import Task
+import threading
+import zlib
+from collections.abc import Mapping, MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import count, groupby, islice
+from typing import List, Optional, Dict, Any, AsyncIterator, Callable, Iterable, Iterator, Set, Tuple, Union
+from datetime import datetime, timedelta
+from task import Task, VersionConflictError
+from task_aggregate import Aggregation, parse_group_by, parse_metrics
+from task_archive import ARCHIVED_STATUSES, ColdStore
+from task_backup import BackupCodec, is_compressed_backup, load_backup_chain, read_backup_header, task_digest
+from task_codec import JsonCodec, NdjsonCodec, detect_codec, get_codec
+from task_columns import TaskColumns
+from task_events import ChangeEvent, ChangeFeed, diff_tasks
+from task_index import (DueDateIndex, FieldIndex, StorageOrder, TextIndex, TrigramIndex, INDEXED_FIELDS,
+                        text_similarity, tokenize, trigrams)
+from task_query import RANGE_OPERATORS, Predicate, order_key, parse_filters, parse_order
+
+
+# always: write and fsync before returning; interval: acknowledge in memory
+# and let a background thread write and fsync; manual: acknowledge in memory
+# and write and fsync on flush(); os-buffered: write before returning but
+# leave flushing to the OS
+DURABILITY_POLICIES = ("always", "interval", "manual", "os-buffered")
+_DEFERRED_POLICIES = ("interval", "manual")
+
+# Above this many value combinations, grouped counts scan the tasks
+# rather than intersecting index postings
+_MAX_INDEX_GROUPS = 4096
+
+
+class CommitError(Exception):
+    """Raised when a transaction could not be written; it was rolled back"""
+    
+    def __init__(self):
+        super().__init__("Could not write the transaction; its changes were rolled back")
+
+
+def _create_temp_file(path: str) -> Tuple[int, str]:
+    """Create a fresh temporary file next to path and open it for writing
+
+    Unlike mkstemp, which creates files as 0600, the file gets the
+    permissions a plain open() would give it under the current umask.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    while True:
+        temp_path = os.path.join(directory, f".{name}.{os.urandom(6).hex()}.tmp")
+        try:
+            return os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), temp_path
+        except FileExistsError:
+            continue
+
+
+def _file_fingerprint(path: str) -> Optional[Tuple[int, int, int]]:
+    """Inode, mtime and size of a file, or None if it does not exist
+    
+    Snapshots are renamed into place, so every save changes the inode
+    even when mtime and size happen to match.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def iter_tasks_from_file(path: str, chunk_size: int = 1 << 16) -> Iterator[Task]:
+    """Stream the tasks of a snapshot or backup file one record at a time"""
+    with open(path, 'rb') as f:
+        yield from detect_codec(f).load(f, chunk_size)
+
+
+class LazyTaskMap(MutableMapping):
+    """Task mapping that reads records from a snapshot on first access
+    
+    Holds only the offset and length of each unread record. The snapshot
+    stays open, so its records remain readable even after a later save
+    has renamed a new snapshot over the path. Readers do not hold the
+    storage lock, so records are read with pread and swapped in under
+    a lock of the map's own.
+    """
+    
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._lock = threading.Lock()
+        try:
+            self._codec = detect_codec(self._file)
+            self._entries: Dict[str, Union[Task, Tuple[int, int]]] = {}
+            for task_id, offset, length in self._codec.scan(self._file):
+                self._entries[task_id] = (offset, length)
+        except BaseException:
+            self._file.close()
+            raise
+        self._unread = len(self._entries)
+        if not self._unread:
+            self.close()
+    
+    def __getitem__(self, task_id: str) -> Task:
+        entry = self._entries[task_id]
+        if not isinstance(entry, tuple):
+            return entry
+        with self._lock:
+            entry = self._entries[task_id]
+            if isinstance(entry, tuple):
+                offset, length = entry
+                data = os.pread(self._file.fileno(), length, offset)
+                entry = self._entries[task_id] = self._codec.decode(data)
+                self._forget_unread()
+            return entry
+    
+    def __setitem__(self, task_id: str, task: Task) -> None:
+        with self._lock:
+            if isinstance(self._entries.get(task_id), tuple):
+                self._forget_unread()
+            self._entries[task_id] = task
+    
+    def __delitem__(self, task_id: str) -> None:
+        with self._lock:
+            if isinstance(self._entries.pop(task_id), tuple):
+                self._forget_unread()
+    
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._entries
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def reorder(self, task_ids: Iterable[str]) -> None:
+        """Put the entries in the given order, reading nothing"""
+        with self._lock:
+            self._entries = {task_id: self._entries[task_id] for task_id in task_ids}
+    
+    @property
+    def unread_count(self) -> int:
+        """Number of records not read from the snapshot yet"""
+        return self._unread
+    
+    def _forget_unread(self) -> None:
+        """Account for one record leaving the snapshot"""
+        self._unread -= 1
+        if not self._unread:
+            self.close()
+    
+    def close(self) -> None:
+        """Release the snapshot file"""
+        self._file.close()
+
+
+class TaskCursor:
+    """Lazy iterator over TaskStorage results in storage order
+    
+    Tasks are fetched in batches, so memory stays constant however many
+    match and abandoning the iterator early costs nothing. ``token`` marks
+    the last task handed out; passing it back as ``after`` to the same
+    ``iter_*`` call resumes right behind it, even in another process.
+    Changes made between batches are seen by later batches.
+    """
+    
+    def __init__(self, fetch: Callable[[int], List[Tuple[int, Task]]], position: int,
+                 token: Optional[str] = None):
+        self._fetch = fetch
+        self._position = position
+        self._batch: Iterator[Tuple[int, Task]] = iter(())
+        self._done = False
+        self.token = token
+    
+    def __iter__(self) -> 'TaskCursor':
+        return self
+    
+    def __next__(self) -> Task:
+        entry = next(self._batch, None)
+        if entry is None:
+            if self._done:
+                raise StopIteration
+            batch = self._fetch(self._position)
+            if not batch:
+                self._done = True
+                raise StopIteration
+            self._batch = iter(batch)
+            entry = next(self._batch)
+        
+        self._position, task = entry
+        self.token = f"{self._position}:{task.task_id}"
+        return task
+
+
+class TaskSnapshot(Mapping):
+    """Immutable point-in-time view of a TaskStorage, keyed by task id
+    
+    Holds private copies of the tasks that writers never touch, so any
+    number of threads can read it without locking while the storage
+    keeps changing. The copies must not be modified. ``generation`` is
+    the storage generation the view reflects.
+    """
+    
+    def __init__(self, tasks: Dict[str, Task], generation: int):
+        self._tasks = tasks
+        self.generation = generation
+    
+    def __getitem__(self, task_id: str) -> Task:
+        return self._tasks[task_id]
+    
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._tasks
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tasks)
+    
+    def __len__(self) -> int:
+        return len(self._tasks)
+    
+    def query(self, order_by: Union[None, str, Iterable[str]] = None, **filters) -> List[Task]:
+        """Tasks matching ``field__op=value`` filters, as TaskStorage.query
+        
+        Scans the view, since it carries no indexes.
+        """
+        predicates = parse_filters(filters)
+        results = [task for task in self._tasks.values()
+                   if all(predicate.matches(task) for predicate in predicates)]
+        order = parse_order(order_by)
+        if order:
+            results.sort(key=order_key(order))
+        return results
+
+
+def _frozen_copy(task: Task) -> Task:
+    """Copy of a task that shares nothing mutable with it"""
+    copy = object.__new__(Task)
+    copy.__dict__ = {**vars(task), "tags": list(task.tags)}
+    return copy
+
+
+def _synchronized(method):
+    """Run a TaskStorage method while holding the storage lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _coherent(exclusive: bool = False):
+    """Run a TaskStorage method on up-to-date tasks when the files are shared
+    
+    Holds the inter-process lock, shared for reads and exclusive for
+    writes, and first picks up what other processes wrote. A no-op unless
+    the storage was opened with ``shared=True``.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self._lock_fd is None:
+                return method(self, *args, **kwargs)
+            with self._coherent_access(exclusive):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
 
 
 class TaskStorage:
-    """Handles task persistence using JSON file storage"""
+    """Handles task persistence using JSON file storage
+    
+    With ``journal=True`` each mutation is appended as a single record to
+    ``<storage_file>.log`` instead of rewriting the whole snapshot. The log
+    is replayed on load and compacted into the snapshot every
+    ``compact_threshold`` records. A log left behind by journal mode is
+    replayed whatever the setting; without ``journal`` it is compacted
+    and removed straight after loading.
+    
+    Hash indexes on status, priority, assigned_to and tags, and a due-date
+    ordered index of open tasks, are kept in step with every create,
+    update and delete, so tasks must be modified through
+    ``update_task`` rather than by mutating the returned objects.
+    
+    Every update bumps ``Task.version``. Passing the version a caller read
+    as ``expected_version`` to ``update_task`` or ``delete_task`` turns a
+    read-modify-write into a compare-and-swap that raises
+    VersionConflictError if someone else got there first.
     
-    def __init__(self, storage_file: str = "tasks.json"):
+    With ``full_text_index=True`` an inverted token index over titles,
+    descriptions and tags answers ``search_tasks``: every query term must
+    match the start of a word, instead of the default substring scan.
+    With ``trigram_index=True`` a character trigram index over titles and
+    tag names narrows down the candidates of ``fuzzy_search``.
+    
+    Inside ``with storage.transaction():`` persistence is deferred until
+    the block exits, producing one write for the whole batch; an exception
+    restores the in-memory state from before the block.
+    
+    ``durability`` selects one of DURABILITY_POLICIES. Under ``interval``
+    mutations are only acknowledged in memory; a background thread writes
+    them every ``flush_interval`` seconds, or sooner once
+    ``flush_threshold`` tasks are dirty. ``manual`` is the same without the
+    thread, leaving writes to the owner. ``flush()`` writes immediately and
+    ``close()`` (also run at exit) stops the thread after a final flush.
+    Snapshots and backups are written to a temporary file and renamed into
+    place, so a crash never leaves a half-written file behind; unless the
+    policy is ``os-buffered`` the file and its directory are fsynced too.
+    
+    The snapshot is parsed one record at a time. With ``lazy_load=True``
+    only an id -> file offset map is built at startup; each ``Task`` is
+    read when first accessed and the indexes are built by the first query
+    that needs them.
+    
+    ``codec`` names the on-disk format for snapshots and backups: ``json``
+    or the compact ``binary`` format. Files are recognised on load whatever
+    the setting, and ``export_json`` always writes JSON.
+    
+    With ``shared=True`` several processes may open the same file. Every
+    operation holds an ``fcntl`` lock on ``<storage_file>.lock`` (shared
+    for reads, exclusive for writes) and first checks whether another
+    process changed the files: an unchanged snapshot costs one ``stat``,
+    records appended to the journal are replayed on their own, and only a
+    rewritten snapshot forces a full reload. All processes must use the
+    same storage options.
+    
+    Every create, update and delete is published on an ordered change
+    feed as a ChangeEvent with an increasing sequence number, once it is
+    applied in memory (for a transaction, when it commits; rolled back
+    changes are never published). ``subscribe`` registers a callback,
+    ``watch`` is the async iterator form, and both can resume from a
+    sequence number still within the last ``change_history`` events.
+    
+    ``snapshot()`` returns a TaskSnapshot that reader threads can scan
+    without locking. Consecutive snapshots share the copies of unchanged
+    tasks: only tasks changed since the previous snapshot are copied again.
+    
+    ``archive_tasks`` moves completed and cancelled tasks not updated for
+    some days into ``<storage_file>.archive.gz``, a compressed append-only
+    cold store, and deletes them from the working set (published as
+    deletes). With ``archive_after_days`` this runs on open. Archived tasks
+    are only read on demand: ``get_task`` and ``search_tasks`` consult the
+    cold store when passed ``include_archived=True``, and ``restore_task``
+    brings one back.
+    """
+    
+    def __init__(self, storage_file: str = "tasks.json", journal: bool = False,
+                 compact_threshold: int = 1000, full_text_index: bool = False,
+                 durability: str = "os-buffered", flush_interval: float = 0.05,
+                 flush_threshold: int = 1000, lazy_load: bool = False,
+                 codec: str = "json", shared: bool = False, change_history: int = 1000,
+                 archive_after_days: Optional[float] = None, trigram_index: bool = False):
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(f"Durability must be one of: {list(DURABILITY_POLICIES)}")
+            
         self.storage_file = storage_file
+        self.journal = journal
+        self.journal_file = storage_file + ".log"
+        self.compact_threshold = compact_threshold
+        self.lazy_load = lazy_load
+        self.codec = get_codec(codec)
         self.tasks: Dict[str, Task] = {}
+        self._journal_records = 0
+        self.generation = 0
+        self._indexes = {field: FieldIndex() for field in INDEXED_FIELDS + ("tags",)}
+        self._index_keys: Dict[str, tuple] = {}
+        self._indexes_stale = False
+        self._text_index = TextIndex() if full_text_index else None
+        self._trigram_index = TrigramIndex() if trigram_index else None
+        self._due_index = DueDateIndex()
+        self._positions: Dict[str, int] = {}
+        self._position_counter = count()
+        self._order = StorageOrder()
+        self._undo_stack: List[Dict[str, Optional[tuple]]] = []
+        self._event_stack: List[List[tuple]] = []
+        self._feed = ChangeFeed(change_history)
+        self._pending_ids: Dict[str, None] = {}
+        self._columns: Optional[Tuple[int, TaskColumns]] = None
+        self._snapshot: Optional[TaskSnapshot] = None
+        self._changed_since_snapshot: Dict[str, None] = {}
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._lock = threading.RLock()
+        self._flush_wakeup = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+        self._io_lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._lock_mode: Optional[int] = None
+        self._seen_snapshot: Any = None
+        self._journal_offset = 0
+        self.archive = ColdStore(storage_file + ".archive.gz")
+        self.archive_after_days = archive_after_days
+        if shared:
+            self._lock_fd = os.open(storage_file + ".lock", os.O_RDWR | os.O_CREAT, 0o666)
         self.load_tasks()
+        if not journal and self._journal_records:
+            self.save_tasks()
+        if archive_after_days is not None:
+            self.archive_tasks()
+        
+        if durability == "interval":
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name=f"TaskStorage-flush-{storage_file}", daemon=True)
+            self._flush_thread.start()
+        if durability in _DEFERRED_POLICIES:
+            atexit.register(self.close)
     
+    @_synchronized
     def load_tasks(self) -> bool:
-        """Load tasks from storage file"""
-        try:
-            if os.path.exists(self.storage_file):
-                with open(self.storage_file, 'r') as f:
-                    data = json.load(f)
-                    
-                self.tasks = {}
-                for task_data in data.get("tasks", []):
-                    task = Task.from_dict(task_data)
-                    self.tasks[task.task_id] = task
-                    
-                return True
+        """Load tasks from storage file, replaying any journal"""
+        try:
+            loaded = False
+            if isinstance(self.tasks, LazyTaskMap):
+                self.tasks.close()
+            self.tasks = {}
+            
+            with self._file_lock():
+                self._seen_snapshot = self._snapshot_fingerprint()
+                if self._load_snapshot():
+                    loaded = True
+                
+                if self._replay_journal():
+                    loaded = True
+                
+            self._rebuild_indexes()
+            if self._feed.sequence or self._feed.subscribed:
+                self._emit("reset")
+            return loaded
         except Exception as e:
             print(f"Error loading tasks: {e}")
             self.tasks = {}
+            self._rebuild_indexes()
             
         return False
     
-    def save_tasks(self) -> bool:
-        """Save tasks to storage file"""
+    def _load_snapshot(self) -> bool:
+        """Fill the task dict from the snapshot file, if there is one"""
+        if not os.path.exists(self.storage_file):
+            return False
+            
+        if self.lazy_load:
+            self.tasks = LazyTaskMap(self.storage_file)
+        else:
+            for task in iter_tasks_from_file(self.storage_file):
+                self.tasks[task.task_id] = task
+        return True
+    
+    def _snapshot_fingerprint(self) -> Any:
+        """Value that changes whenever the snapshot is rewritten"""
+        return _file_fingerprint(self.storage_file)
+    
+    @contextmanager
+    def _file_lock(self, exclusive: bool = False) -> Iterator[bool]:
+        """Hold the inter-process lock, re-entrantly
+        
+        Yields True when this call took the lock (or upgraded it to
+        exclusive), i.e. when other processes may have written since the
+        files were last looked at.
+        """
+        if self._lock_fd is None:
+            yield False
+            return
+            
+        with self._lock:
+            mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            outermost = self._lock_mode is None
+            acquired = outermost or (exclusive and self._lock_mode == fcntl.LOCK_SH)
+            if acquired:
+                fcntl.flock(self._lock_fd, mode)
+                self._lock_mode = mode
+            try:
+                yield acquired
+            finally:
+                if outermost:
+                    self._lock_mode = None
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+    
+    @contextmanager
+    def _coherent_access(self, exclusive: bool = False) -> Iterator[None]:
+        """Hold the inter-process lock with the tasks brought up to date"""
+        with self._file_lock(exclusive) as acquired:
+            if acquired:
+                self._refresh()
+            yield
+    
+    def _refresh(self) -> None:
+        """Pick up changes other processes made to the files"""
+        if self._snapshot_fingerprint() != self._seen_snapshot:
+            self._reload()
+        elif self.journal:
+            fingerprint = _file_fingerprint(self.journal_file)
+            size = fingerprint[2] if fingerprint else 0
+            if size < self._journal_offset:
+                # Compacted by another process without a new snapshot landing
+                self._reload()
+            elif size > self._journal_offset:
+                self._replay_journal_tail()
+    
+    def _reload(self) -> None:
+        """Reload everything from disk, keeping mutations not written yet"""
+        pending = {task_id: self.tasks.get(task_id) for task_id in self._pending_ids}
+        self.load_tasks()
+        for task_id, task in pending.items():
+            # Already published when they were made; the reset covers them
+            self._apply_change(task_id, task, emit=False)
+    
+    def _apply_change(self, task_id: str, task: Optional[Task], emit: bool = True) -> None:
+        """Install the latest state of a task, or remove it when task is None"""
+        exists = task_id in self.tasks
+        if exists:
+            self._unindex_task(task_id)
+        if emit:
+            previous = self.tasks[task_id] if exists else None
+            if task is None:
+                if exists:
+                    self._emit("delete", task_id, previous)
+            elif previous is None:
+                self._emit("create", task_id, task)
+            else:
+                self._emit("update", task_id, task, diff_tasks(previous, task))
+            
+        if task is None:
+            if exists:
+                del self.tasks[task_id]
+                self._unplace(task_id)
+        else:
+            self.tasks[task_id] = task
+            if not exists:
+                self._place(task_id, next(self._position_counter))
+            self._index_task(task)
+        self._mark_dirty(task_id)
+        self.generation += 1
+    
+    def _rebuild_indexes(self) -> None:
+        """Rebuild all secondary indexes from the task dict
+        
+        With lazy loading the indexes are only marked stale, so that
+        startup does not read every task.
+        """
+        self.generation += 1
+        # Everything may have changed; the next snapshot starts afresh
+        self._snapshot = None
+        self._changed_since_snapshot = {}
+        for index in self._indexes.values():
+            index.clear()
+        if self._text_index is not None:
+            self._text_index.clear()
+        if self._trigram_index is not None:
+            self._trigram_index.clear()
+        self._due_index.clear()
+        self._index_keys = {}
+        self._positions = {task_id: next(self._position_counter) for task_id in self.tasks}
+        self._order.load([(position, task_id) for task_id, position in self._positions.items()])
+        
+        self._indexes_stale = True
+        if not self.lazy_load:
+            self._ensure_indexes()
+    
+    def _ensure_indexes(self) -> None:
+        """Build stale indexes before a query relies on them"""
+        if not self._indexes_stale:
+            return
+        with self._lock:
+            if self._indexes_stale:
+                self._indexes_stale = False
+                due_entries: List[Tuple[datetime, str]] = []
+                for task in self.tasks.values():
+                    self._index_task(task, due_entries)
+                self._due_index.load(due_entries)
+    
+    def _index_task(self, task: Task, due_entries: Optional[list] = None) -> None:
+        """Add a task to the secondary indexes
+        
+        During a bulk build due-date entries are collected in due_entries
+        and sorted once instead of being inserted one by one.
+        """
+        if self._indexes_stale:
+            return
+            
+        keys = tuple(getattr(task, field) for field in INDEXED_FIELDS)
+        tags = tuple(task.tags)
+        due_date = task.due_date if task.status != "completed" else None
+        
+        for field, value in zip(INDEXED_FIELDS, keys):
+            self._indexes[field].add(value, task.task_id)
+        self._indexes["tags"].add_many(tags, task.task_id)
+        if due_date is not None:
+            if due_entries is not None:
+                due_entries.append((due_date, task.task_id))
+            else:
+                self._due_index.add(due_date, task.task_id)
+        self._index_keys[task.task_id] = keys + (tags, due_date)
+        
+        if self._text_index is not None:
+            self._text_index.add(task.task_id, (task.title, task.description) + tags)
+        if self._trigram_index is not None:
+            self._trigram_index.add(task.task_id, (task.title,) + tags)
+    
+    def _unindex_task(self, task_id: str) -> None:
+        """Remove a task from the secondary indexes
+        
+        Uses the values recorded at indexing time, so it is correct even
+        if the task object was modified in the meantime.
+        """
+        keys = self._index_keys.pop(task_id, None)
+        if keys is None:
+            return
+            
+        *values, tags, due_date = keys
+        for field, value in zip(INDEXED_FIELDS, values):
+            self._indexes[field].discard(value, task_id)
+        self._indexes["tags"].discard_many(tags, task_id)
+        if due_date is not None:
+            self._due_index.discard(due_date, task_id)
+        
+        if self._text_index is not None:
+            self._text_index.remove(task_id)
+        if self._trigram_index is not None:
+            self._trigram_index.remove(task_id)
+    
+    def _place(self, task_id: str, position: int) -> None:
+        """Give a task its position in storage order"""
+        previous = self._positions.get(task_id)
+        if previous == position:
+            return
+        if previous is not None:
+            self._order.discard(previous)
+        self._positions[task_id] = position
+        self._order.add(position, task_id)
+    
+    def _unplace(self, task_id: str) -> None:
+        """Take a removed task out of storage order"""
+        self._order.discard(self._positions.pop(task_id))
+    
+    def _tasks_for_ids(self, task_ids: Set[str]) -> List[Task]:
+        """Resolve task ids in storage order"""
+        ordered = sorted(task_ids, key=self._positions.__getitem__)
+        return [self.tasks[task_id] for task_id in ordered]
+    
+    def _replay_journal(self) -> bool:
+        """Apply journal records on top of the loaded snapshot"""
+        self._journal_records = 0
+        self._journal_offset = 0
+        if not os.path.exists(self.journal_file):
+            return False
+            
+        for record in self._read_journal():
+            if record["op"] == "delete":
+                self.tasks.pop(record["task_id"], None)
+            else:
+                task = Task.from_dict(record["task"])
+                self.tasks[task.task_id] = task
+            self._journal_records += 1
+        return True
+    
+    def _replay_journal_tail(self) -> None:
+        """Apply the records other processes appended since the last read
+        
+        Tasks with mutations of our own still waiting to be written keep
+        their in-memory state, as that is written last.
+        """
+        for record in self._read_journal(self._journal_offset):
+            self._journal_records += 1
+            if record["task_id"] in self._pending_ids:
+                continue
+            task = None if record["op"] == "delete" else Task.from_dict(record["task"])
+            self._apply_change(record["task_id"], task)
+    
+    def _read_journal(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """Yield the journal records found after byte offset start"""
+        valid_bytes = start
+        torn = False
+        with open(self.journal_file, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise json.JSONDecodeError("missing record terminator", "", 0)
+                    record = json.loads(line) if line.strip() else None
+                except json.JSONDecodeError:
+                    torn = True
+                    break
+                valid_bytes += len(line)
+                if record is not None:
+                    yield record
+        self._journal_offset = valid_bytes
+        
+        if torn:
+            # A record torn by an interrupted append; drop it so that new
+            # records are not glued onto the fragment
+            print(f"Discarding truncated journal record at byte {valid_bytes}")
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(valid_bytes)
+    
+    def _append_journal(self, records: List[Dict[str, Any]]) -> bool:
+        """Append mutation records to the journal in a single write"""
+        with self._io_lock:
+            if not self._write_journal(records):
+                return False
+        return self._journal_written(len(records))
+    
+    def _write_journal(self, records: List[Dict[str, Any]]) -> bool:
+        """Encode records and write them at the end of the journal"""
         try:
-            data = {
-                "saved_at": datetime.now().isoformat(),
-                "task_count": len(self.tasks),
-                "tasks": [task.to_dict() for task in self.tasks.values()]
-            }
+            with open(self.journal_file, 'a') as f:
+                f.write("".join(json.dumps(record) + "\n" for record in records))
+                self._sync_file(f)
+                if self._lock_fd is not None:
+                    f.flush()
+                    self._journal_offset = os.fstat(f.fileno()).st_size
+        except Exception as e:
+            print(f"Error writing journal: {e}")
+            return False
+        return True
+    
+    def _journal_written(self, record_count: int) -> bool:
+        """Account for appended records, compacting once there are enough"""
+        self._journal_records += record_count
+        if self._journal_records >= self.compact_threshold:
+            return self.save_tasks()
+        return True
+    
+    def _journal_record(self, task_id: str, op: Optional[str] = None) -> Dict[str, Any]:
+        """Build the journal record for the current state of a task"""
+        task = self.tasks.get(task_id)
+        if task is None:
+            return {"op": "delete", "task_id": task_id}
+        return {"op": op or "update", "task_id": task_id, "task": task.to_dict()}
+    
+    def _persist(self, op: str, task_id: str) -> bool:
+        """Persist a single mutation according to the storage mode"""
+        if self._undo_stack or self.durability in _DEFERRED_POLICIES:
+            # Deferred until the transaction commits or the next flush
+            self._pending_ids[task_id] = None
+            if not self._undo_stack and len(self._pending_ids) >= self.flush_threshold:
+                self._flush_wakeup.set()
+            return True
+            
+        if not self.journal:
+            return self.save_tasks()
+        return self._append_journal([self._journal_record(task_id, op)])
+    
+    def _remember(self, task_id: str) -> None:
+        """Record the pre-transaction state of a task before mutating it"""
+        if not self._undo_stack:
+            return
+            
+        undo = self._undo_stack[-1]
+        if task_id in undo:
+            return
+        task = self.tasks.get(task_id)
+        if task is None:
+            undo[task_id] = None
+        else:
+            state = dict(vars(task), tags=list(task.tags))
+            undo[task_id] = (task, state, self._positions[task_id])
+    
+    @contextmanager
+    def transaction(self) -> Iterator['TaskStorage']:
+        """Group mutations into one durable write, rolling back on error
+        
+        Transactions nest: an inner block that raises is rolled back on
+        its own, while persistence waits for the outermost block. If that
+        write fails the whole transaction is rolled back and CommitError
+        is raised.
+        """
+        with self._lock, self._coherent_access(exclusive=True):
+            self._undo_stack.append({})
+            self._event_stack.append([])
+            try:
+                yield self
+            except BaseException:
+                self._event_stack.pop()
+                self._rollback(self._undo_stack.pop())
+                raise
+                
+            undo = self._undo_stack.pop()
+            events = self._event_stack.pop()
+            if self._undo_stack:
+                for task_id, entry in undo.items():
+                    self._undo_stack[-1].setdefault(task_id, entry)
+                self._event_stack[-1].extend(events)
+                return
+                
+            if self.durability in _DEFERRED_POLICIES:
+                if len(self._pending_ids) >= self.flush_threshold:
+                    self._flush_wakeup.set()
+            elif not self._commit():
+                self._rollback(undo)
+                raise CommitError()
+            for event in events:
+                self._feed.publish(*event)
+    
+    def _emit(self, op: str, task_id: Optional[str] = None, task: Optional[Task] = None,
+              changes: Optional[Dict[str, Tuple[Any, Any]]] = None) -> None:
+        """Publish a change, or hold it until the open transaction commits"""
+        if self._event_stack:
+            self._event_stack[-1].append((op, task_id, task, changes))
+        else:
+            self._feed.publish(op, task_id, task, changes)
+    
+    @property
+    def change_sequence(self) -> int:
+        """Sequence number of the latest published change"""
+        return self._feed.sequence
+    
+    def subscribe(self, callback: Callable[[ChangeEvent], None],
+                  since: Optional[int] = None) -> int:
+        """Call callback with every future change; returns a subscription id
+        
+        With ``since`` the changes after that sequence number are replayed
+        first, with no gap before live events. Callbacks run on the thread
+        making the change while the storage lock is held, so they must be
+        quick and must not wait on other threads using the storage.
+        """
+        with self._lock:
+            return self._feed.subscribe(callback, since)
+    
+    def unsubscribe(self, subscription: int) -> bool:
+        """Stop delivering changes to a subscription"""
+        with self._lock:
+            return self._feed.unsubscribe(subscription)
+    
+    def changes_since(self, sequence: int) -> List[ChangeEvent]:
+        """Changes published after a sequence number, oldest first
+        
+        Raises ValueError once they have left the bounded history.
+        """
+        with self._lock:
+            return self._feed.since(sequence)
+    
+    async def watch(self, since: Optional[int] = None) -> AsyncIterator[ChangeEvent]:
+        """Async iterator over changes, optionally resuming after ``since``"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        subscription = self.subscribe(
+            lambda event: loop.call_soon_threadsafe(queue.put_nowait, event), since)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(subscription)
+    
+    def _commit(self) -> bool:
+        """Persist every task touched since the last commit"""
+        task_ids, self._pending_ids = list(self._pending_ids), {}
+        if not task_ids:
+            return True
+            
+        if not self.journal or len(task_ids) >= self.compact_threshold:
+            # A batch this large would trigger compaction right after
+            # being journaled, so write the snapshot straight away
+            ok = self.save_tasks()
+        else:
+            records = [self._journal_record(task_id) for task_id in task_ids]
+            with self._io_lock:
+                ok = self._write_journal(records)
+            if ok:
+                # Once journaled the records are durable; a failed
+                # compaction leaves them there to be retried later
+                self._journal_written(len(records))
+            
+        if not ok:
+            # Keep them dirty so that the next flush retries
+            self._pending_ids = {**dict.fromkeys(task_ids), **self._pending_ids}
+        return ok
+    
+    def flush(self) -> bool:
+        """Write all acknowledged but unwritten mutations now
+        
+        Mutations inside an open transaction wait for it to finish. In
+        journal mode the records are encoded and appended without holding
+        the storage lock, so other threads can keep mutating meanwhile;
+        either way flush returns only once earlier writes have landed.
+        """
+        if not self.journal or self._lock_fd is not None:
+            return self._flush_locked()
+            
+        with self._lock:
+            if self._undo_stack:
+                return True
+            task_ids, self._pending_ids = list(self._pending_ids), {}
+            records = [self._journal_record(task_id) for task_id in task_ids]
+            # Taken before the storage lock is released, so that appends
+            # land in the order their records were built
+            self._io_lock.acquire()
+        try:
+            ok = not records or self._write_journal(records)
+        finally:
+            self._io_lock.release()
+            
+        with self._lock:
+            if not ok:
+                # Keep them dirty so that the next flush retries
+                self._pending_ids = {**dict.fromkeys(task_ids), **self._pending_ids}
+                return False
+            return self._journal_written(len(records))
+    
+    @_synchronized
+    @_coherent(exclusive=True)
+    def _flush_locked(self) -> bool:
+        """Flush while holding the storage lock throughout"""
+        if self._undo_stack:
+            return True
+        return self._commit()
+    
+    def _flush_loop(self) -> None:
+        """Background writer for the interval durability policy"""
+        while self._flush_thread is not None:
+            self._flush_wakeup.wait(self.flush_interval)
+            self._flush_wakeup.clear()
+            self.flush()
+    
+    def close(self) -> bool:
+        """Stop the background writer, flush what is left and release files"""
+        thread, self._flush_thread = self._flush_thread, None
+        if thread is not None:
+            self._flush_wakeup.set()
+            thread.join()
+        if self.durability in _DEFERRED_POLICIES:
+            atexit.unregister(self.close)
+        ok = self.flush()
+        if isinstance(self.tasks, LazyTaskMap):
+            self.tasks.close()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        return ok
+    
+    def _sync_file(self, f) -> None:
+        """Force file contents to disk unless the OS is trusted to do it"""
+        if self.durability != "os-buffered":
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _sync_directory(self, directory: str) -> None:
+        """Make a rename within directory durable"""
+        if self.durability == "os-buffered":
+            return
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def _write_snapshot_atomic(self, path: str, header: Dict[str, Any],
+                               tasks: Optional[Iterable[Task]] = None, codec=None) -> None:
+        """Write tasks (default: all) to a temporary file next to path, then
+        rename it over path"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = _create_temp_file(path)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if tasks is None:
+                    tasks = self.tasks.values()
+                (codec or self.codec).dump(f, header, tasks)
+                self._sync_file(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        self._sync_directory(directory)
+    
+    def _rollback(self, undo: Dict[str, Optional[tuple]]) -> None:
+        """Restore the tasks recorded in an undo log"""
+        resurrected = False
+        for task_id, entry in undo.items():
+            exists = task_id in self.tasks
+            if exists:
+                self._unindex_task(task_id)
+                
+            if entry is None:
+                if exists:
+                    del self.tasks[task_id]
+                    self._unplace(task_id)
+            else:
+                task, state, position = entry
+                vars(task).update(state)
+                resurrected = resurrected or not exists
+                self.tasks[task_id] = task
+                self._place(task_id, position)
+                self._index_task(task)
+            self._mark_dirty(task_id)
             
-            with open(self.storage_file, 'w') as f:
-                json.dump(data, f, indent=2)
+        if resurrected:
+            # Deleted tasks were put back at the end of the dict; move
+            # them to their old place so the dict matches storage order
+            order = sorted(self._positions, key=self._positions.__getitem__)
+            if isinstance(self.tasks, LazyTaskMap):
+                self.tasks.reorder(order)
+            else:
+                reordered = {task_id: self.tasks[task_id] for task_id in order}
+                self.tasks.clear()
+                self.tasks.update(reordered)
+        self.generation += 1
+    
+    @_synchronized
+    @_coherent(exclusive=True)
+    def save_tasks(self) -> bool:
+        """Save tasks to storage file
+        
+        In journal mode this is the compaction step: once the snapshot is
+        written the journal is truncated.
+        """
+        try:
+            with self._io_lock:
+                self._write_snapshot()
+                
+                if self.journal:
+                    open(self.journal_file, 'w').close()
+                    self._journal_records = 0
+                    self._journal_offset = 0
+                elif self._journal_records:
+                    # Left by journal mode and replayed on load
+                    os.remove(self.journal_file)
+                    self._journal_records = 0
+                    self._journal_offset = 0
+            if self._lock_fd is not None:
+                self._seen_snapshot = self._snapshot_fingerprint()
                 
             return True
         except Exception as e:
             print(f"Error saving tasks: {e}")
             return False
     
+    def _write_snapshot(self) -> None:
+        """Write the snapshot file holding every task"""
+        header = {
+            "saved_at": datetime.now().isoformat(),
+            "task_count": len(self.tasks)
+        }
+        self._write_snapshot_atomic(self.storage_file, header)
+    
+    def _mark_dirty(self, task_id: str) -> None:
+        """Hook called whenever a task is created, changed or removed"""
+        if self._snapshot is not None:
+            self._changed_since_snapshot[task_id] = None
+    
+    @_synchronized
+    @_coherent()
+    def snapshot(self) -> TaskSnapshot:
+        """Consistent, immutable view of all tasks as they are now
+        
+        Copies only the tasks changed since the previous snapshot and
+        returns that same snapshot when nothing changed. Inside a
+        transaction the view includes its uncommitted changes.
+        """
+        previous = self._snapshot
+        if previous is None:
+            tasks = {task_id: _frozen_copy(task) for task_id, task in self.tasks.items()}
+        elif not self._changed_since_snapshot:
+            return previous
+        else:
+            tasks = dict(previous._tasks)
+            for task_id in self._changed_since_snapshot:
+                task = self.tasks.get(task_id)
+                if task is None:
+                    tasks.pop(task_id, None)
+                else:
+                    tasks[task_id] = _frozen_copy(task)
+        
+        self._snapshot = TaskSnapshot(tasks, self.generation)
+        self._changed_since_snapshot = {}
+        return self._snapshot
+    
+    @_synchronized
+    @_coherent(exclusive=True)
     def create_task(self, task: Task) -> bool:
         """Create a new task"""
         if task.task_id in self.tasks:
             return False  # Task already exists
             
+        self._remember(task.task_id)
         self.tasks[task.task_id] = task
-        return self.save_tasks()
+        self._place(task.task_id, next(self._position_counter))
+        self._index_task(task)
+        self._mark_dirty(task.task_id)
+        self.generation += 1
+        self._emit("create", task.task_id, task)
+        return self._persist("create", task.task_id)
     
-    def get_task(self, task_id: str) -> Optional[Task]:
-        """Get a task by ID"""
-        return self.tasks.get(task_id)
+    @_coherent()
+    def get_task(self, task_id: str, include_archived: bool = False) -> Optional[Task]:
+        """Get a task by ID, falling back to the cold store if asked to"""
+        task = self.tasks.get(task_id)
+        if task is None and include_archived:
+            task = self.archive.get(task_id)
+        return task
     
+    @_coherent()
     def get_all_tasks(self) -> List[Task]:
         """Get all tasks"""
         return list(self.tasks.values())
     
-    def update_task(self, task_id: str, updates: Dict[str, Any]) -> bool:
-        """Update an existing task"""
+    @_synchronized
+    @_coherent(exclusive=True)
+    def update_task(self, task_id: str, updates: Dict[str, Any],
+                    expected_version: Optional[int] = None) -> bool:
+        """Update an existing task
+        
+        With ``expected_version`` the update only applies if the task is
+        still at that version, and raises VersionConflictError otherwise.
+        """
         if task_id not in self.tasks:
             return False
             
         task = self.tasks[task_id]
+        self._check_version(task, expected_version)
         
         # Update allowed fields
         allowed_fields = ['title', 'description', 'status', 'priority', 
                          'due_date', 'assigned_to', 'tags']
         
+        # Convert every value before touching the task or its index
+        # entries, so that a bad value leaves both as they were
+        converted = {}
         for field, value in updates.items():
             if field in allowed_fields:
                 if field == 'due_date' and value:
                     # Handle datetime conversion
                     if isinstance(value, str):
                         value = datetime.fromisoformat(value)
-                        
-                setattr(task, field, value)
+                converted[field] = value
+        
+        self._remember(task_id)
+        self._unindex_task(task_id)
+        changes = {}
+        
+        for field, value in converted.items():
+            previous = getattr(task, field)
+            setattr(task, field, value)
+            if previous != value:
+                changes[field] = (previous, value)
         
         task.updated_at = datetime.now()
-        return self.save_tasks()
+        task.version += 1
+        self._index_task(task)
+        self._mark_dirty(task_id)
+        self.generation += 1
+        self._emit("update", task_id, task, changes)
+        return self._persist("update", task_id)
     
-    def delete_task(self, task_id: str) -> bool:
-        """Delete a task"""
+    @_synchronized
+    @_coherent(exclusive=True)
+    def delete_task(self, task_id: str, expected_version: Optional[int] = None) -> bool:
+        """Delete a task, only if still at ``expected_version`` when given"""
         if task_id not in self.tasks:
             return False
             
-        del self.tasks[task_id]
-        return self.save_tasks()
+        self._check_version(self.tasks[task_id], expected_version)
+        self._remember(task_id)
+        task = self.tasks.pop(task_id)
+        self._unplace(task_id)
+        self._unindex_task(task_id)
+        self._mark_dirty(task_id)
+        self.generation += 1
+        self._emit("delete", task_id, task)
+        return self._persist("delete", task_id)
+    
+    @staticmethod
+    def _check_version(task: Task, expected_version: Optional[int]) -> None:
+        """Fail fast when a task moved past the version a caller read"""
+        if expected_version is not None and task.version != expected_version:
+            raise VersionConflictError(task.task_id, expected_version, task.version)
+    
+    def create_many(self, tasks: Iterable[Task]) -> int:
+        """Create several tasks with a single write; returns how many were new"""
+        try:
+            with self.transaction():
+                created = sum(1 for task in tasks if self.create_task(task))
+        except CommitError as e:
+            print(f"Error creating tasks: {e}")
+            return 0
+        return created
     
-    def search_tasks(self, query: str) -> List[Task]:
-        """Search tasks by title or description"""
-        query = query.lower()
-        results = []
+    def update_many(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Apply updates keyed by task id with a single write"""
+        try:
+            with self.transaction():
+                updated = sum(1 for task_id, changes in updates.items()
+                              if self.update_task(task_id, changes))
+        except CommitError as e:
+            print(f"Error updating tasks: {e}")
+            return 0
+        return updated
+    
+    def delete_many(self, task_ids: Iterable[str]) -> int:
+        """Delete several tasks with a single write"""
+        try:
+            with self.transaction():
+                deleted = sum(1 for task_id in task_ids if self.delete_task(task_id))
+        except CommitError as e:
+            print(f"Error deleting tasks: {e}")
+            return 0
+        return deleted
+    
+    @_coherent()
+    def search_tasks(self, query: str, include_archived: bool = False) -> List[Task]:
+        """Search tasks by title or description
         
-        for task in self.tasks.values():
-            if (query in task.title.lower() or 
-                query in task.description.lower() or
-                query in ' '.join(task.tags).lower()):
-                results.append(task)
-                
+        With ``include_archived`` matching archived tasks follow the
+        working set ones; this decompresses the whole cold store.
+        """
+        results = None
+        if self._text_index is not None:
+            self._ensure_indexes()
+            task_ids = self._text_index.search(query)
+            if task_ids is not None:
+                results = self._tasks_for_ids(task_ids)
+        if results is None:
+            lowered = query.lower()
+            results = [task for task in self.tasks.values() if self._contains_text(task, lowered)]
+        
+        if include_archived:
+            results.extend(task for task in self.archive.iter_tasks()
+                           if task.task_id not in self.tasks and self._matches_search(task, query))
         return results
     
+    def _matches_search(self, task: Task, query: str) -> bool:
+        """Match one task against a query the way search_tasks would"""
+        terms = set(tokenize(query)) if self._text_index is not None else None
+        if not terms:
+            return self._contains_text(task, query.lower())
+        tokens = [token for text in (task.title, task.description, *task.tags)
+                  for token in tokenize(text)]
+        return all(any(token.startswith(term) for token in tokens) for term in terms)
+    
+    def archive_tasks(self, older_than_days: Optional[float] = None,
+                      now: Optional[datetime] = None) -> int:
+        """Move completed and cancelled tasks to the cold store
+        
+        Takes tasks last updated more than ``older_than_days`` (default:
+        ``archive_after_days``) ago. They are appended and fsynced to the
+        cold store before being deleted from the working set in one
+        transaction, so a crash in between leaves a task in both places,
+        never in neither; the working set copy wins. Returns how many
+        tasks were archived.
+        """
+        if older_than_days is None:
+            older_than_days = self.archive_after_days
+        if older_than_days is None:
+            raise ValueError("No archive age given and archive_after_days is not set")
+        cutoff = (now or datetime.now()) - timedelta(days=older_than_days)
+        
+        try:
+            with self.transaction():
+                self._ensure_indexes()
+                closed = self._indexes["status"].lookup_any(ARCHIVED_STATUSES)
+                expired = [task for task in self._tasks_for_ids(closed) if task.updated_at < cutoff]
+                if not expired:
+                    return 0
+                self.archive.append(expired)
+                for task in expired:
+                    self.delete_task(task.task_id)
+        except CommitError as e:
+            # The archived copies stay behind; the working set ones win
+            print(f"Error archiving tasks: {e}")
+            return 0
+        return len(expired)
+    
+    @_synchronized
+    @_coherent(exclusive=True)
+    def restore_task(self, task_id: str) -> bool:
+        """Move an archived task back into the working set"""
+        if task_id in self.tasks:
+            return False
+        task = self.archive.get(task_id)
+        if task is None:
+            return False
+        # Tombstone only once the task is back, so it is never in neither
+        if not self.create_task(task):
+            return False
+        self.archive.append_restores([task_id])
+        return True
+    
+    @_synchronized
+    @_coherent()
+    def fuzzy_search(self, query: str, threshold: float = 0.3,
+                     limit: Optional[int] = None) -> List[Tuple[Task, float]]:
+        """Tasks whose title or a tag resembles query, most similar first
+        
+        Returns (task, similarity) pairs with similarity between
+        ``threshold`` and 1, ties in storage order. Similarity is trigram
+        based, so typos still match; a title or tag containing the query
+        verbatim scores 1. With ``trigram_index=True`` only tasks sharing
+        enough trigrams with the query are scored, instead of every task.
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("Threshold must be greater than 0 and at most 1")
+        needle = query.lower()
+        if not needle.strip():
+            return []
+        
+        if self._trigram_index is None:
+            candidates: Iterable[str] = self.tasks
+        else:
+            self._ensure_indexes()
+            candidates = self._trigram_index.similar(query, threshold)
+            containing = self._trigram_index.containing(query)
+            if containing is None:
+                # Too short to narrow down by trigrams; checking names is cheap
+                containing = (task_id for task_id, task in self.tasks.items()
+                              if self._names_contain(task, needle))
+            candidates |= {task_id for task_id in containing
+                           if self._names_contain(self.tasks[task_id], needle)}
+        
+        query_grams, width = trigrams(query), len(tokenize(query))
+        scored = []
+        for task_id in candidates:
+            task = self.tasks[task_id]
+            if self._names_contain(task, needle):
+                score = 1.0
+            else:
+                score = max(text_similarity(query_grams, width, name)
+                            for name in (task.title, *task.tags))
+            if score >= threshold:
+                scored.append((-score, self._positions[task_id], task))
+        
+        ranked = sorted(scored) if limit is None else heapq.nsmallest(limit, scored)
+        return [(task, -score) for score, _, task in ranked]
+    
+    @staticmethod
+    def _names_contain(task: Task, needle: str) -> bool:
+        """Whether a lowercase query occurs in a task's title or a tag"""
+        return needle in task.title.lower() or any(needle in tag.lower() for tag in task.tags)
+    
+    @staticmethod
+    def _contains_text(task: Task, query: str) -> bool:
+        """Substring match of a lowercase query against a task's text"""
+        return (query in task.title.lower() or
+                query in task.description.lower() or
+                query in ' '.join(task.tags).lower())
+    
+    @_coherent()
     def filter_tasks(self, **filters) -> List[Task]:
-        """Filter tasks by various criteria"""
-        results = []
-        
-        for task in self.tasks.values():
-            match = True
-            
-            for field, value in filters.items():
-                if hasattr(task, field):
-                    task_value = getattr(task, field)
-                    
-                    if field == 'tags':
-                        # Check if any of the filter tags are in task tags
-                        if isinstance(value, list):
-                            if not any(tag in task.tags for tag in value):
-                                match = False
-                                break
-                        else:
-                            if value not in task.tags:
-                                match = False
-                                break
-                    else:
-                        if task_value != value:
-                            match = False
-                            break
+        """Filter tasks by various criteria
+        
+        Filters on indexed fields are answered from the indexes, smallest
+        candidate set first; any remaining filters are checked per task.
+        """
+        self._ensure_indexes()
+        predicates = []
+        residual = {}
+        for field, value in filters.items():
+            try:
+                # A list of tags becomes an "in" predicate: any of the tags
+                predicates.append(Predicate(field, "eq", value))
+            except (TypeError, ValueError):
+                # Not a query field, or a list of tags that cannot be hashed
+                residual[field] = value
+        candidate_sets, unplanned = self._plan_predicates(predicates)
+        
+        if not candidate_sets:
+            tasks: Iterable[Task] = self.tasks.values()
+        else:
+            tasks = self._tasks_for_ids(self._intersect(candidate_sets))
+        return [task for task in tasks
+                if all(predicate.matches(task) for predicate in unplanned)
+                and self._matches(task, residual)]
+    
+    @staticmethod
+    def _intersect(candidate_sets: List[Set[str]]) -> Set[str]:
+        """Intersect id sets, smallest first"""
+        candidate_sets.sort(key=len)
+        task_ids = candidate_sets[0]
+        for other in candidate_sets[1:]:
+            if not task_ids:
+                break
+            task_ids = task_ids & other
+        return task_ids
+    
+    @_synchronized
+    @_coherent()
+    def query(self, order_by: Union[None, str, Iterable[str]] = None,
+              limit: Optional[int] = None, offset: int = 0, **filters) -> List[Task]:
+        """Find tasks matching predicates, sorted and paginated
+        
+        Filters are ``field=value`` or ``field__op=value`` with op one of
+        QUERY_OPERATORS, e.g. ``status__in=[...]`` or ``due_date__lt=now``;
+        range operators apply to created_at, updated_at and due_date.
+        ``order_by`` names one or more fields, each prefixed with "-" for
+        descending order; without it tasks come back in storage order.
+        
+        Equality and ``in`` filters on indexed fields are answered from
+        the hash indexes. When the filters exclude completed tasks, the
+        due-date index answers due-date ranges, and ordering by due date
+        walks it and stops once ``limit`` matches are found. Any other
+        ordering keeps only the best ``offset + limit`` tasks in a heap
+        instead of sorting every match.
+        """
+        predicates = parse_filters(filters)
+        order = parse_order(order_by)
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("Limit and offset cannot be negative")
+        self._ensure_indexes()
+        stop = None if limit is None else offset + limit
+        candidate_sets, residual = self._plan_predicates(predicates)
+        
+        # The due-date index only holds open tasks that have a due date
+        due_ranges = [predicate for predicate in residual
+                      if predicate.field == "due_date" and predicate.op in RANGE_OPERATORS]
+        use_due_index = any(predicate.field == "status" and predicate.excludes("completed")
+                            for predicate in predicates)
+        candidates = self._intersect(candidate_sets) if candidate_sets else None
+        
+        if use_due_index and len(order) == 1 and order[0][0] == "due_date":
+            matching = self._query_due_order(candidates, residual, due_ranges, order[0][1])
+            return list(islice(matching, offset, stop))
+        
+        if use_due_index and due_ranges:
+            in_range = {task_id for _, task_id in self._due_index.scan(**self._due_bounds(due_ranges))}
+            candidates = in_range if candidates is None else self._intersect([candidates, in_range])
             
-            if match:
-                results.append(task)
+        if candidates is None:
+            tasks = self.tasks.values()
+        elif order:
+            tasks = map(self.tasks.__getitem__, candidates)
+        else:
+            tasks = self._tasks_for_ids(candidates)
+        matching = tasks
+        if residual:
+            matching = (task for task in tasks
+                        if all(predicate.matches(task) for predicate in residual))
+        
+        if not order:
+            return list(islice(matching, offset, stop))
+        if stop is None:
+            return sorted(matching, key=order_key(order))[offset:]
+        return heapq.nsmallest(stop, matching, key=order_key(order))[offset:]
+    
+    @_synchronized
+    @_coherent()
+    def aggregate(self, group_by: Union[None, str, Iterable[str]] = None,
+                  metrics: Union[str, Iterable[str]] = ("count",),
+                  where: Optional[Dict[str, Any]] = None,
+                  now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Compute metrics per group of tasks in one pass
+        
+        ``group_by`` names keys from GROUP_KEYS, ``metrics`` names entries
+        of METRICS, and ``where`` takes the same ``field__op`` filters as
+        ``query``. Returns one row per group, e.g.
+        ``{"status": "pending", "priority": "high", "count": 3}``.
+        
+        Counts grouped only by indexed fields are read off the hash
+        indexes without visiting any task.
+        """
+        group_by = parse_group_by(group_by)
+        metrics = parse_metrics(metrics)
+        predicates = parse_filters(where or {})
+        self._ensure_indexes()
+        candidate_sets, residual = self._plan_predicates(predicates)
+        candidates = self._intersect(candidate_sets) if candidate_sets else None
+        aggregation = Aggregation(group_by, metrics, now or datetime.now())
+        
+        if (group_by and not residual and metrics == ["count"]
+                and all(key in self._indexes for key in group_by)):
+            counts = self._count_from_indexes(group_by, candidates)
+            if counts is not None:
+                for key, count in counts.items():
+                    aggregation.set_count(key, count)
+                return aggregation.rows()
+        
+        tasks = self.tasks.values() if candidates is None else map(self.tasks.__getitem__, candidates)
+        for task in tasks:
+            if all(predicate.matches(task) for predicate in residual):
+                aggregation.add(task)
+        return aggregation.rows()
+    
+    def _count_from_indexes(self, group_by: List[str],
+                            candidates: Optional[Set[str]]) -> Optional[Dict[tuple, int]]:
+        """Group sizes from intersecting index postings, or None if too many groups"""
+        postings = [self._indexes[key].postings for key in group_by]
+        combinations = 1
+        for values in postings:
+            combinations *= len(values)
+        if combinations > _MAX_INDEX_GROUPS:
+            return None
+            
+        groups: List[Tuple[tuple, Optional[Set[str]]]] = [((), candidates)]
+        for values in postings:
+            narrowed = []
+            for key, task_ids in groups:
+                for value, holders in values.items():
+                    members = holders if task_ids is None else self._intersect([task_ids, holders])
+                    if members:
+                        narrowed.append((key + (value,), members))
+            groups = narrowed
+        return {key: len(task_ids) for key, task_ids in groups}
+    
+    def _plan_predicates(self, predicates: List[Predicate]) -> Tuple[List[Set[str]], List[Predicate]]:
+        """Split predicates into index candidate sets and per-task checks"""
+        candidate_sets = []
+        residual = []
+        for predicate in predicates:
+            index = self._indexes.get(predicate.field)
+            try:
+                if index is None or predicate.op not in ("eq", "in"):
+                    raise TypeError(predicate.field)
+                if predicate.op == "eq":
+                    candidate_sets.append(index.lookup(predicate.value))
+                else:
+                    candidate_sets.append(index.lookup_any(predicate.value))
+            except TypeError:
+                # Not indexed, or a value the index cannot hash
+                residual.append(predicate)
+        return candidate_sets, residual
+    
+    def iter_tasks(self, after: Optional[str] = None, batch_size: int = 256) -> TaskCursor:
+        """Lazily iterate all tasks in storage order"""
+        return self._cursor(lambda: None, lambda task: True, after, batch_size)
+    
+    def iter_search(self, query: str, after: Optional[str] = None,
+                    batch_size: int = 256) -> TaskCursor:
+        """Lazily iterate the results of search_tasks"""
+        if self._text_index is not None and tokenize(query):
+            return self._cursor(lambda: self._text_index.search(query), lambda task: True,
+                                after, batch_size)
+        text = query.lower()
+        return self._cursor(lambda: None, lambda task: self._contains_text(task, text),
+                            after, batch_size)
+    
+    def iter_filter(self, after: Optional[str] = None, batch_size: int = 256,
+                    **filters) -> TaskCursor:
+        """Lazily iterate tasks matching filters, written as for query()"""
+        predicates = parse_filters(filters)
+        
+        def candidates() -> Optional[Set[str]]:
+            candidate_sets, _ = self._plan_predicates(predicates)
+            return self._intersect(candidate_sets) if candidate_sets else None
+        
+        _, residual = self._plan_predicates(predicates)
+        return self._cursor(candidates,
+                            lambda task: all(predicate.matches(task) for predicate in residual),
+                            after, batch_size)
+    
+    def _cursor(self, candidates: Callable[[], Optional[Set[str]]],
+                matches: Callable[[Task], bool], after: Optional[str],
+                batch_size: int) -> TaskCursor:
+        """Build a cursor whose batches are recomputed from the current state
+        
+        ``candidates`` returns the ids the indexes allow (None for all
+        tasks) and ``matches`` checks each one. Small candidate sets are
+        ordered directly; otherwise storage order is walked and candidates
+        act as a membership filter.
+        """
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+        
+        def fetch(position: int) -> List[Tuple[int, Task]]:
+            with self._lock, self._coherent_access():
+                self._ensure_indexes()
+                task_ids = candidates()
+                batch = []
+                if task_ids is not None and len(task_ids) * 8 < len(self.tasks):
+                    while len(batch) < batch_size:
+                        later = ((self._positions[task_id], task_id) for task_id in task_ids
+                                 if self._positions[task_id] > position)
+                        chunk = heapq.nsmallest(batch_size - len(batch), later)
+                        if not chunk:
+                            break
+                        for position, task_id in chunk:
+                            task = self.tasks[task_id]
+                            if matches(task):
+                                batch.append((position, task))
+                else:
+                    for position, task_id in self._order.after(position):
+                        if task_ids is not None and task_id not in task_ids:
+                            continue
+                        task = self.tasks[task_id]
+                        if matches(task):
+                            batch.append((position, task))
+                            if len(batch) == batch_size:
+                                break
+                return batch
+        
+        return TaskCursor(fetch, self._resume_position(after), after)
+    
+    def _resume_position(self, token: Optional[str]) -> int:
+        """Position to continue from for a cursor token"""
+        if token is None:
+            return -1
+        try:
+            position, task_id = token.split(":", 1)
+            position = int(position)
+        except ValueError:
+            raise ValueError(f"Invalid cursor token: {token!r}")
+        # Positions are reassigned when the storage is reloaded, so prefer
+        # where the task sits now; a deleted task falls back to the token
+        return self._positions.get(task_id, position)
+    
+    def _query_due_order(self, candidates: Optional[Set[str]], residual: List[Predicate],
+                         due_ranges: List[Predicate], descending: bool) -> Iterator[Task]:
+        """Matching open tasks in due-date order, read off the due-date index"""
+        entries = self._due_index.scan(reverse=descending, **self._due_bounds(due_ranges))
+        for _, group in groupby(entries, key=lambda entry: entry[0]):
+            task_ids = [task_id for _, task_id in group]
+            if descending:
+                # Ties are always broken by ascending task_id
+                task_ids.reverse()
+            for task_id in task_ids:
+                if candidates is not None and task_id not in candidates:
+                    continue
+                task = self.tasks[task_id]
+                if all(predicate.matches(task) for predicate in residual):
+                    yield task
+        
+        if not due_ranges:
+            # Tasks without a due date sort last
+            pool = self.tasks if candidates is None else candidates
+            undated = sorted(task_id for task_id in pool if self.tasks[task_id].due_date is None)
+            for task_id in undated:
+                task = self.tasks[task_id]
+                if all(predicate.matches(task) for predicate in residual):
+                    yield task
+    
+    @staticmethod
+    def _due_bounds(due_ranges: List[Predicate]) -> Dict[str, Any]:
+        """Tightest due-date index scan bounds implied by range predicates"""
+        bounds: Dict[str, Any] = {}
+        for predicate in due_ranges:
+            if predicate.op in ("gt", "gte"):
+                lower = bounds.get("lower")
+                if lower is None or predicate.value > lower or (
+                        predicate.value == lower and predicate.op == "gt"):
+                    bounds["lower"] = predicate.value
+                    bounds["include_lower"] = predicate.op == "gte"
+            else:
+                upper = bounds.get("upper")
+                if upper is None or predicate.value < upper or (
+                        predicate.value == upper and predicate.op == "lt"):
+                    bounds["upper"] = predicate.value
+                    bounds["include_upper"] = predicate.op == "lte"
+        return bounds
+    
+    @staticmethod
+    def _matches(task: Task, filters: Dict[str, Any]) -> bool:
+        """Check a task against equality filters"""
+        for field, value in filters.items():
+            if hasattr(task, field):
+                task_value = getattr(task, field)
                 
-        return results
+                if field == 'tags':
+                    # Check if any of the filter tags are in task tags
+                    if isinstance(value, list):
+                        if not any(tag in task.tags for tag in value):
+                            return False
+                    else:
+                        if value not in task.tags:
+                            return False
+                else:
+                    if task_value != value:
+                        return False
+                        
+        return True
+    
+    @_coherent()
+    def get_overdue_tasks(self, now: Optional[datetime] = None) -> List[Task]:
+        """Get all overdue tasks, earliest due date first"""
+        self._ensure_indexes()
+        now = now or datetime.now()
+        return [self.tasks[task_id] for task_id in self._due_index.before(now)]
     
-    def get_overdue_tasks(self) -> List[Task]:
-        """Get all overdue tasks"""
-        return [task for task in self.tasks.values() if task.is_overdue()]
+    @_coherent()
+    def get_tasks_due_within(self, hours: float, now: Optional[datetime] = None) -> List[Task]:
+        """Get open tasks due in the next ``hours`` hours, earliest first"""
+        self._ensure_indexes()
+        now = now or datetime.now()
+        task_ids = self._due_index.between(now, now + timedelta(hours=hours))
+        return [self.tasks[task_id] for task_id in task_ids]
     
     def get_tasks_by_status(self, status: str) -> List[Task]:
         """Get tasks by status"""
-        return [task for task in self.tasks.values() if task.status == status]
+        return self.filter_tasks(status=status)
     
     def get_tasks_by_priority(self, priority: str) -> List[Task]:
         """Get tasks by priority"""
-        return [task for task in self.tasks.values() if task.priority == priority]
+        return self.filter_tasks(priority=priority)
     
+    @_coherent()
     def get_statistics(self) -> Dict[str, Any]:
         """Get task statistics"""
-        total_tasks = len(self.tasks)
-        
-        if total_tasks == 0:
+        if not self.tasks:
             return {"total_tasks": 0}
         
-        status_counts = {}
-        priority_counts = {}
-        
-        for task in self.tasks.values():
-            status_counts[task.status] = status_counts.get(task.status, 0) + 1
-            priority_counts[task.priority] = priority_counts.get(task.priority, 0) + 1
-        
-        overdue_count = len(self.get_overdue_tasks())
+        stats = self.get_statistics_snapshot()
+        return {
+            "total_tasks": stats["total_tasks"],
+            "by_status": stats["by_status"],
+            "by_priority": stats["by_priority"],
+            "overdue_tasks": stats["overdue_tasks"]
+        }
+    
+    @_coherent()
+    def get_statistics_snapshot(self) -> Dict[str, Any]:
+        """Get a point-in-time copy of the maintained counters
         
+        Built from the index sizes, which every mutation keeps current, so
+        it never iterates the tasks and is cheap enough to poll constantly.
+        ``generation`` increases with every mutation.
+        """
+        self._ensure_indexes()
+        now = datetime.now()
         return {
-            "total_tasks": total_tasks,
-            "by_status": status_counts,
-            "by_priority": priority_counts,
-            "overdue_tasks": overdue_count
+            "taken_at": now.isoformat(),
+            "generation": self.generation,
+            "total_tasks": len(self.tasks),
+            "by_status": self._indexes["status"].counts(),
+            "by_priority": self._indexes["priority"].counts(),
+            "overdue_tasks": self._due_index.count_before(now)
         }
     
-    def backup_tasks(self, backup_file: str) -> bool:
-        """Create a backup of all tasks"""
+    @_coherent()
+    def columnar_view(self) -> TaskColumns:
+        """Get NumPy column arrays of all tasks for vectorized analytics
+        
+        The view is cached and rebuilt on the first call after a mutation.
+        Requires numpy.
+        """
+        cached = self._columns
+        if cached is not None and cached[0] == self.generation:
+            return cached[1]
+            
+        with self._lock:
+            self._columns = (self.generation, TaskColumns(self.tasks.values()))
+            return self._columns[1]
+    
+    @_synchronized
+    @_coherent()
+    def backup_tasks(self, backup_file: str, parent: Optional[str] = None,
+                     compression: Optional[str] = None) -> bool:
+        """Create a backup of all tasks
+        
+        By default this is a copy of the snapshot in the storage codec.
+        With ``compression`` (``zlib`` or ``lzma``) the backup is streamed
+        through a compressor instead. With ``parent``, an earlier
+        compressed backup, it is incremental: it holds only the tasks
+        updated or added since the parent was taken (zlib unless told
+        otherwise). ``restore_backup`` follows the chain back to its base.
+        
+        Changed tasks are those whose contents digest differs from the one
+        the parent recorded; versions alone may repeat with other contents
+        after a restore or when a task id is reused.
+        """
         try:
-            data = {
-                "backup_created": datetime.now().isoformat(),
+            created = datetime.now()
+            if parent is None and compression is None:
+                header = {
+                    "backup_created": created.isoformat(),
+                    "original_file": self.storage_file,
+                    "task_count": len(self.tasks)
+                }
+                self._write_snapshot_atomic(backup_file, header)
+                return True
+            
+            tasks: Iterable[Task] = self.tasks.values()
+            digests = {task_id: task_digest(task) for task_id, task in self.tasks.items()}
+            if parent is not None:
+                known = read_backup_header(parent).get("task_digests", {})
+                tasks = [task for task in tasks if known.get(task.task_id) != digests[task.task_id]]
+                parent = os.path.relpath(os.path.abspath(parent),
+                                         os.path.dirname(os.path.abspath(backup_file)))
+            else:
+                tasks = list(tasks)
+            
+            header = {
+                "backup_created": created.isoformat(),
                 "original_file": self.storage_file,
-                "task_count": len(self.tasks),
-                "tasks": [task.to_dict() for task in self.tasks.values()]
+                "parent": parent,
+                "task_count": len(tasks),
+                "task_digests": digests
             }
-            
-            with open(backup_file, 'w') as f:
-                json.dump(data, f, indent=2)
-                
+            self._write_snapshot_atomic(backup_file, header, tasks,
+                                        codec=BackupCodec(compression or "zlib"))
             return True
         except Exception as e:
             print(f"Error creating backup: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    @_synchronized
+    @_coherent(exclusive=True)
+    def restore_backup(self, backup_file: str) -> bool:
+        """Replace every task with the contents of a backup
+        
+        Accepts plain snapshot copies and compressed backups; for an
+        incremental backup the whole chain down to its base is replayed.
+        The restored state is saved straight away and published as a reset.
+        """
+        if self._undo_stack:
+            raise ValueError("Cannot restore a backup inside a transaction")
+        try:
+            if is_compressed_backup(backup_file):
+                tasks = load_backup_chain(backup_file)
+            else:
+                tasks = list(iter_tasks_from_file(backup_file))
+        except Exception as e:
+            print(f"Error restoring backup: {e}")
+            return False
+        
+        previous_ids = list(self.tasks)
+        if isinstance(self.tasks, LazyTaskMap):
+            self.tasks.close()
+        self.tasks = {task.task_id: task for task in tasks}
+        self._pending_ids = {}
+        for task_id in previous_ids + list(self.tasks):
+            self._mark_dirty(task_id)
+        self._rebuild_indexes()
+        self._emit("reset")
+        return self.save_tasks()
+    
+    @_synchronized
+    @_coherent()
+    def export_json(self, export_file: str) -> bool:
+        """Export all tasks as a JSON document, whatever the storage codec"""
+        try:
+            header = {
+                "exported_at": datetime.now().isoformat(),
+                "original_file": self.storage_file,
+                "task_count": len(self.tasks)
+            }
+            
+            self._write_snapshot_atomic(export_file, header, codec=JsonCodec())
+            return True
+        except Exception as e:
+            print(f"Error exporting tasks: {e}")
+            return False
+    
+    @_synchronized
+    @_coherent()
+    def export_ndjson(self, export_file: str) -> bool:
+        """Export all tasks as NDJSON, streaming one line per task"""
+        try:
+            self._write_snapshot_atomic(export_file, {}, codec=NdjsonCodec())
+            return True
+        except Exception as e:
+            print(f"Error exporting tasks: {e}")
+            return False
+    
+    def import_ndjson(self, import_file: str, batch_size: int = 1000) -> int:
+        """Create the tasks of an NDJSON file with a single write
+        
+        The file is read ``batch_size`` lines at a time, each batch fully
+        validated through Task.from_dict before it is applied, so memory
+        beyond the tasks themselves stays bounded. Tasks whose id already
+        exists are skipped; an invalid line rolls the whole import back.
+        Returns how many tasks were created.
+        """
+        try:
+            with open(import_file, 'rb') as f:
+                tasks = NdjsonCodec().load(f)
+                created = 0
+                with self.transaction():
+                    while True:
+                        batch = list(islice(tasks, batch_size))
+                        if not batch:
+                            break
+                        created += sum(1 for task in batch if self.create_task(task))
+        except Exception as e:
+            print(f"Error importing tasks: {e}")
+            return 0
+        return created
+
+
+class ShardedTaskStorage(TaskStorage):
+    """TaskStorage that spreads its snapshot over several shard files
+    
+    Each task lives in shard ``crc32(task_id) % shard_count``, stored as
+    ``<name>.<i>-of-<n><ext>`` next to ``storage_file``. Mutations mark
+    only their shard dirty, saving rewrites just the dirty shards, and
+    loading reads all shards concurrently on a thread pool. Everything
+    else, including journal mode, behaves as in TaskStorage.
+    """
+    
+    def __init__(self, storage_file: str = "tasks.json", shard_count: int = 8, **options):
+        if shard_count < 1:
+            raise ValueError("Shard count must be at least 1")
+        if options.get("lazy_load"):
+            raise ValueError("Lazy loading is not supported for sharded storage")
+            
+        self.shard_count = shard_count
+        self._shards: List[Dict[str, None]] = [{} for _ in range(shard_count)]
+        self._dirty_shards: Set[int] = set()
+        
+        root, ext = os.path.splitext(storage_file)
+        self._shard_pattern = f"{root}.{{}}-of-{shard_count}{ext}"
+        foreign = (set(glob.glob(f"{glob.escape(root)}.*-of-*{glob.escape(ext)}"))
+                   - {self.shard_file(shard) for shard in range(shard_count)})
+        if foreign:
+            raise ValueError(f"Found shards of a different shard count: {sorted(foreign)}")
+            
+        super().__init__(storage_file, **options)
+    
+    def shard_of(self, task_id: str) -> int:
+        """Shard number holding a task"""
+        return zlib.crc32(task_id.encode("utf-8")) % self.shard_count
+    
+    def shard_file(self, shard: int) -> str:
+        """Path of a shard's snapshot file"""
+        return self._shard_pattern.format(shard)
+    
+    def _snapshot_fingerprint(self) -> Any:
+        """Value that changes whenever any shard is rewritten"""
+        return tuple(_file_fingerprint(self.shard_file(shard))
+                     for shard in range(self.shard_count))
+    
+    def _load_snapshot(self) -> bool:
+        """Read every shard file concurrently"""
+        paths = [self.shard_file(shard) for shard in range(self.shard_count)]
+        existing = [path for path in paths if os.path.exists(path)]
+        
+        def read_shard(path: str) -> List[Task]:
+            return list(iter_tasks_from_file(path))
+        
+        if existing:
+            with ThreadPoolExecutor(max_workers=min(len(existing), os.cpu_count() or 1)) as pool:
+                for tasks in pool.map(read_shard, existing):
+                    for task in tasks:
+                        self.tasks[task.task_id] = task
+        return bool(existing)
+    
+    @_synchronized
+    def load_tasks(self) -> bool:
+        """Load all shards, replaying any journal"""
+        loaded = super().load_tasks()
+        
+        self._shards = [{} for _ in range(self.shard_count)]
+        for task_id in self.tasks:
+            self._shards[self.shard_of(task_id)][task_id] = None
+        # Replayed journal records are not in the shard files yet
+        self._dirty_shards = set(range(self.shard_count)) if self._journal_records else set()
+        return loaded
+    
+    def _mark_dirty(self, task_id: str) -> None:
+        """Move a task's shard membership along with the task dict"""
+        super()._mark_dirty(task_id)
+        shard = self.shard_of(task_id)
+        if task_id in self.tasks:
+            self._shards[shard][task_id] = None
+        else:
+            self._shards[shard].pop(task_id, None)
+        self._dirty_shards.add(shard)
+    
+    def _write_snapshot(self) -> None:
+        """Rewrite only the shards changed since they were last written"""
+        saved_at = datetime.now().isoformat()
+        for shard in sorted(self._dirty_shards):
+            task_ids = self._shards[shard]
+            header = {
+                "saved_at": saved_at,
+                "shard": shard,
+                "shard_count": self.shard_count,
+                "task_count": len(task_ids)
+            }
+            self._write_snapshot_atomic(self.shard_file(shard), header,
+                                        [self.tasks[task_id] for task_id in task_ids])
+            self._dirty_shards.discard(shard)
@@ -9,6 +9,16 @@ from dataclasses import dataclass, field
 import uuid
 
 
+class VersionConflictError(Exception):
+    """Raised when a task changed since the version a caller expected"""
+    
+    def __init__(self, task_id: str, expected: int, actual: int):
+        super().__init__(f"Task {task_id} is at version {actual}, expected {expected}")
+        self.task_id = task_id
+        self.expected = expected
+        self.actual = actual
+
+
 @dataclass
 class Task:
     """A task in the task management system"""
@@ -22,6 +32,7 @@ class Task:
     assigned_to: Optional[str] = None
     tags: list = field(default_factory=list)
     task_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    version: int = 1  # incremented by the storage on every change
     
     def __post_init__(self):
         """Validate task data after initialization"""
@@ -95,7 +106,8 @@ class Task:
             "updated_at": self.updated_at.isoformat(),
             "due_date": self.due_date.isoformat() if self.due_date else None,
             "assigned_to": self.assigned_to,
-            "tags": self.tags
+            "tags": self.tags,
+            "version": self.version
         }
     
     @classmethod
@@ -118,7 +130,8 @@ class Task:
             updated_at=updated_at,
             due_date=due_date,
             assigned_to=data.get("assigned_to"),
-            tags=data.get("tags", [])
+            tags=data.get("tags", []),
+            version=data.get("version", 1)
         )
     
     def __str__(self) -> str:
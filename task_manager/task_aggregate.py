@@ -0,0 +1,133 @@
+"""
+Task Management System - Aggregation Module
+Group-by counts and age metrics for TaskStorage.aggregate
+Collaborative implementation between Agent 1 (writer) and Agent 2 (reviewer/tester)
+"""
+
+from datetime import datetime
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from task import Task
+from task_query import FIELD_RANKS
+
+
+# A task falls in one group per tag, and in no tag group when untagged;
+# weeks are ISO weeks such as "2026-W07"
+GROUP_KEYS = ("status", "priority", "assigned_to", "tags", "due_week", "created_week")
+
+# Ages are seconds elapsed since created_at
+METRICS = ("count", "min_age", "max_age", "avg_age")
+
+
+def parse_group_by(group_by: Union[None, str, Iterable[str]]) -> List[str]:
+    """Turn ``group_by`` into a list of group keys"""
+    if group_by is None:
+        return []
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    keys = list(group_by)
+    for key in keys:
+        if key not in GROUP_KEYS:
+            raise ValueError(f"Group key must be one of: {list(GROUP_KEYS)}")
+    return keys
+
+
+def parse_metrics(metrics: Union[str, Iterable[str]]) -> List[str]:
+    """Turn ``metrics`` into a list of metric names"""
+    if isinstance(metrics, str):
+        metrics = [metrics]
+    names = list(metrics)
+    for name in names:
+        if name not in METRICS:
+            raise ValueError(f"Metric must be one of: {list(METRICS)}")
+    return names
+
+
+def iso_week(moment: Optional[datetime]) -> Optional[str]:
+    """ISO week label of a datetime, e.g. "2026-W07" """
+    if moment is None:
+        return None
+    year, week, _ = moment.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def group_values(task: Task, key: str) -> Sequence[Any]:
+    """Values of a group key for a task; several for tags, none when untagged"""
+    if key == "tags":
+        return list(dict.fromkeys(task.tags))
+    if key == "due_week":
+        return (iso_week(task.due_date),)
+    if key == "created_week":
+        return (iso_week(task.created_at),)
+    return (getattr(task, key),)
+
+
+class Aggregation:
+    """Per-group accumulators filled in a single pass over tasks
+
+    Each group keeps its count and the minimum, maximum and sum of its
+    creation timestamps, from which every age metric follows.
+    """
+
+    def __init__(self, group_by: List[str], metrics: List[str], now: datetime):
+        self.group_by = group_by
+        self.metrics = metrics
+        self.now = now.timestamp()
+        self._groups: Dict[Tuple[Any, ...], List[float]] = {}
+
+    def add(self, task: Task) -> None:
+        """Count a task in every group it belongs to"""
+        created = task.created_at.timestamp()
+        for key in product(*(group_values(task, name) for name in self.group_by)):
+            totals = self._groups.get(key)
+            if totals is None:
+                self._groups[key] = [1, created, created, created]
+            else:
+                totals[0] += 1
+                if created < totals[1]:
+                    totals[1] = created
+                if created > totals[2]:
+                    totals[2] = created
+                totals[3] += created
+
+    def set_count(self, key: Tuple[Any, ...], count: int) -> None:
+        """Record a group size known without visiting its tasks"""
+        self._groups[key] = [count, None, None, None]
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """One dict per group, holding the group values and the metrics
+
+        Groups are ordered by their values (status and priority by rank),
+        with None last. Without ``group_by`` there is exactly one row.
+        """
+        groups = self._groups
+        if not self.group_by and not groups:
+            groups = {(): [0, None, None, None]}
+
+        rows = []
+        for key in sorted(groups, key=self._sort_key):
+            count, earliest, latest, total = groups[key]
+            row = dict(zip(self.group_by, key))
+            for metric in self.metrics:
+                if metric == "count":
+                    row[metric] = count
+                elif earliest is None:
+                    row[metric] = None
+                elif metric == "min_age":
+                    row[metric] = self.now - latest
+                elif metric == "max_age":
+                    row[metric] = self.now - earliest
+                else:
+                    row[metric] = self.now - total / count
+            rows.append(row)
+        return rows
+
+    def _sort_key(self, key: Tuple[Any, ...]) -> tuple:
+        """Order groups by value, with None last"""
+        parts = []
+        for name, value in zip(self.group_by, key):
+            ranks = FIELD_RANKS.get(name)
+            if ranks is not None and value is not None:
+                value = ranks[value]
+            parts.append((value is None, value))
+        return tuple(parts)
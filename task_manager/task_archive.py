@@ -0,0 +1,154 @@
+"""
+Task Management System - Archive Module
+Compressed append-only cold store for tasks moved out of the working set
+Collaborative implementation between Agent 1 (writer) and Agent 2 (reviewer/tester)
+"""
+
+import gzip
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from task import Task
+
+
+# Statuses whose tasks may leave the working set
+ARCHIVED_STATUSES = ("completed", "cancelled")
+
+_READ_SIZE = 1 << 16
+
+
+class ColdStore:
+    """Append-only, gzip-compressed store of archived tasks
+
+    Every append adds complete gzip members of at most ``member_size``
+    NDJSON records: ``{"op": "archive", "task": {...}}`` or a
+    ``{"op": "restore", "task_id": ...}`` tombstone; the latest record
+    for an id wins. The file is a valid multi-member gzip stream, so
+    ``zcat`` reads it too.
+
+    A map from task id to the offset of the member holding it is built
+    on first access and extended whenever the file has grown since, so a
+    lookup decompresses a single member. A member torn by a crash is
+    ignored and cut off before the next append.
+    """
+
+    def __init__(self, path: str, member_size: int = 1000):
+        self.path = path
+        self.member_size = member_size
+        self._locations: Dict[str, int] = {}
+        self._indexed_size = 0
+
+    def __contains__(self, task_id: object) -> bool:
+        self._catch_up()
+        return task_id in self._locations
+
+    def __len__(self) -> int:
+        self._catch_up()
+        return len(self._locations)
+
+    def append(self, tasks: Iterable[Task]) -> None:
+        """Archive tasks, durably, before the caller drops them"""
+        self._append([{"op": "archive", "task": task.to_dict()} for task in tasks])
+
+    def append_restores(self, task_ids: Iterable[str]) -> None:
+        """Record that tasks went back to the working set"""
+        self._append([{"op": "restore", "task_id": task_id} for task_id in task_ids])
+
+    def get(self, task_id: str) -> Optional[Task]:
+        """Read one archived task, or None if it is not archived"""
+        self._catch_up()
+        offset = self._locations.get(task_id)
+        if offset is None:
+            return None
+
+        found = None
+        for _, records in self._members(offset, limit=1):
+            for record in records:
+                if record["op"] == "archive" and record["task"]["task_id"] == task_id:
+                    found = record["task"]
+        return Task.from_dict(found) if found is not None else None
+
+    def iter_tasks(self) -> Iterator[Task]:
+        """Stream every archived task, decompressing the whole store"""
+        self._catch_up()
+        for offset, records in self._members(0, end=self._indexed_size):
+            for record in records:
+                if record["op"] != "archive":
+                    continue
+                data = record["task"]
+                if self._locations.get(data["task_id"]) == offset:
+                    yield Task.from_dict(data)
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        """Write records as new gzip members and fsync them"""
+        if not records:
+            return
+        self._catch_up()
+        with open(self.path, 'ab') as f:
+            # Drop a member torn by an earlier crash; appending after it
+            # would hide everything written from now on
+            f.truncate(self._indexed_size)
+            for start in range(0, len(records), self.member_size):
+                chunk = records[start:start + self.member_size]
+                payload = "".join(json.dumps(record) + "\n" for record in chunk)
+                f.write(gzip.compress(payload.encode("utf-8")))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _catch_up(self) -> None:
+        """Index the members appended since the last look at the file"""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if size == self._indexed_size:
+            return
+
+        for offset, records in self._members(self._indexed_size):
+            for record in records:
+                if record["op"] == "archive":
+                    self._locations[record["task"]["task_id"]] = offset
+                else:
+                    self._locations.pop(record["task_id"], None)
+
+    def _members(self, start: int, end: Optional[int] = None,
+                 limit: Optional[int] = None) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """Yield (offset, records) for complete members from byte offset start
+
+        When reading to the end of the file, the end of the last complete
+        member is remembered as the indexed size.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            leftover = b""
+            members = 0
+            while (end is None or offset < end) and (limit is None or members < limit):
+                decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                parts = []
+                consumed = 0
+                data = leftover or f.read(_READ_SIZE)
+                while data:
+                    try:
+                        parts.append(decompressor.decompress(data))
+                    except zlib.error:
+                        break  # Garbage left by a torn write
+                    consumed += len(data)
+                    if decompressor.eof:
+                        break
+                    data = f.read(_READ_SIZE)
+                if not decompressor.eof:
+                    break  # End of file, or a member torn by a crash
+
+                leftover = decompressor.unused_data
+                next_offset = offset + consumed - len(leftover)
+                lines = b"".join(parts).decode("utf-8").splitlines()
+                yield offset, [json.loads(line) for line in lines if line]
+                offset = next_offset
+                members += 1
+
+        if end is None and limit is None:
+            self._indexed_size = offset
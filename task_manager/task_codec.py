@@ -0,0 +1,349 @@
+"""
+Task Management System - Codec Module
+Serializers for TaskStorage snapshots and backups
+Collaborative implementation between Agent 1 (writer) and Agent 2 (reviewer/tester)
+"""
+
+import io
+import json
+import struct
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Tuple
+from task import Task
+
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = " \t\n\r"
+
+
+class _JsonChunkReader:
+    """Incremental reader for a JSON document too large to parse at once
+    
+    Bytes are decoded as latin-1, which maps each byte to one character, so
+    buffer positions are file offsets. JSON structure is pure ASCII, so
+    non-ASCII UTF-8 text only needs re-decoding inside string values.
+    """
+    
+    def __init__(self, f, chunk_size: int = 1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.base = 0  # file offset of buffer[0]
+        self.pos = 0
+    
+    def _read_more(self) -> bool:
+        """Append the next chunk, dropping what has been consumed"""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk.decode("latin-1")
+        self.base += self.pos
+        self.pos = 0
+        return True
+    
+    def peek(self) -> str:
+        """Next non-whitespace character, or '' at end of file"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _JSON_WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read_more():
+                return ""
+    
+    def expect(self, char: str) -> None:
+        """Consume a structural character"""
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at byte {self.base + self.pos}")
+        self.pos += 1
+    
+    def value(self) -> Tuple[Any, int, int]:
+        """Decode the next value; returns (value, file offset, length)"""
+        self.peek()
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._read_more():
+                    raise
+                continue
+            # A number ending exactly at the buffer end may continue in the
+            # next chunk
+            if end == len(self.buffer) and self._read_more():
+                continue
+            break
+            
+        text = self.buffer[self.pos:end]
+        if not text.isascii():
+            value = json.loads(text.encode("latin-1"))
+        offset, self.pos = self.base + self.pos, end
+        return value, offset, len(text)
+
+
+def _scan_task_records(f, chunk_size: int = 1 << 16) -> Iterator[Tuple[Dict[str, Any], int, int]]:
+    """Yield (record, offset, length) for each entry of a snapshot's tasks array"""
+    reader = _JsonChunkReader(f, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+        
+    while True:
+        key, _, _ = reader.value()
+        reader.expect(":")
+        if key != "tasks":
+            reader.value()
+        elif reader.peek() == "[":
+            reader.expect("[")
+            while reader.peek() != "]":
+                yield reader.value()
+                if reader.peek() == ",":
+                    reader.pos += 1
+            reader.expect("]")
+        else:
+            raise ValueError("Snapshot tasks must be an array")
+            
+        if reader.peek() != ",":
+            reader.expect("}")
+            return
+        reader.pos += 1
+
+
+class JsonCodec:
+    """Pretty-printed JSON document with a top-level ``tasks`` array"""
+    
+    name = "json"
+    
+    def dump(self, f: BinaryIO, header: Dict[str, Any], tasks: Iterable[Task]) -> None:
+        """Write header fields followed by the tasks"""
+        data = dict(header, tasks=[task.to_dict() for task in tasks])
+        text = io.TextIOWrapper(f, encoding="utf-8")
+        json.dump(data, text, indent=2)
+        text.flush()
+        text.detach()
+    
+    def scan(self, f: BinaryIO, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, int, int]]:
+        """Yield (task_id, offset, length) for each record without building tasks"""
+        for record, offset, length in _scan_task_records(f, chunk_size):
+            yield record["task_id"], offset, length
+    
+    def load(self, f: BinaryIO, chunk_size: int = 1 << 16) -> Iterator[Task]:
+        """Stream tasks one record at a time"""
+        for record, _, _ in _scan_task_records(f, chunk_size):
+            yield Task.from_dict(record)
+    
+    def decode(self, raw: bytes) -> Task:
+        """Build a task from the bytes of one record"""
+        return Task.from_dict(json.loads(raw))
+
+
+class NdjsonCodec:
+    """One JSON task object per line, without a header
+
+    Used for exports and imports rather than snapshots: any line-oriented
+    tool can split or filter the file, and both directions stream.
+    """
+    
+    name = "ndjson"
+    
+    def dump(self, f: BinaryIO, header: Dict[str, Any], tasks: Iterable[Task]) -> None:
+        """Write the tasks, one line each; header fields are not stored"""
+        text = io.TextIOWrapper(f, encoding="utf-8", newline="\n")
+        for task in tasks:
+            text.write(json.dumps(task.to_dict()) + "\n")
+        text.flush()
+        text.detach()
+    
+    def load(self, f: BinaryIO, chunk_size: int = 1 << 16) -> Iterator[Task]:
+        """Stream tasks one line at a time, naming the line of a bad record"""
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield Task.from_dict(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"Invalid task on line {line_number}: {e!r}") from e
+
+
+STATUS_CODES = ["pending", "in_progress", "completed", "cancelled"]
+PRIORITY_CODES = ["low", "medium", "high", "urgent"]
+
+BINARY_MAGIC = b"GTSK"
+BINARY_VERSION = 2
+EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Record layout: status, priority, flags, created/updated/due as epoch
+# microseconds, byte lengths of task_id, title, description and
+# assigned_to, the number of tag dictionary indexes that follow and, from
+# version 2, the task version
+_RECORDS = {1: struct.Struct("<BBBqqqIIIIH"), 2: struct.Struct("<BBBqqqIIIIHI")}
+_RECORD = _RECORDS[BINARY_VERSION]
+_U32 = struct.Struct("<I")
+_HAS_DUE = 0x01
+_HAS_ASSIGNEE = 0x02
+# Records that cannot use the compact layout (e.g. timezone-aware
+# datetimes) are stored as JSON behind this status byte
+_JSON_RECORD = 0xFF
+
+
+class BinaryCodec:
+    """Compact length-prefixed binary format
+    
+    Layout: magic and version, a length-prefixed JSON header, the tag
+    dictionary, then one length-prefixed record per task. Status and
+    priority are one-byte codes, timestamps are epoch microseconds and
+    tags are indexes into the dictionary.
+    """
+    
+    name = "binary"
+    
+    def __init__(self):
+        self._tags: List[str] = []
+        self._record = _RECORD
+    
+    def dump(self, f: BinaryIO, header: Dict[str, Any], tasks: Iterable[Task]) -> None:
+        """Write header fields followed by the tasks"""
+        tasks = list(tasks)
+        tags = sorted({tag for task in tasks for tag in task.tags})
+        tag_codes = {tag: code for code, tag in enumerate(tags)}
+        
+        header_bytes = json.dumps(header).encode("utf-8")
+        f.write(BINARY_MAGIC + bytes([BINARY_VERSION]))
+        f.write(_U32.pack(len(header_bytes)) + header_bytes)
+        f.write(_U32.pack(len(tags)))
+        f.write(b"".join(_U32.pack(len(encoded)) + encoded
+                         for encoded in (tag.encode("utf-8") for tag in tags)))
+        
+        for task in tasks:
+            record = self._encode(task, tag_codes)
+            f.write(_U32.pack(len(record)) + record)
+    
+    def scan(self, f: BinaryIO, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, int, int]]:
+        """Yield (task_id, offset, length) for each record without building tasks"""
+        for raw, offset in self._records(f):
+            if raw[0] == _JSON_RECORD:
+                task_id = json.loads(raw[1:])["task_id"]
+            else:
+                id_length = self._record.unpack_from(raw)[6]
+                task_id = raw[self._record.size:self._record.size + id_length].decode("utf-8")
+            yield task_id, offset, len(raw)
+    
+    def load(self, f: BinaryIO, chunk_size: int = 1 << 16) -> Iterator[Task]:
+        """Stream tasks one record at a time"""
+        for raw, _ in self._records(f):
+            yield self.decode(raw)
+    
+    def decode(self, raw: bytes) -> Task:
+        """Build a task from the bytes of one record"""
+        if raw[0] == _JSON_RECORD:
+            return Task.from_dict(json.loads(raw[1:]))
+            
+        (status, priority, flags, created, updated, due,
+         id_length, title_length, description_length, assignee_length,
+         tag_count, *version) = self._record.unpack_from(raw)
+        position = self._record.size
+        
+        def text(length: int) -> str:
+            nonlocal position
+            value = raw[position:position + length].decode("utf-8")
+            position += length
+            return value
+        
+        task_id = text(id_length)
+        title = text(title_length)
+        description = text(description_length)
+        assigned_to = text(assignee_length) if flags & _HAS_ASSIGNEE else None
+        tags = [self._tags[code] for code in struct.unpack_from(f"<{tag_count}I", raw, position)]
+        
+        return Task(
+            task_id=task_id,
+            title=title,
+            description=description,
+            status=STATUS_CODES[status],
+            priority=PRIORITY_CODES[priority],
+            created_at=EPOCH + created * _MICROSECOND,
+            updated_at=EPOCH + updated * _MICROSECOND,
+            due_date=EPOCH + due * _MICROSECOND if flags & _HAS_DUE else None,
+            assigned_to=assigned_to,
+            tags=tags,
+            version=version[0] if version else 1
+        )
+    
+    def read_header(self, f: BinaryIO) -> Dict[str, Any]:
+        """Read the file header and tag dictionary"""
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError("Not a binary task file")
+        version = f.read(1)[0]
+        if version not in _RECORDS:
+            raise ValueError(f"Unsupported binary task file version: {version}")
+        self._record = _RECORDS[version]
+            
+        header = json.loads(f.read(_U32.unpack(f.read(_U32.size))[0]))
+        tag_count = _U32.unpack(f.read(_U32.size))[0]
+        self._tags = [f.read(_U32.unpack(f.read(_U32.size))[0]).decode("utf-8")
+                      for _ in range(tag_count)]
+        return header
+    
+    def _records(self, f: BinaryIO) -> Iterator[Tuple[bytes, int]]:
+        """Yield (record bytes, offset) for each record after the header"""
+        self.read_header(f)
+        while True:
+            prefix = f.read(_U32.size)
+            if not prefix:
+                return
+            if len(prefix) < _U32.size:
+                raise ValueError("Truncated binary task file")
+            length = _U32.unpack(prefix)[0]
+            offset = f.tell()
+            raw = f.read(length)
+            if len(raw) < length:
+                raise ValueError("Truncated binary task file")
+            yield raw, offset
+    
+    @staticmethod
+    def _encode(task: Task, tag_codes: Dict[str, int]) -> bytes:
+        """Encode one task as a record"""
+        timestamps = [task.created_at, task.updated_at]
+        if task.due_date is not None:
+            timestamps.append(task.due_date)
+        if any(moment.tzinfo is not None for moment in timestamps):
+            return bytes([_JSON_RECORD]) + json.dumps(task.to_dict()).encode("utf-8")
+            
+        flags = 0
+        due = 0
+        if task.due_date is not None:
+            flags |= _HAS_DUE
+            due = (task.due_date - EPOCH) // _MICROSECOND
+        assigned_to = b""
+        if task.assigned_to is not None:
+            flags |= _HAS_ASSIGNEE
+            assigned_to = task.assigned_to.encode("utf-8")
+            
+        task_id = task.task_id.encode("utf-8")
+        title = task.title.encode("utf-8")
+        description = task.description.encode("utf-8")
+        fixed = _RECORD.pack(
+            STATUS_CODES.index(task.status), PRIORITY_CODES.index(task.priority), flags,
+            (task.created_at - EPOCH) // _MICROSECOND, (task.updated_at - EPOCH) // _MICROSECOND,
+            due, len(task_id), len(title), len(description), len(assigned_to), len(task.tags),
+            task.version
+        )
+        tags = struct.pack(f"<{len(task.tags)}I", *(tag_codes[tag] for tag in task.tags))
+        return b"".join((fixed, task_id, title, description, assigned_to, tags))
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec, BinaryCodec)}
+
+
+def get_codec(name: str):
+    """Create a codec by name"""
+    if name not in CODECS:
+        raise ValueError(f"Codec must be one of: {list(CODECS)}")
+    return CODECS[name]()
+
+
+def detect_codec(f: BinaryIO):
+    """Create the codec matching a file's contents, rewinding it afterwards"""
+    magic = f.read(len(BINARY_MAGIC))
+    f.seek(0)
+    return BinaryCodec() if magic == BINARY_MAGIC else JsonCodec()
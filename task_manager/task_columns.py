@@ -0,0 +1,149 @@
+"""
+Task Management System - Columnar Module
+NumPy column arrays over tasks for vectorized analytics
+Collaborative implementation between Agent 1 (writer) and Agent 2 (reviewer/tester)
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from task import Task
+from task_codec import EPOCH, PRIORITY_CODES, STATUS_CODES
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency, only needed for columnar views
+    np = None
+
+
+EPOCH_UTC = EPOCH.replace(tzinfo=timezone.utc)
+# Stored in the due column of tasks without a due date
+NO_DUE_DATE = -(2 ** 63)
+COMPLETED = STATUS_CODES.index("completed")
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _epoch_micros(moment: datetime) -> int:
+    """Microseconds since the epoch; naive datetimes count as wall-clock time"""
+    if moment.tzinfo is None:
+        return (moment - EPOCH) // _MICROSECOND
+    return (moment - EPOCH_UTC) // _MICROSECOND
+
+
+class TaskColumns:
+    """Immutable column arrays describing a set of tasks
+
+    Row ``i`` of every array belongs to ``task_ids[i]``. Status and
+    priority hold indexes into STATUS_CODES and PRIORITY_CODES, assignee
+    holds an index into ``assignees`` (-1 when unassigned) and the time
+    columns hold epoch microseconds.
+    """
+
+    def __init__(self, tasks: Iterable[Task]):
+        if np is None:
+            raise ImportError("Columnar views require numpy: pip install numpy")
+
+        tasks = list(tasks)
+        assignee_codes: Dict[str, int] = {}
+        self.task_ids: List[str] = [task.task_id for task in tasks]
+        self.status = np.fromiter((STATUS_CODES.index(task.status) for task in tasks),
+                                  dtype=np.uint8, count=len(tasks))
+        self.priority = np.fromiter((PRIORITY_CODES.index(task.priority) for task in tasks),
+                                    dtype=np.uint8, count=len(tasks))
+        self.created = np.fromiter((_epoch_micros(task.created_at) for task in tasks),
+                                   dtype=np.int64, count=len(tasks))
+        self.updated = np.fromiter((_epoch_micros(task.updated_at) for task in tasks),
+                                   dtype=np.int64, count=len(tasks))
+        self.due = np.fromiter(
+            (NO_DUE_DATE if task.due_date is None else _epoch_micros(task.due_date)
+             for task in tasks), dtype=np.int64, count=len(tasks))
+        self.assignee = np.fromiter(
+            (-1 if task.assigned_to is None
+             else assignee_codes.setdefault(task.assigned_to, len(assignee_codes))
+             for task in tasks), dtype=np.int32, count=len(tasks))
+        self.assignees: List[str] = list(assignee_codes)
+        self._assignee_codes = assignee_codes
+
+        for column in (self.status, self.priority, self.created, self.updated,
+                       self.due, self.assignee):
+            column.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.task_ids)
+
+    def labels(self, column: str) -> List[Optional[str]]:
+        """Names of the codes used in a categorical column"""
+        if column == "status":
+            return STATUS_CODES
+        if column == "priority":
+            return PRIORITY_CODES
+        if column == "assignee":
+            return self.assignees
+        raise ValueError(f"Not a categorical column: {column}")
+
+    def count_by(self, column: str, mask=None) -> Dict[Optional[str], int]:
+        """Count rows per value of a categorical column"""
+        labels = self.labels(column)
+        codes = getattr(self, column)
+        if mask is not None:
+            codes = codes[mask]
+        if column == "assignee":
+            # Shift so that unassigned (-1) gets its own bin
+            counts = np.bincount(codes + 1, minlength=len(labels) + 1)
+            return {label: int(n) for label, n in zip([None] + labels, counts) if n}
+        counts = np.bincount(codes, minlength=len(labels))
+        return {label: int(n) for label, n in zip(labels, counts) if n}
+
+    def group_counts(self, *columns: str, mask=None) -> Dict[Tuple[Optional[str], ...], int]:
+        """Count rows per combination of categorical column values"""
+        keys = np.zeros(len(self), dtype=np.int64)
+        label_sets = []
+        for column in columns:
+            labels = self.labels(column)
+            codes = getattr(self, column).astype(np.int64)
+            if column == "assignee":
+                labels = [None] + labels
+                codes = codes + 1
+            keys = keys * len(labels) + codes
+            label_sets.append(labels)
+        if mask is not None:
+            keys = keys[mask]
+
+        values, counts = np.unique(keys, return_counts=True)
+        result = {}
+        for value, n in zip(values.tolist(), counts.tolist()):
+            combination = []
+            for labels in reversed(label_sets):
+                value, code = divmod(value, len(labels))
+                combination.append(labels[code])
+            result[tuple(reversed(combination))] = n
+        return result
+
+    def mask(self, status: Optional[str] = None, priority: Optional[str] = None,
+             assigned_to: Optional[str] = None):
+        """Boolean row mask for equality filters on the categorical columns"""
+        selected = np.ones(len(self), dtype=bool)
+        if status is not None:
+            selected &= self.status == STATUS_CODES.index(status)
+        if priority is not None:
+            selected &= self.priority == PRIORITY_CODES.index(priority)
+        if assigned_to is not None:
+            if assigned_to not in self._assignee_codes:
+                return np.zeros(len(self), dtype=bool)
+            selected &= self.assignee == self._assignee_codes[assigned_to]
+        return selected
+
+    def ages(self, now: Optional[datetime] = None):
+        """Seconds elapsed since each task was created"""
+        now_micros = _epoch_micros(now or datetime.now())
+        return (now_micros - self.created) / 1e6
+
+    def overdue_mask(self, now: Optional[datetime] = None):
+        """Rows of open tasks whose due date has passed"""
+        now_micros = _epoch_micros(now or datetime.now())
+        return (self.due != NO_DUE_DATE) & (self.due < now_micros) & (self.status != COMPLETED)
+
+    def overdue_ratio(self, now: Optional[datetime] = None) -> float:
+        """Share of tasks that are overdue"""
+        if not len(self):
+            return 0.0
+        return float(self.overdue_mask(now).mean())
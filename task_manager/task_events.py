@@ -0,0 +1,100 @@
+"""
+Task Management System - Events Module
+Ordered change feed published by TaskStorage
+Collaborative implementation between Agent 1 (writer) and Agent 2 (reviewer/tester)
+"""
+
+from collections import deque
+from dataclasses import dataclass, field, fields
+from itertools import count
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from task import Task
+
+
+# create, update and delete describe one task; reset means the whole
+# state was reloaded from disk and consumers should rescan
+CHANGE_OPS = ("create", "update", "delete", "reset")
+
+TASK_FIELDS = tuple(f.name for f in fields(Task) if f.name != "task_id")
+
+
+@dataclass
+class ChangeEvent:
+    """One entry of the change feed
+
+    ``task`` is the live task object (for deletes, the task as it was
+    removed), so it may already reflect later changes; ``changes`` maps
+    each field an update modified to its (old, new) values.
+    """
+    sequence: int
+    op: str
+    task_id: Optional[str] = None
+    task: Optional[Task] = None
+    changes: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)
+
+
+def diff_tasks(old: Task, new: Task) -> Dict[str, Tuple[Any, Any]]:
+    """Fields whose values differ between two versions of a task"""
+    changes = {}
+    for name in TASK_FIELDS:
+        before, after = getattr(old, name), getattr(new, name)
+        if before != after:
+            changes[name] = (before, after)
+    return changes
+
+
+class ChangeFeed:
+    """Sequence numbering, bounded history and subscribers of a change feed"""
+
+    def __init__(self, history: int = 1000):
+        if history < 0:
+            raise ValueError("History size cannot be negative")
+        self.sequence = 0
+        self.history: Deque[ChangeEvent] = deque(maxlen=history)
+        self._subscribers: Dict[int, Callable[[ChangeEvent], None]] = {}
+        self._subscription_ids = count(1)
+
+    @property
+    def subscribed(self) -> bool:
+        """Whether any callback is registered"""
+        return bool(self._subscribers)
+
+    def publish(self, op: str, task_id: Optional[str] = None, task: Optional[Task] = None,
+                changes: Optional[Dict[str, Tuple[Any, Any]]] = None) -> ChangeEvent:
+        """Number an event, keep it in the history and notify subscribers"""
+        self.sequence += 1
+        event = ChangeEvent(self.sequence, op, task_id, task, changes or {})
+        self.history.append(event)
+        for callback in list(self._subscribers.values()):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in change subscriber: {e}")
+        return event
+
+    def since(self, sequence: int) -> List[ChangeEvent]:
+        """Events after a sequence number, oldest first
+
+        Raises ValueError when events after it have already left the
+        history, in which case the consumer has to rescan.
+        """
+        if sequence > self.sequence:
+            raise ValueError(f"Sequence {sequence} is ahead of the feed ({self.sequence})")
+        first = self.history[0].sequence if self.history else self.sequence + 1
+        if sequence + 1 < first:
+            raise ValueError(f"Change history no longer reaches back to sequence {sequence}")
+        return [event for event in self.history if event.sequence > sequence]
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None],
+                  since: Optional[int] = None) -> int:
+        """Register a callback, first replaying events after ``since``"""
+        backlog = [] if since is None else self.since(since)
+        for event in backlog:
+            callback(event)
+        subscription = next(self._subscription_ids)
+        self._subscribers[subscription] = callback
+        return subscription
+
+    def unsubscribe(self, subscription: int) -> bool:
+        """Remove a callback; False if it was not subscribed"""
+        return self._subscribers.pop(subscription, None) is not None
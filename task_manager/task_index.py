@@ -0,0 +1,400 @@
+"""
+Task Management System - Index Module
+In-memory secondary indexes maintained by TaskStorage
+Collaborative implementation between Agent 1 (writer) and Agent 2 (reviewer/tester)
+"""
+
+import re
+from bisect import bisect_left, insort
+from math import ceil
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+# Single-valued task fields with a hash index; tags get an inverted index
+INDEXED_FIELDS = ("status", "priority", "assigned_to")
+
+EMPTY_IDS: FrozenSet[str] = frozenset()
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Sorts after every task id, to bisect past all entries sharing a due date
+_LAST_ID = "\U0010ffff"
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class FieldIndex:
+    """Hash index mapping a field value to the set of task ids holding it"""
+
+    def __init__(self):
+        self.postings: Dict[Any, Set[str]] = {}
+
+    def add(self, value: Any, task_id: str) -> None:
+        """Record that a task holds a value"""
+        self.postings.setdefault(value, set()).add(task_id)
+
+    def add_many(self, values: Iterable[Any], task_id: str) -> None:
+        """Record every value of a multi-valued field such as tags"""
+        for value in values:
+            self.add(value, task_id)
+
+    def discard(self, value: Any, task_id: str) -> None:
+        """Forget that a task holds a value"""
+        task_ids = self.postings.get(value)
+        if task_ids is None:
+            return
+        task_ids.discard(task_id)
+        if not task_ids:
+            del self.postings[value]
+
+    def discard_many(self, values: Iterable[Any], task_id: str) -> None:
+        """Forget every value of a multi-valued field"""
+        for value in values:
+            self.discard(value, task_id)
+
+    def lookup(self, value: Any) -> Set[str]:
+        """Ids of tasks holding a value; the returned set must not be mutated
+
+        Raises TypeError for unhashable values, which callers treat as
+        "not answerable by this index".
+        """
+        return self.postings.get(value, EMPTY_IDS)
+
+    def lookup_any(self, values: Iterable[Any]) -> Set[str]:
+        """Ids of tasks holding at least one of the values"""
+        result: Set[str] = set()
+        for value in values:
+            result |= self.lookup(value)
+        return result
+
+    def counts(self) -> Dict[Any, int]:
+        """Number of tasks per indexed value"""
+        return {value: len(task_ids) for value, task_ids in self.postings.items()}
+
+    def clear(self) -> None:
+        """Drop all postings"""
+        self.postings.clear()
+
+
+class TextIndex:
+    """Inverted index mapping word tokens to the set of task ids containing them
+
+    A sorted vocabulary is kept alongside the postings so that prefix
+    queries resolve with a binary search instead of a vocabulary scan.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        self.vocabulary: List[str] = []
+        self._task_tokens: Dict[str, FrozenSet[str]] = {}
+
+    def add(self, task_id: str, texts: Iterable[str]) -> None:
+        """Index the tokens of all texts belonging to a task"""
+        tokens = frozenset(token for text in texts for token in tokenize(text))
+        self._task_tokens[task_id] = tokens
+        for token in tokens:
+            task_ids = self.postings.get(token)
+            if task_ids is None:
+                task_ids = self.postings[token] = set()
+                insort(self.vocabulary, token)
+            task_ids.add(task_id)
+
+    def remove(self, task_id: str) -> None:
+        """Remove a task using the tokens recorded when it was added"""
+        for token in self._task_tokens.pop(task_id, ()):
+            task_ids = self.postings[token]
+            task_ids.discard(task_id)
+            if not task_ids:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+
+    def search(self, query: str, prefix: bool = True) -> Optional[Set[str]]:
+        """Ids of tasks containing every query term
+
+        With ``prefix`` each term also matches longer tokens starting with
+        it. Returns None when the query has no tokens to look up.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return None
+
+        term_sets = [self._lookup_prefix(term) if prefix else self.postings.get(term, EMPTY_IDS)
+                     for term in terms]
+        term_sets.sort(key=len)
+        task_ids = term_sets[0]
+        for other in term_sets[1:]:
+            if not task_ids:
+                break
+            task_ids = task_ids & other
+        return task_ids
+
+    def _lookup_prefix(self, term: str) -> Set[str]:
+        """Union of the postings of every token starting with term"""
+        start = bisect_left(self.vocabulary, term)
+        end = bisect_left(self.vocabulary, term + "\U0010ffff", start)
+        if end - start == 1:
+            return self.postings[self.vocabulary[start]]
+
+        task_ids: Set[str] = set()
+        for token in self.vocabulary[start:end]:
+            task_ids |= self.postings[token]
+        return task_ids
+
+    def clear(self) -> None:
+        """Drop all postings"""
+        self.postings.clear()
+        self.vocabulary.clear()
+        self._task_tokens.clear()
+
+
+def _word_trigrams(word: str) -> Set[str]:
+    """Trigrams of one lowercase word padded with two spaces before and one after"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Padded character trigrams of the words in text, as in pg_trgm"""
+    grams: Set[str] = set()
+    for word in tokenize(text):
+        grams |= _word_trigrams(word)
+    return frozenset(grams)
+
+
+def substring_trigrams(text: str) -> FrozenSet[str]:
+    """Unpadded trigrams that any text containing text as a substring holds"""
+    return frozenset(word[i:i + 3] for word in tokenize(text) for i in range(len(word) - 2))
+
+
+def similarity(query: str, text: str) -> float:
+    """Trigram similarity of query to text or to its closest run of words
+
+    Jaccard similarity of the trigram sets, taking the best of the whole
+    text and every run of as many words as the query has, so that a short
+    query is not penalised for matching inside a long title.
+    """
+    return text_similarity(trigrams(query), len(tokenize(query)), text)
+
+
+def text_similarity(query_grams: FrozenSet[str], width: int, text: str) -> float:
+    """similarity() for a query whose trigrams and word count are known"""
+    if not query_grams:
+        return 0.0
+    word_grams = [_word_trigrams(word) for word in tokenize(text)]
+    windows = [set().union(*word_grams)]
+    if len(word_grams) > width:
+        windows.extend(set().union(*word_grams[start:start + width])
+                       for start in range(len(word_grams) - width + 1))
+
+    best = 0.0
+    for grams in windows:
+        shared = len(query_grams & grams)
+        if shared:
+            best = max(best, shared / (len(query_grams) + len(grams) - shared))
+    return best
+
+
+class TrigramIndex:
+    """Inverted index mapping character trigrams to the task ids holding them
+
+    Meant for short texts such as titles and tag names. Texts reaching a
+    similarity threshold ``t`` share at least ``ceil(t * n)`` of the
+    query's ``n`` trigrams, so each must hold one of its
+    ``n - ceil(t * n) + 1`` rarest trigrams: only those postings are read
+    (prefix filtering), then ids sharing too few trigrams are dropped.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        self._task_grams: Dict[str, FrozenSet[str]] = {}
+
+    def add(self, task_id: str, texts: Iterable[str]) -> None:
+        """Index the trigrams of all texts belonging to a task"""
+        # Padded trigrams rank fuzzy matches, inner ones find substrings
+        grams = frozenset(f"  {word} "[i:i + 3] for text in texts
+                          for word in tokenize(text) for i in range(len(word) + 1))
+        self._task_grams[task_id] = grams
+        postings = self.postings
+        for gram in grams:
+            task_ids = postings.get(gram)
+            if task_ids is None:
+                task_ids = postings[gram] = set()
+            task_ids.add(task_id)
+
+    def remove(self, task_id: str) -> None:
+        """Remove a task using the trigrams recorded when it was added"""
+        for gram in self._task_grams.pop(task_id, ()):
+            task_ids = self.postings[gram]
+            task_ids.discard(task_id)
+            if not task_ids:
+                del self.postings[gram]
+
+    def similar(self, query: str, threshold: float) -> Set[str]:
+        """Ids of tasks that may reach threshold similarity to query"""
+        grams = trigrams(query)
+        if not grams:
+            return set()
+        required = max(1, ceil(threshold * len(grams) - 1e-9))
+        if required > len(grams):
+            return set()
+        ranked = sorted(grams, key=lambda gram: len(self.postings.get(gram, EMPTY_IDS)))
+        seen: Set[str] = set()
+        for gram in ranked[:len(grams) - required + 1]:
+            seen |= self.postings.get(gram, EMPTY_IDS)
+        return {task_id for task_id in seen
+                if len(grams & self._task_grams[task_id]) >= required}
+
+    def containing(self, query: str) -> Optional[Set[str]]:
+        """Ids of tasks whose texts may contain query as a substring
+
+        Returns None when the query has no word of three characters or
+        more, and so cannot be narrowed down by trigrams.
+        """
+        grams = substring_trigrams(query)
+        if not grams:
+            return None
+        term_sets = sorted((self.postings.get(gram, EMPTY_IDS) for gram in grams), key=len)
+        task_ids = set(term_sets[0])
+        for other in term_sets[1:]:
+            if not task_ids:
+                break
+            task_ids &= other
+        return task_ids
+
+    def clear(self) -> None:
+        """Drop all postings"""
+        self.postings.clear()
+        self._task_grams.clear()
+
+
+class DueDateIndex:
+    """Sorted (due_date, task_id) entries for open tasks with a due date
+
+    Overdue and due-soon queries become a binary search plus a slice of
+    the matching range.
+    """
+
+    def __init__(self):
+        self.entries: List[Tuple[datetime, str]] = []
+
+    def add(self, due_date: datetime, task_id: str) -> None:
+        """Insert a task at its due date"""
+        insort(self.entries, (due_date, task_id))
+
+    def load(self, entries: List[Tuple[datetime, str]]) -> None:
+        """Replace all entries in one sort, for bulk index builds"""
+        entries.sort()
+        self.entries = entries
+
+    def discard(self, due_date: datetime, task_id: str) -> None:
+        """Remove a task previously added with this due date"""
+        entry = (due_date, task_id)
+        position = bisect_left(self.entries, entry)
+        if position < len(self.entries) and self.entries[position] == entry:
+            del self.entries[position]
+
+    def before(self, moment: datetime) -> List[str]:
+        """Ids of tasks due strictly before moment, earliest first"""
+        end = bisect_left(self.entries, (moment,))
+        return [task_id for _, task_id in self.entries[:end]]
+
+    def between(self, start: datetime, end: datetime) -> List[str]:
+        """Ids of tasks due in [start, end), earliest first"""
+        first = bisect_left(self.entries, (start,))
+        last = bisect_left(self.entries, (end,), first)
+        return [task_id for _, task_id in self.entries[first:last]]
+
+    def scan(self, lower: Optional[datetime] = None, upper: Optional[datetime] = None,
+             include_lower: bool = True, include_upper: bool = False,
+             reverse: bool = False) -> Iterator[Tuple[datetime, str]]:
+        """Lazily walk the entries between two optional bounds
+
+        Entries come earliest first, or latest first with ``reverse``. The
+        index must not change while the iterator is in use.
+        """
+        first = 0
+        if lower is not None:
+            first = bisect_left(self.entries, (lower,) if include_lower else (lower, _LAST_ID))
+        last = len(self.entries)
+        if upper is not None:
+            last = bisect_left(self.entries, (upper, _LAST_ID) if include_upper else (upper,))
+
+        positions = range(last - 1, first - 1, -1) if reverse else range(first, last)
+        for position in positions:
+            yield self.entries[position]
+
+    def count_before(self, moment: datetime) -> int:
+        """Number of tasks due strictly before moment"""
+        return bisect_left(self.entries, (moment,))
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        self.entries.clear()
+
+
+class StorageOrder:
+    """Task ids sorted by storage position, to resume iteration mid-way
+
+    Positions only grow as tasks are created, so adds are appends.
+    Removals leave a hole that is skipped while walking and squeezed out
+    once holes make up half of the entries.
+    """
+
+    def __init__(self):
+        self.positions: List[int] = []
+        self.task_ids: List[Optional[str]] = []
+        self._holes = 0
+
+    def add(self, position: int, task_id: str) -> None:
+        """Place a task at its position"""
+        if not self.positions or position > self.positions[-1]:
+            self.positions.append(position)
+            self.task_ids.append(task_id)
+            return
+        # Restored by a rollback at its old position
+        index = bisect_left(self.positions, position)
+        if index < len(self.positions) and self.positions[index] == position:
+            self.task_ids[index] = task_id
+            self._holes -= 1
+        else:
+            self.positions.insert(index, position)
+            self.task_ids.insert(index, task_id)
+
+    def load(self, entries: List[Tuple[int, str]]) -> None:
+        """Replace all entries in one sort, for bulk index builds"""
+        entries.sort()
+        self.positions = [position for position, _ in entries]
+        self.task_ids = [task_id for _, task_id in entries]
+        self._holes = 0
+
+    def discard(self, position: int) -> None:
+        """Remove the task at a position"""
+        index = bisect_left(self.positions, position)
+        if index == len(self.positions) or self.positions[index] != position:
+            return
+        if self.task_ids[index] is not None:
+            self.task_ids[index] = None
+            self._holes += 1
+        if self._holes * 2 > len(self.positions):
+            self.load([(position, task_id) for position, task_id
+                       in zip(self.positions, self.task_ids) if task_id is not None])
+
+    def after(self, position: int) -> Iterator[Tuple[int, str]]:
+        """Lazily walk (position, task_id) entries past a position
+
+        The index must not change while the iterator is in use.
+        """
+        for index in range(bisect_left(self.positions, position + 1), len(self.positions)):
+            task_id = self.task_ids[index]
+            if task_id is not None:
+                yield self.positions[index], task_id
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        self.positions.clear()
+        self.task_ids.clear()
+        self._holes = 0
@@ -0,0 +1,186 @@
+"""
+Task Management System - Query Module
+Predicates and ordering for TaskStorage.query
+Collaborative implementation between Agent 1 (writer) and Agent 2 (reviewer/tester)
+"""
+
+from datetime import datetime, timezone
+from functools import cmp_to_key
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
+from task import Task
+from task_codec import EPOCH, PRIORITY_CODES, STATUS_CODES
+
+
+QUERY_FIELDS = ("task_id", "title", "description", "status", "priority",
+                "created_at", "updated_at", "due_date", "assigned_to", "tags")
+
+# ``field__op=value``; a bare ``field=value`` means eq
+QUERY_OPERATORS = ("eq", "ne", "in", "not_in", "lt", "lte", "gt", "gte")
+RANGE_OPERATORS = ("lt", "lte", "gt", "gte")
+RANGE_FIELDS = ("created_at", "updated_at", "due_date")
+
+# Categorical fields sort by rank rather than alphabetically
+FIELD_RANKS = {
+    "status": {status: rank for rank, status in enumerate(STATUS_CODES)},
+    "priority": {priority: rank for rank, priority in enumerate(PRIORITY_CODES)},
+}
+
+# Fields whose sort values can be negated, giving descending tuple keys
+NEGATABLE_FIELDS = RANGE_FIELDS + tuple(FIELD_RANKS)
+
+EPOCH_UTC = EPOCH.replace(tzinfo=timezone.utc)
+
+
+class Predicate:
+    """One ``field__op=value`` condition of a query"""
+
+    __slots__ = ("field", "op", "value")
+
+    def __init__(self, field: str, op: str, value: Any):
+        if field not in QUERY_FIELDS:
+            raise ValueError(f"Cannot query on field: {field}")
+        if op not in QUERY_OPERATORS:
+            raise ValueError(f"Operator must be one of: {list(QUERY_OPERATORS)}")
+        if op in RANGE_OPERATORS:
+            if field not in RANGE_FIELDS:
+                raise ValueError(f"Range operators only apply to: {list(RANGE_FIELDS)}")
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+        if field == "tags" and op == "eq" and isinstance(value, list):
+            # Same meaning as filter_tasks(tags=[...]): any of the tags
+            op = "in"
+        if op in ("in", "not_in"):
+            value = frozenset(value)
+
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"Predicate({self.field}__{self.op}={self.value!r})"
+
+    def matches(self, task: Task) -> bool:
+        """Check the condition against a task"""
+        value = getattr(task, self.field)
+        op = self.op
+
+        if self.field == "tags":
+            if op == "eq":
+                return self.value in value
+            if op == "ne":
+                return self.value not in value
+            found = not self.value.isdisjoint(value)
+            return found if op == "in" else not found
+
+        if op == "eq":
+            return value == self.value
+        if op == "ne":
+            return value != self.value
+        if op == "in":
+            return value in self.value
+        if op == "not_in":
+            return value not in self.value
+        if value is None:
+            return False
+        if op == "lt":
+            return value < self.value
+        if op == "lte":
+            return value <= self.value
+        if op == "gt":
+            return value > self.value
+        return value >= self.value
+
+    def excludes(self, value: Any) -> bool:
+        """Whether no task holding value in this field can match"""
+        if self.op == "eq":
+            return value != self.value
+        if self.op == "ne":
+            return value == self.value
+        if self.op == "in":
+            return value not in self.value
+        if self.op == "not_in":
+            return value in self.value
+        return False
+
+
+def parse_filters(filters: Dict[str, Any]) -> List[Predicate]:
+    """Turn ``field__op=value`` keyword arguments into predicates"""
+    predicates = []
+    for key, value in filters.items():
+        field, _, op = key.partition("__")
+        predicates.append(Predicate(field, op or "eq", value))
+    return predicates
+
+
+def parse_order(order_by: Union[None, str, Iterable[str]]) -> List[Tuple[str, bool]]:
+    """Turn ``order_by`` into (field, descending) pairs"""
+    if order_by is None:
+        return []
+    if isinstance(order_by, str):
+        order_by = [order_by]
+
+    order = []
+    for name in order_by:
+        descending = name.startswith("-")
+        field = name.lstrip("-")
+        if field not in QUERY_FIELDS or field == "tags":
+            raise ValueError(f"Cannot order by field: {field}")
+        order.append((field, descending))
+    return order
+
+
+def _sort_value(task: Task, field: str) -> Any:
+    """Value of a task field as it takes part in ordering"""
+    value = getattr(task, field)
+    ranks = FIELD_RANKS.get(field)
+    return value if ranks is None or value is None else ranks[value]
+
+
+def _negated(value: Any) -> Any:
+    """Value that sorts in the opposite order"""
+    if isinstance(value, datetime):
+        return (EPOCH_UTC if value.tzinfo else EPOCH) - value
+    return -value
+
+
+def _key_part(field: str, descending: bool) -> Callable[[Task], tuple]:
+    """Tuple key for one field, with None last"""
+    ranks = FIELD_RANKS.get(field)
+
+    def part(task: Task) -> tuple:
+        value = getattr(task, field)
+        if value is None:
+            return (True, None)
+        if ranks is not None:
+            value = ranks[value]
+        return (False, _negated(value) if descending else value)
+    return part
+
+
+def order_key(order: List[Tuple[str, bool]]) -> Callable[[Task], Any]:
+    """Sort key for an order spec
+
+    Missing values (None) sort last in either direction and ties are
+    broken by task_id, so every ordering is total and repeatable. Plain
+    tuple keys are used unless a descending field cannot be negated.
+    """
+    if all(not descending or field in NEGATABLE_FIELDS for field, descending in order):
+        parts = [_key_part(field, descending) for field, descending in order]
+        if len(parts) == 1:
+            part = parts[0]
+            return lambda task: (part(task), task.task_id)
+        return lambda task: tuple(part(task) for part in parts) + (task.task_id,)
+
+    def compare(a: Task, b: Task) -> int:
+        for field, descending in order:
+            x, y = _sort_value(a, field), _sort_value(b, field)
+            if x == y:
+                continue
+            if x is None:
+                return 1
+            if y is None:
+                return -1
+            result = -1 if x < y else 1
+            return -result if descending else result
+        return (a.task_id > b.task_id) - (a.task_id < b.task_id)
+    return cmp_to_key(compare)
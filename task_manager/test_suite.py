@@ -9,16 +9,28 @@ import unittest
 import tempfile
 import os
 import json
+import asyncio
+import multiprocessing
+import random
 import shutil
-from datetime import datetime, timedelta
+import sqlite3
+import struct
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch, mock_open
 
 # Import the modules to test
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from task import Task
-from storage import TaskStorage
+from task import Task, VersionConflictError
+import storage as storage_module
+from storage import CommitError, TaskStorage, ShardedTaskStorage, LazyTaskMap, TaskSnapshot, iter_tasks_from_file
+from sqlite_storage import SqliteTaskStorage
+from async_storage import AsyncTaskStorage
+from task_backup import read_backup_header
+from task_columns import np as numpy
 from manager import AgentCollaborator, AgentInfo
 
 
@@ -234,6 +246,1888 @@ class TestTaskStorage(unittest.TestCase):
         self.assertTrue(os.path.exists(backup_file))
 
 
+class TestTaskStorageIndexes(unittest.TestCase):
+    """Test cases for TaskStorage secondary indexes"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = TaskStorage(os.path.join(self.temp_dir, "index_tasks.json"))
+        self.tasks = [
+            Task(title="API design", priority="high", assigned_to="alice", tags=["api"]),
+            Task(title="API tests", priority="high", assigned_to="bob", tags=["api", "qa"]),
+            Task(title="Release notes", priority="low", assigned_to="alice", tags=["docs"]),
+        ]
+        for task in self.tasks:
+            self.storage.create_task(task)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_indexed_filters(self):
+        """Test multi-field filters answered from the indexes"""
+        results = self.storage.filter_tasks(priority="high", assigned_to="alice")
+        self.assertEqual(results, [self.tasks[0]])
+        self.assertEqual(self.storage.filter_tasks(tags=["qa", "docs"]),
+                         [self.tasks[1], self.tasks[2]])
+        self.assertEqual(self.storage.filter_tasks(assigned_to="carol"), [])
+    
+    def test_indexes_follow_updates_and_deletes(self):
+        """Test that indexes stay current through update and delete"""
+        first, second, _ = self.tasks
+        self.storage.update_task(first.task_id, {"status": "completed", "tags": ["done"]})
+        self.storage.delete_task(second.task_id)
+        
+        self.assertEqual(self.storage.get_tasks_by_status("completed"), [first])
+        self.assertEqual(self.storage.filter_tasks(tags="api"), [])
+        self.assertEqual(self.storage.get_tasks_by_priority("high"), [first])
+    
+    def test_failed_update_keeps_task_indexed(self):
+        """Test that an update with an invalid value changes nothing"""
+        first = self.tasks[0]
+        first.due_date = datetime.now() - timedelta(days=1)
+        self.storage.update_task(first.task_id, {"due_date": first.due_date})
+        
+        with self.assertRaises(ValueError):
+            self.storage.update_task(first.task_id, {"status": "in_progress", "due_date": "not-a-date"})
+        
+        self.assertEqual(first.status, "pending")
+        self.assertEqual(first.version, 2)
+        self.assertEqual(self.storage.filter_tasks(status="pending", assigned_to="alice"),
+                         [first, self.tasks[2]])
+        self.assertEqual(self.storage.get_statistics()["by_status"], {"pending": 3})
+        self.assertEqual(self.storage.get_overdue_tasks(), [first])
+    
+    def test_indexes_rebuilt_on_load(self):
+        """Test that reloading rebuilds the indexes in storage order"""
+        reopened = TaskStorage(self.storage.storage_file)
+        results = reopened.filter_tasks(assigned_to="alice")
+        self.assertEqual([t.task_id for t in results],
+                         [self.tasks[0].task_id, self.tasks[2].task_id])
+    
+    def test_non_indexed_filters(self):
+        """Test that filters on other fields still work"""
+        results = self.storage.filter_tasks(title="API tests", priority="high")
+        self.assertEqual(results, [self.tasks[1]])
+        self.assertEqual(len(self.storage.filter_tasks(title="Release notes")), 1)
+
+
+class TestTaskStorageDueDateIndex(unittest.TestCase):
+    """Test cases for the TaskStorage due-date index"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = TaskStorage(os.path.join(self.temp_dir, "due_tasks.json"))
+        self.now = datetime.now()
+        self.late = Task(title="Late", due_date=self.now - timedelta(days=2))
+        self.later = Task(title="Later", due_date=self.now - timedelta(hours=1))
+        self.soon = Task(title="Soon", due_date=self.now + timedelta(hours=3))
+        self.far = Task(title="Far", due_date=self.now + timedelta(days=5))
+        self.done = Task(title="Done", status="completed", due_date=self.now - timedelta(days=1))
+        for task in (self.later, self.soon, self.far, self.done, self.late):
+            self.storage.create_task(task)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_overdue_tasks(self):
+        """Test overdue lookup ordered by due date, excluding completed tasks"""
+        self.assertEqual(self.storage.get_overdue_tasks(), [self.late, self.later])
+        self.assertEqual(self.storage.get_statistics()["overdue_tasks"], 2)
+    
+    def test_tasks_due_within(self):
+        """Test range lookup of tasks due in the next hours"""
+        self.assertEqual(self.storage.get_tasks_due_within(24, now=self.now), [self.soon])
+        self.assertEqual(self.storage.get_tasks_due_within(24 * 7, now=self.now),
+                         [self.soon, self.far])
+    
+    def test_index_follows_updates(self):
+        """Test completing, reopening and rescheduling tasks"""
+        self.storage.update_task(self.late.task_id, {"status": "completed"})
+        self.storage.update_task(self.done.task_id, {"status": "pending"})
+        self.storage.update_task(self.far.task_id, {"due_date": self.now - timedelta(days=3)})
+        self.storage.delete_task(self.later.task_id)
+        
+        self.assertEqual(self.storage.get_overdue_tasks(), [self.far, self.done])
+
+
+class TestTaskStorageStatistics(unittest.TestCase):
+    """Test cases for incrementally maintained TaskStorage statistics"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = TaskStorage(os.path.join(self.temp_dir, "stats_tasks.json"))
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_statistics_follow_mutations(self):
+        """Test counters through create, update and delete"""
+        first = Task(title="First", priority="high")
+        second = Task(title="Second")
+        self.storage.create_task(first)
+        self.storage.create_task(second)
+        self.storage.update_task(first.task_id, {"status": "completed"})
+        self.storage.delete_task(second.task_id)
+        
+        stats = self.storage.get_statistics()
+        self.assertEqual(stats, {
+            "total_tasks": 1,
+            "by_status": {"completed": 1},
+            "by_priority": {"high": 1},
+            "overdue_tasks": 0
+        })
+    
+    def test_snapshot_does_not_scan_tasks(self):
+        """Test that the snapshot reads counters rather than task objects"""
+        self.storage.create_task(Task(title="Counted", status="in_progress"))
+        generation = self.storage.generation
+        
+        with patch.object(Task, "is_overdue", side_effect=AssertionError("scanned")):
+            snapshot = self.storage.get_statistics_snapshot()
+        self.assertEqual(snapshot["generation"], generation)
+        self.assertEqual(snapshot["by_status"], {"in_progress": 1})
+        
+        self.storage.delete_task(next(iter(self.storage.tasks)))
+        self.assertGreater(self.storage.get_statistics_snapshot()["generation"], generation)
+        self.assertEqual(self.storage.get_statistics(), {"total_tasks": 0})
+
+
+class TestTaskStorageFullTextIndex(unittest.TestCase):
+    """Test cases for the TaskStorage full-text index"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = TaskStorage(os.path.join(self.temp_dir, "text_tasks.json"),
+                                   full_text_index=True)
+        self.login = Task(title="Fix login bug", description="Session expires early",
+                          tags=["Backend"])
+        self.docs = Task(title="Write login docs", tags=["documentation"])
+        self.storage.create_task(self.login)
+        self.storage.create_task(self.docs)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_multi_term_and_prefix_search(self):
+        """Test AND semantics across terms and prefix matching"""
+        self.assertEqual(self.storage.search_tasks("login"), [self.login, self.docs])
+        self.assertEqual(self.storage.search_tasks("LOGIN sess"), [self.login])
+        self.assertEqual(self.storage.search_tasks("doc"), [self.docs])
+        self.assertEqual(self.storage.search_tasks("backend"), [self.login])
+        self.assertEqual(self.storage.search_tasks("login missing"), [])
+    
+    def test_index_follows_mutations(self):
+        """Test that the token index is maintained on update and delete"""
+        self.storage.update_task(self.login.task_id, {"title": "Fix signup bug"})
+        self.storage.delete_task(self.docs.task_id)
+        
+        self.assertEqual(self.storage.search_tasks("login"), [])
+        self.assertEqual(self.storage.search_tasks("signup"), [self.login])
+        self.assertNotIn("documentation", self.storage._text_index.vocabulary)
+    
+    def test_query_without_tokens_falls_back(self):
+        """Test that queries without word tokens use the substring scan"""
+        self.assertEqual(len(self.storage.search_tasks("")), 2)
+
+
+class TestTaskStorageJournal(unittest.TestCase):
+    """Test cases for TaskStorage journal mode"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "journal_tasks.json")
+        self.storage = TaskStorage(self.storage_file, journal=True)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_mutations_append_to_journal(self):
+        """Test that mutations append records instead of rewriting the snapshot"""
+        task = Task(title="Journaled Task")
+        self.storage.create_task(task)
+        self.storage.update_task(task.task_id, {"status": "in_progress"})
+        
+        self.assertFalse(os.path.exists(self.storage_file))
+        with open(self.storage.journal_file, 'r') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r["op"] for r in records], ["create", "update"])
+    
+    def test_journal_replay_on_load(self):
+        """Test that reopening the storage replays the journal"""
+        kept = Task(title="Kept Task")
+        dropped = Task(title="Dropped Task")
+        self.storage.create_task(kept)
+        self.storage.create_task(dropped)
+        self.storage.update_task(kept.task_id, {"priority": "high"})
+        self.storage.delete_task(dropped.task_id)
+        
+        reopened = TaskStorage(self.storage_file, journal=True)
+        self.assertEqual(list(reopened.tasks), [kept.task_id])
+        self.assertEqual(reopened.get_task(kept.task_id).priority, "high")
+    
+    def test_journal_ignores_torn_record(self):
+        """Test that a partially written trailing record is ignored"""
+        task = Task(title="Durable Task")
+        self.storage.create_task(task)
+        with open(self.storage.journal_file, 'a') as f:
+            f.write('{"op": "create", "task_id": "tor')
+        
+        reopened = TaskStorage(self.storage_file, journal=True)
+        self.assertEqual(list(reopened.tasks), [task.task_id])
+        
+        # New records must not be glued onto the discarded fragment
+        later = Task(title="Later Task")
+        reopened.create_task(later)
+        self.assertEqual(len(TaskStorage(self.storage_file, journal=True).tasks), 2)
+    
+    def test_compaction(self):
+        """Test that the journal is compacted into the snapshot"""
+        storage = TaskStorage(self.storage_file, journal=True, compact_threshold=3)
+        tasks = [Task(title=f"Task {i}") for i in range(3)]
+        for task in tasks:
+            storage.create_task(task)
+        
+        self.assertTrue(os.path.exists(self.storage_file))
+        self.assertEqual(os.path.getsize(storage.journal_file), 0)
+        reopened = TaskStorage(self.storage_file, journal=True)
+        self.assertEqual(len(reopened.tasks), 3)
+    
+    def test_reopen_without_journal_mode(self):
+        """Test that a store reopened without journal mode keeps journaled changes"""
+        task = Task(title="Journaled Task")
+        self.storage.create_task(task)
+        self.storage.update_task(task.task_id, {"title": "Updated"})
+        
+        reopened = TaskStorage(self.storage_file)
+        self.assertEqual(reopened.get_task(task.task_id).title, "Updated")
+        self.assertFalse(os.path.exists(self.storage.journal_file))
+        
+        # The stale records must not come back over newer data
+        reopened.update_task(task.task_id, {"title": "Newer"})
+        again = TaskStorage(self.storage_file, journal=True)
+        self.assertEqual(again.get_task(task.task_id).title, "Newer")
+
+
+class TestTaskStorageTransactions(unittest.TestCase):
+    """Test cases for TaskStorage batch and transaction API"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "tx_tasks.json")
+        self.storage = TaskStorage(self.storage_file)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_batch_methods_write_once(self):
+        """Test that each batch call produces exactly one snapshot write"""
+        tasks = [Task(title=f"Batch {i}") for i in range(5)]
+        with patch.object(self.storage, "save_tasks", wraps=self.storage.save_tasks) as save:
+            self.assertEqual(self.storage.create_many(tasks + tasks[:1]), 5)
+            self.assertEqual(save.call_count, 1)
+            
+            updates = {task.task_id: {"status": "completed"} for task in tasks[:3]}
+            self.assertEqual(self.storage.update_many(updates), 3)
+            self.assertEqual(self.storage.delete_many([tasks[4].task_id, "missing"]), 1)
+            self.assertEqual(save.call_count, 3)
+        
+        reopened = TaskStorage(self.storage_file)
+        self.assertEqual(len(reopened.tasks), 4)
+        self.assertEqual(len(reopened.get_tasks_by_status("completed")), 3)
+    
+    def test_journal_batch_is_one_append(self):
+        """Test that a journaled transaction is appended in one write"""
+        storage = TaskStorage(self.storage_file, journal=True)
+        task = Task(title="Journaled")
+        with storage.transaction():
+            storage.create_task(task)
+            storage.update_task(task.task_id, {"priority": "urgent"})
+            self.assertFalse(os.path.exists(storage.journal_file))
+        
+        with open(storage.journal_file, 'r') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["task"]["priority"], "urgent")
+    
+    def test_rollback_on_exception(self):
+        """Test that an exception restores the in-memory state"""
+        kept = Task(title="Kept", tags=["a"])
+        doomed = Task(title="Doomed")
+        self.storage.create_many([kept, doomed])
+        
+        with self.assertRaises(RuntimeError):
+            with self.storage.transaction():
+                self.storage.update_task(kept.task_id, {"title": "Changed", "tags": ["b"]})
+                self.storage.delete_task(doomed.task_id)
+                self.storage.create_task(Task(title="Never"))
+                raise RuntimeError("abort")
+        
+        self.assertEqual(self.storage.get_all_tasks(), [kept, doomed])
+        self.assertIs(self.storage.get_task(kept.task_id), kept)
+        self.assertEqual(kept.title, "Kept")
+        self.assertEqual(self.storage.filter_tasks(tags="a"), [kept])
+        self.assertEqual(self.storage.filter_tasks(tags="b"), [])
+        self.assertEqual(len(TaskStorage(self.storage_file).tasks), 2)
+    
+    def test_nested_rollback(self):
+        """Test that a failed inner transaction keeps the outer changes"""
+        outer = Task(title="Outer")
+        with self.storage.transaction():
+            self.storage.create_task(outer)
+            try:
+                with self.storage.transaction():
+                    self.storage.update_task(outer.task_id, {"title": "Inner"})
+                    raise ValueError("inner")
+            except ValueError:
+                pass
+        
+        reopened = TaskStorage(self.storage_file)
+        self.assertEqual(reopened.get_task(outer.task_id).title, "Outer")
+    
+    def test_failed_commit_raises_and_rolls_back(self):
+        """Test that a transaction whose write fails raises and keeps nothing"""
+        kept = Task(title="Kept")
+        self.storage.create_task(kept)
+        events = []
+        self.storage.subscribe(events.append)
+        
+        with patch.object(self.storage, "_write_snapshot", side_effect=OSError("disk full")):
+            with self.assertRaises(CommitError):
+                with self.storage.transaction():
+                    self.storage.update_task(kept.task_id, {"title": "Changed"})
+                    self.storage.create_task(Task(title="Lost"))
+            self.assertEqual(self.storage.create_many([Task(title="Also lost")]), 0)
+        
+        self.assertEqual([task.title for task in self.storage.get_all_tasks()], ["Kept"])
+        self.assertEqual(events, [])
+        self.assertEqual(self.storage.create_many([Task(title="Written")]), 1)
+        self.assertEqual([task.title for task in TaskStorage(self.storage_file).get_all_tasks()],
+                         ["Kept", "Written"])
+
+
+class TestTaskStorageDurability(unittest.TestCase):
+    """Test cases for TaskStorage durability policies and write-behind"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "durable_tasks.json")
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_invalid_policy(self):
+        """Test that unknown durability policies are rejected"""
+        with self.assertRaises(ValueError):
+            TaskStorage(self.storage_file, durability="sometimes")
+    
+    def test_interval_defers_writes_until_flush(self):
+        """Test that interval mode acknowledges in memory and writes on flush"""
+        storage = TaskStorage(self.storage_file, durability="interval", flush_interval=60)
+        try:
+            task = Task(title="Deferred")
+            self.assertTrue(storage.create_task(task))
+            self.assertFalse(os.path.exists(self.storage_file))
+            
+            self.assertTrue(storage.flush())
+            self.assertIn(task.task_id, TaskStorage(self.storage_file).tasks)
+        finally:
+            storage.close()
+    
+    def test_interval_threshold_triggers_background_flush(self):
+        """Test that reaching the dirty threshold wakes the writer thread"""
+        storage = TaskStorage(self.storage_file, journal=True, durability="interval",
+                              flush_interval=60, flush_threshold=2)
+        try:
+            storage.create_task(Task(title="One"))
+            storage.create_task(Task(title="Two"))
+            deadline = time.time() + 5
+            while storage._pending_ids and time.time() < deadline:
+                time.sleep(0.01)
+            with storage._lock:
+                self.assertEqual(len(TaskStorage(self.storage_file, journal=True).tasks), 2)
+        finally:
+            storage.close()
+    
+    def test_close_flushes_pending_writes(self):
+        """Test that closing the storage writes pending mutations"""
+        storage = TaskStorage(self.storage_file, durability="interval", flush_interval=60)
+        storage.create_task(Task(title="Last words"))
+        storage.close()
+        self.assertEqual(len(TaskStorage(self.storage_file).tasks), 1)
+    
+    def test_failed_snapshot_keeps_previous_file(self):
+        """Test that an interrupted snapshot write leaves the old file intact"""
+        storage = TaskStorage(self.storage_file)
+        storage.create_task(Task(title="Survivor"))
+        
+        with patch("storage.json.dump", side_effect=OSError("disk full")):
+            self.assertFalse(storage.create_task(Task(title="Lost")))
+            self.assertFalse(storage.backup_tasks(os.path.join(self.temp_dir, "backup.json")))
+        
+        self.assertEqual(len(TaskStorage(self.storage_file).tasks), 1)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["durable_tasks.json"])
+    
+    def test_snapshot_follows_current_umask(self):
+        """Test that snapshots get the permissions of the umask at write time"""
+        storage = TaskStorage(self.storage_file)
+        previous = os.umask(0o027)
+        try:
+            storage.create_task(Task(title="Private"))
+        finally:
+            os.umask(previous)
+        self.assertEqual(os.stat(self.storage_file).st_mode & 0o777, 0o640)
+    
+    def test_always_policy_syncs_directory(self):
+        """Test that atomic renames are made durable under the always policy"""
+        storage = TaskStorage(self.storage_file, durability="always")
+        with patch("storage.os.fsync") as fsync:
+            storage.create_task(Task(title="Renamed"))
+        # The snapshot file and its directory
+        self.assertEqual(fsync.call_count, 2)
+    
+    def test_always_policy_fsyncs(self):
+        """Test that the always policy forces writes to disk"""
+        storage = TaskStorage(self.storage_file, journal=True, durability="always")
+        with patch("storage.os.fsync") as fsync:
+            storage.create_task(Task(title="Synced"))
+        self.assertTrue(fsync.called)
+        
+        buffered = TaskStorage(self.storage_file, journal=True)
+        with patch("storage.os.fsync") as fsync:
+            buffered.create_task(Task(title="Buffered"))
+        self.assertFalse(fsync.called)
+
+
+class TestTaskStorageStreamingLoad(unittest.TestCase):
+    """Test cases for streaming and lazy loading of TaskStorage snapshots"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "stream_tasks.json")
+        self.tasks = [
+            Task(title="Caf\u00e9 menu", description="\u00fcber wichtig", priority="high"),
+            Task(title="Plain", tags=["x"], due_date=datetime.now() - timedelta(days=1)),
+            Task(title="Third", assigned_to="alice"),
+        ]
+        writer = TaskStorage(self.storage_file)
+        writer.create_many(self.tasks)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_iter_tasks_from_file(self):
+        """Test streaming records across tiny chunk boundaries"""
+        for chunk_size in (1, 7, 1 << 16):
+            streamed = list(iter_tasks_from_file(self.storage_file, chunk_size=chunk_size))
+            self.assertEqual([t.to_dict() for t in streamed], [t.to_dict() for t in self.tasks])
+        
+        with open(self.storage_file, 'w', encoding='utf-8') as f:
+            json.dump({"tasks": [self.tasks[0].to_dict()], "task_count": 1}, f, ensure_ascii=False)
+        self.assertEqual(next(iter_tasks_from_file(self.storage_file, chunk_size=5)).title,
+                         "Caf\u00e9 menu")
+    
+    def test_lazy_load_reads_tasks_on_demand(self):
+        """Test that lazy loading hydrates only the tasks that are accessed"""
+        storage = TaskStorage(self.storage_file, lazy_load=True)
+        self.assertIsInstance(storage.tasks, LazyTaskMap)
+        self.assertEqual(storage.tasks.unread_count, 3)
+        self.assertIn(self.tasks[2].task_id, storage.tasks)
+        
+        task = storage.get_task(self.tasks[0].task_id)
+        self.assertEqual(task.to_dict(), self.tasks[0].to_dict())
+        self.assertEqual(storage.tasks.unread_count, 2)
+        
+        self.assertEqual(len(storage.filter_tasks(assigned_to="alice")), 1)
+        self.assertEqual(storage.tasks.unread_count, 0)
+        self.assertEqual(storage.get_statistics()["overdue_tasks"], 1)
+    
+    def test_lazy_load_survives_snapshot_replacement(self):
+        """Test that unread records stay readable after the snapshot is replaced"""
+        storage = TaskStorage(self.storage_file, lazy_load=True)
+        replacement = os.path.join(self.temp_dir, "replacement.json")
+        with open(replacement, 'w') as f:
+            f.write('{"tasks": []}')
+        os.replace(replacement, self.storage_file)
+        
+        self.assertEqual(storage.get_task(self.tasks[2].task_id).assigned_to, "alice")
+        self.assertEqual(len(storage.get_all_tasks()), 3)
+    
+    def test_lazy_load_concurrent_readers(self):
+        """Test that threads hydrating tasks at once each read their own record"""
+        tasks = [Task(title=f"Task {i}", description="x" * (i % 50)) for i in range(5000)]
+        TaskStorage(self.storage_file).create_many(tasks)
+        storage = TaskStorage(self.storage_file, lazy_load=True)
+        barrier = threading.Barrier(4)
+        errors = []
+        
+        def read(offset):
+            barrier.wait()
+            try:
+                for task in tasks[offset::2]:
+                    if storage.get_task(task.task_id).title != task.title:
+                        errors.append(task.task_id)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=read, args=(i % 2,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(storage.tasks.unread_count, len(self.tasks))
+
+
+class TestTaskStorageBinaryCodec(unittest.TestCase):
+    """Test cases for the compact binary snapshot format"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "binary_tasks.db")
+        self.tasks = [
+            Task(title="Binary \u00e9t\u00e9", description="desc", status="in_progress",
+                 priority="urgent", assigned_to="alice", tags=["x", "y"],
+                 due_date=datetime(2030, 1, 2, 3, 4, 5, 678901)),
+            Task(title="No extras"),
+            Task(title="Aware", created_at=datetime(2030, 1, 1, tzinfo=timezone.utc)),
+        ]
+        self.storage = TaskStorage(self.storage_file, codec="binary")
+        self.storage.create_many(self.tasks)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_round_trip(self):
+        """Test that every field survives the binary format"""
+        with open(self.storage_file, 'rb') as f:
+            self.assertEqual(f.read(4), b"GTSK")
+        
+        for reopened in (TaskStorage(self.storage_file),
+                         TaskStorage(self.storage_file, lazy_load=True)):
+            self.assertEqual([t.to_dict() for t in reopened.get_all_tasks()],
+                             [t.to_dict() for t in self.tasks])
+    
+    def test_smaller_than_json(self):
+        """Test that the binary snapshot is smaller than the JSON export"""
+        export_file = os.path.join(self.temp_dir, "export.json")
+        self.assertTrue(self.storage.export_json(export_file))
+        self.assertLess(os.path.getsize(self.storage_file), os.path.getsize(export_file))
+        
+        with open(export_file, 'r') as f:
+            self.assertEqual(json.load(f)["task_count"], 3)
+    
+    def test_backup_and_codec_switch(self):
+        """Test binary backups and converting a JSON store on its next save"""
+        backup_file = os.path.join(self.temp_dir, "backup.db")
+        self.assertTrue(self.storage.backup_tasks(backup_file))
+        self.assertEqual(len(list(iter_tasks_from_file(backup_file))), 3)
+        
+        json_storage = TaskStorage(self.storage_file)
+        json_storage.save_tasks()
+        with open(self.storage_file, 'r') as f:
+            self.assertEqual(len(json.load(f)["tasks"]), 3)
+    
+    def test_unknown_codec(self):
+        """Test that unknown codec names are rejected"""
+        with self.assertRaises(ValueError):
+            TaskStorage(self.storage_file, codec="xml")
+
+
+class TestTaskStorageColumnarView(unittest.TestCase):
+    """Test cases for the TaskStorage columnar view"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = TaskStorage(os.path.join(self.temp_dir, "column_tasks.json"))
+        self.now = datetime(2030, 1, 10)
+        self.storage.create_many([
+            Task(title="A", priority="high", assigned_to="alice",
+                 created_at=datetime(2030, 1, 9), due_date=datetime(2030, 1, 1)),
+            Task(title="B", priority="high", status="completed",
+                 created_at=datetime(2030, 1, 8), due_date=datetime(2030, 1, 1)),
+            Task(title="C", assigned_to="alice", created_at=datetime(2030, 1, 7)),
+        ])
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_vectorized_aggregations(self):
+        """Test counts, group-by, masks and ages over the columns"""
+        columns = self.storage.columnar_view()
+        self.assertEqual(columns.count_by("priority"), {"medium": 1, "high": 2})
+        self.assertEqual(columns.count_by("assignee"), {None: 1, "alice": 2})
+        self.assertEqual(columns.group_counts("priority", "status"),
+                         {("medium", "pending"): 1, ("high", "pending"): 1,
+                          ("high", "completed"): 1})
+        self.assertEqual(int(columns.mask(priority="high", assigned_to="alice").sum()), 1)
+        self.assertEqual(columns.ages(self.now).tolist(), [86400.0, 172800.0, 259200.0])
+        self.assertAlmostEqual(columns.overdue_ratio(self.now), 1 / 3)
+    
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_view_cached_until_mutation(self):
+        """Test that the view is reused until the storage changes"""
+        columns = self.storage.columnar_view()
+        self.assertIs(self.storage.columnar_view(), columns)
+        
+        self.storage.create_task(Task(title="D", priority="urgent"))
+        refreshed = self.storage.columnar_view()
+        self.assertIsNot(refreshed, columns)
+        self.assertEqual(refreshed.count_by("priority")["urgent"], 1)
+    
+    @unittest.skipIf(numpy is not None, "numpy is installed")
+    def test_requires_numpy(self):
+        """Test the error raised when numpy is unavailable"""
+        with self.assertRaises(ImportError):
+            self.storage.columnar_view()
+
+
+class TestShardedTaskStorage(unittest.TestCase):
+    """Test cases for ShardedTaskStorage"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "sharded_tasks.json")
+        self.storage = ShardedTaskStorage(self.storage_file, shard_count=4)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_round_trip_across_shards(self):
+        """Test that tasks spread over shard files load back"""
+        tasks = [Task(title=f"Task {i}") for i in range(40)]
+        self.storage.create_many(tasks)
+        self.storage.delete_task(tasks[0].task_id)
+        
+        shard_files = sorted(os.listdir(self.temp_dir))
+        self.assertEqual(shard_files, [f"sharded_tasks.{i}-of-4.json" for i in range(4)])
+        
+        reloaded = ShardedTaskStorage(self.storage_file, shard_count=4)
+        self.assertEqual(set(reloaded.tasks), {task.task_id for task in tasks[1:]})
+    
+    def test_only_dirty_shards_are_rewritten(self):
+        """Test that an update rewrites just the shard holding the task"""
+        tasks = [Task(title=f"Task {i}") for i in range(40)]
+        self.storage.create_many(tasks)
+        
+        target = tasks[5].task_id
+        written = []
+        original = self.storage._write_snapshot_atomic
+        with patch.object(self.storage, "_write_snapshot_atomic",
+                          side_effect=lambda path, *args: written.append(path) or original(path, *args)):
+            self.storage.update_task(target, {"status": "completed"})
+        
+        shard = self.storage.shard_of(target)
+        self.assertEqual(written, [self.storage.shard_file(shard)])
+        reloaded = ShardedTaskStorage(self.storage_file, shard_count=4)
+        self.assertEqual(reloaded.get_task(target).status, "completed")
+    
+    def test_journal_replay(self):
+        """Test that journaled changes survive a reload and a compaction"""
+        storage = ShardedTaskStorage(self.storage_file, shard_count=4, journal=True)
+        task = Task(title="Journaled")
+        storage.create_task(task)
+        
+        reloaded = ShardedTaskStorage(self.storage_file, shard_count=4, journal=True)
+        self.assertIsNotNone(reloaded.get_task(task.task_id))
+        self.assertTrue(reloaded.save_tasks())
+        self.assertEqual(os.path.getsize(reloaded.journal_file), 0)
+        
+        compacted = ShardedTaskStorage(self.storage_file, shard_count=4, journal=True)
+        self.assertIsNotNone(compacted.get_task(task.task_id))
+    
+    def test_shard_count_mismatch(self):
+        """Test that opening shards with a different shard count fails"""
+        self.storage.create_task(Task(title="Sharded"))
+        with self.assertRaises(ValueError):
+            ShardedTaskStorage(self.storage_file, shard_count=8)
+
+
+def _create_shared_tasks(storage_file: str, worker: int, count: int) -> None:
+    """Create tasks through a shared TaskStorage from a separate process"""
+    storage = TaskStorage(storage_file, shared=True)
+    for i in range(count):
+        storage.create_task(Task(title=f"Worker {worker} task {i}"))
+    storage.close()
+
+
+class TestTaskStorageShared(unittest.TestCase):
+    """Test cases for TaskStorage shared between processes"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "shared_tasks.json")
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_sees_and_keeps_other_writers_changes(self):
+        """Test that writers see each other's changes instead of overwriting them"""
+        first = TaskStorage(self.storage_file, shared=True)
+        second = TaskStorage(self.storage_file, shared=True)
+        
+        task = Task(title="From first")
+        first.create_task(task)
+        self.assertEqual(second.get_task(task.task_id).title, "From first")
+        
+        second.update_task(task.task_id, {"status": "completed"})
+        other = Task(title="From second")
+        second.create_task(other)
+        first.create_task(Task(title="Also from first"))
+        
+        self.assertEqual(first.get_task(task.task_id).status, "completed")
+        self.assertEqual(len(first.get_tasks_by_status("completed")), 1)
+        self.assertEqual(len(TaskStorage(self.storage_file).get_all_tasks()), 3)
+    
+    def test_unchanged_files_are_not_reparsed(self):
+        """Test that reads without foreign writes do not reload the snapshot"""
+        storage = TaskStorage(self.storage_file, shared=True)
+        storage.create_task(Task(title="Mine"))
+        
+        with patch.object(storage, "_load_snapshot", side_effect=AssertionError("reloaded")):
+            storage.create_task(Task(title="Mine too"))
+            self.assertEqual(len(storage.get_all_tasks()), 2)
+    
+    def test_journal_tail_is_replayed_without_full_reload(self):
+        """Test that journal appends by another process are applied incrementally"""
+        first = TaskStorage(self.storage_file, journal=True, shared=True)
+        second = TaskStorage(self.storage_file, journal=True, shared=True)
+        task = Task(title="Journaled", priority="high")
+        
+        with patch.object(second, "_load_snapshot", side_effect=AssertionError("reloaded")):
+            first.create_task(task)
+            self.assertEqual([t.task_id for t in second.get_tasks_by_priority("high")],
+                             [task.task_id])
+            first.delete_task(task.task_id)
+            self.assertIsNone(second.get_task(task.task_id))
+        
+        kept = Task(title="Compacted")
+        first.create_task(kept)
+        first.save_tasks()
+        self.assertIsNotNone(second.get_task(kept.task_id))
+    
+    def test_unflushed_mutations_survive_reload(self):
+        """Test that a reload keeps mutations still waiting for the flush thread"""
+        first = TaskStorage(self.storage_file, shared=True, durability="interval",
+                            flush_interval=60)
+        second = TaskStorage(self.storage_file, shared=True)
+        
+        pending = Task(title="Pending")
+        first.create_task(pending)
+        second.create_task(Task(title="Written"))
+        self.assertEqual(len(first.get_all_tasks()), 2)
+        
+        first.close()
+        self.assertIsNotNone(second.get_task(pending.task_id))
+    
+    def test_concurrent_processes(self):
+        """Test that tasks created by several processes at once are all kept"""
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=_create_shared_tasks,
+                                   args=(self.storage_file, worker, 20))
+                   for worker in range(3)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+        
+        self.assertEqual([process.exitcode for process in workers], [0, 0, 0])
+        self.assertEqual(len(TaskStorage(self.storage_file).get_all_tasks()), 60)
+
+
+class TestTaskStorageQuery(unittest.TestCase):
+    """Test cases for the TaskStorage query engine"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = TaskStorage(os.path.join(self.temp_dir, "query_tasks.json"))
+        self.now = datetime(2030, 6, 1)
+        rng = random.Random(7)
+        self.storage.create_many([
+            Task(title=f"Task {i}",
+                 status=rng.choice(["pending", "in_progress", "completed", "cancelled"]),
+                 priority=rng.choice(["low", "medium", "high", "urgent"]),
+                 assigned_to=rng.choice(["alice", "bob", None]),
+                 tags=rng.sample(["backend", "frontend", "ops"], rng.randint(0, 2)),
+                 created_at=self.now - timedelta(days=rng.randint(0, 30)),
+                 due_date=rng.choice([None, self.now + timedelta(days=rng.randint(-10, 10))]))
+            for i in range(300)
+        ])
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def _expected(self, predicate, key, reverse=False, offset=0, limit=None):
+        """Brute-force reference: filter, sort and slice every task"""
+        tasks = sorted((task for task in self.storage.get_all_tasks() if predicate(task)),
+                       key=lambda task: task.task_id)
+        dated = [task for task in tasks if key(task) is not None]
+        undated = [task for task in tasks if key(task) is None]
+        ordered = sorted(dated, key=key, reverse=reverse) + undated
+        end = None if limit is None else offset + limit
+        return [task.task_id for task in ordered[offset:end]]
+    
+    def test_matches_brute_force(self):
+        """Test predicates, ordering and pagination against a full scan"""
+        cutoff = self.now + timedelta(days=3)
+        cases = [
+            (dict(assigned_to="alice", status__ne="completed", order_by="due_date", limit=10),
+             lambda t: t.assigned_to == "alice" and t.status != "completed",
+             lambda t: t.due_date, False),
+            (dict(status__in=["pending", "in_progress"], due_date__lte=cutoff,
+                  order_by="-due_date", offset=3, limit=5),
+             lambda t: t.status in ("pending", "in_progress") and t.due_date is not None
+             and t.due_date <= cutoff,
+             lambda t: t.due_date, True),
+            (dict(priority__not_in=["low"], tags="ops", created_at__gte=self.now - timedelta(days=10),
+                  order_by="-created_at", limit=7),
+             lambda t: t.priority != "low" and "ops" in t.tags
+             and t.created_at >= self.now - timedelta(days=10),
+             lambda t: t.created_at, True),
+            (dict(due_date__gt=self.now, order_by="due_date", offset=2),
+             lambda t: t.due_date is not None and t.due_date > self.now,
+             lambda t: t.due_date, False),
+        ]
+        for kwargs, predicate, key, reverse in cases:
+            with self.subTest(kwargs=kwargs):
+                offset, limit = kwargs.get("offset", 0), kwargs.get("limit")
+                result = [task.task_id for task in self.storage.query(**kwargs)]
+                self.assertEqual(result, self._expected(predicate, key, reverse, offset, limit))
+    
+    def test_mixed_direction_ordering(self):
+        """Test ordering by several fields in different directions"""
+        ranks = {"low": 0, "medium": 1, "high": 2, "urgent": 3}
+        result = self.storage.query(order_by=["-assigned_to", "priority"])
+        keys = [(task.assigned_to is None, task.assigned_to or "", ranks[task.priority])
+                for task in result]
+        self.assertEqual(len(result), 300)
+        self.assertEqual([key[0] for key in keys], sorted(key[0] for key in keys))
+        assigned = [key[1:] for key in keys if not key[0]]
+        self.assertEqual(assigned, sorted(assigned, key=lambda key: (-ord(key[0][0]), key[1])))
+    
+    def test_due_order_walks_index(self):
+        """Test that open tasks ordered by due date are read off the index without sorting"""
+        with patch.object(storage_module, "order_key", side_effect=AssertionError("sorted")):
+            top = self.storage.query(assigned_to="bob", status__not_in=["completed"],
+                                     order_by="due_date", limit=5)
+        
+        self.assertEqual(len(top), 5)
+        due_dates = [task.due_date for task in top]
+        self.assertEqual(due_dates, sorted(due_dates))
+    
+    def test_unordered_pagination_keeps_storage_order(self):
+        """Test that pages without order_by follow storage order"""
+        everything = self.storage.query(priority="urgent")
+        self.assertEqual(everything, self.storage.filter_tasks(priority="urgent"))
+        self.assertEqual(self.storage.query(priority="urgent", offset=4, limit=3), everything[4:7])
+    
+    def test_rejects_invalid_queries(self):
+        """Test that unknown fields, operators and negative limits raise"""
+        with self.assertRaises(ValueError):
+            self.storage.query(colour="red")
+        with self.assertRaises(ValueError):
+            self.storage.query(status__like="pend")
+        with self.assertRaises(ValueError):
+            self.storage.query(priority__lt="high")
+        with self.assertRaises(ValueError):
+            self.storage.query(order_by="tags")
+        with self.assertRaises(ValueError):
+            self.storage.query(limit=-1)
+
+
+class TestTaskStorageCursors(unittest.TestCase):
+    """Test cases for the lazy TaskStorage iterators"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "cursor_tasks.json")
+        self.storage = TaskStorage(self.storage_file, full_text_index=True)
+        self.tasks = [Task(title=f"Task {i}", priority="high" if i % 10 == 0 else "low",
+                           assigned_to="alice" if i % 2 else "bob",
+                           description="deploy" if i % 3 == 0 else "")
+                      for i in range(100)]
+        self.storage.create_many(self.tasks)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_iterators_match_list_methods(self):
+        """Test that the iterators yield what the list methods return"""
+        self.assertEqual(list(self.storage.iter_tasks(batch_size=7)), self.storage.get_all_tasks())
+        self.assertEqual(list(self.storage.iter_filter(priority="high", batch_size=3)),
+                         self.storage.filter_tasks(priority="high"))
+        self.assertEqual(list(self.storage.iter_filter(assigned_to="alice", priority__ne="high")),
+                         [task for task in self.tasks if task.assigned_to == "alice"
+                          and task.priority != "high"])
+        self.assertEqual(list(self.storage.iter_search("deploy", batch_size=4)),
+                         self.storage.search_tasks("deploy"))
+        substring = TaskStorage(self.storage_file)
+        self.assertEqual([task.task_id for task in substring.iter_search("ask 1")],
+                         [task.task_id for task in self.tasks if "ask 1" in task.title.lower()])
+    
+    def test_resume_from_token(self):
+        """Test that a token resumes right after the last task, even if it was deleted"""
+        cursor = self.storage.iter_filter(assigned_to="bob", batch_size=4)
+        first_page = [next(cursor) for _ in range(10)]
+        token = cursor.token
+        self.storage.delete_task(first_page[-1].task_id)
+        
+        rest = list(self.storage.iter_filter(assigned_to="bob", after=token))
+        self.assertEqual(first_page + rest,
+                         [task for task in self.tasks if task.assigned_to == "bob"])
+        
+        reloaded = TaskStorage(self.storage_file)
+        resumed = next(reloaded.iter_tasks(after=f"0:{self.tasks[49].task_id}"))
+        self.assertEqual(resumed.task_id, self.tasks[50].task_id)
+    
+    def test_sees_changes_between_batches(self):
+        """Test that later batches reflect tasks created and deleted meanwhile"""
+        cursor = self.storage.iter_tasks(batch_size=10)
+        next(cursor)
+        self.storage.delete_task(self.tasks[50].task_id)
+        late = Task(title="Late")
+        self.storage.create_task(late)
+        
+        remaining = list(cursor)
+        self.assertNotIn(self.tasks[50], remaining)
+        self.assertEqual(remaining[-1].task_id, late.task_id)
+    
+    def test_rollback_restores_storage_order(self):
+        """Test that a rolled back delete puts the task back in its place"""
+        with self.assertRaises(RuntimeError):
+            with self.storage.transaction():
+                self.storage.delete_task(self.tasks[3].task_id)
+                raise RuntimeError("abort")
+        
+        expected = [task.task_id for task in self.tasks]
+        self.assertEqual([task.task_id for task in self.storage.iter_tasks()], expected)
+        self.assertEqual([task.task_id for task in self.storage.get_all_tasks()], expected)
+        self.assertEqual([task.task_id for task in self.storage.filter_tasks()], expected)
+        self.assertEqual([task.task_id for task in self.storage.query()], expected)
+        
+        self.storage.save_tasks()
+        reloaded = TaskStorage(self.storage_file)
+        self.assertEqual([task.task_id for task in reloaded.get_all_tasks()], expected)
+        with self.assertRaises(ValueError):
+            self.storage.iter_tasks(after="not-a-token")
+
+
+class TestAsyncTaskStorage(unittest.TestCase):
+    """Test cases for the asyncio TaskStorage facade"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "async_tasks.json")
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_concurrent_writes_share_flushes(self):
+        """Test that many concurrent awaiters are covered by a few flushes"""
+        async def scenario():
+            async with AsyncTaskStorage(self.storage_file) as storage:
+                with patch.object(storage.storage, "_write_journal",
+                                  wraps=storage.storage._write_journal) as write:
+                    results = await asyncio.gather(*(storage.create_task(Task(title=f"Task {i}"))
+                                                     for i in range(50)))
+                return results, write.call_count
+        
+        results, writes = asyncio.run(scenario())
+        self.assertEqual(results, [True] * 50)
+        self.assertLessEqual(writes, 2)
+        self.assertEqual(len(TaskStorage(self.storage_file, journal=True).get_all_tasks()), 50)
+    
+    def test_reads_see_unflushed_mutations(self):
+        """Test that awaitable reads see mutations before they are durable"""
+        async def scenario():
+            async with AsyncTaskStorage(self.storage_file) as storage:
+                task = Task(title="Visible", priority="high")
+                pending = asyncio.ensure_future(storage.create_task(task))
+                await asyncio.sleep(0)
+                self.assertIs(await storage.get_task(task.task_id), task)
+                self.assertEqual(await storage.query(priority="high"), [task])
+                self.assertEqual(await storage.search_tasks("visible"), [task])
+                self.assertEqual(await storage.filter_tasks(priority="high"), [task])
+                self.assertEqual((await storage.get_statistics())["total_tasks"], 1)
+                self.assertEqual(list(storage.iter_tasks()), [task])
+                self.assertTrue(await pending)
+                
+                self.assertTrue(await storage.update_task(task.task_id, {"status": "completed"}))
+                other = Task(title="Gone")
+                await storage.create_task(other)
+                self.assertTrue(await storage.delete_task(other.task_id))
+                self.assertFalse(await storage.delete_task(other.task_id))
+                return task.task_id
+        
+        task_id = asyncio.run(scenario())
+        reloaded = TaskStorage(self.storage_file, journal=True)
+        self.assertEqual([task.task_id for task in reloaded.get_all_tasks()], [task_id])
+        self.assertEqual(reloaded.get_task(task_id).status, "completed")
+    
+    def test_failed_flush_is_retried(self):
+        """Test that a failed write reports False and the next flush retries it"""
+        async def scenario():
+            async with AsyncTaskStorage(self.storage_file, journal=False) as storage:
+                with patch.object(storage.storage, "_write_snapshot", side_effect=OSError("disk full")):
+                    failed = await storage.create_task(Task(title="Retried"))
+                return failed, await storage.flush()
+        
+        with patch('builtins.print'):
+            failed, retried = asyncio.run(scenario())
+        self.assertFalse(failed)
+        self.assertTrue(retried)
+        self.assertEqual(len(TaskStorage(self.storage_file).get_all_tasks()), 1)
+
+
+class TestTaskStorageChangeFeed(unittest.TestCase):
+    """Test cases for the TaskStorage change feed"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "feed_tasks.json")
+        self.storage = TaskStorage(self.storage_file, change_history=5)
+        self.events = []
+        self.storage.subscribe(self.events.append)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_publishes_ordered_events(self):
+        """Test create, update and delete events with sequence numbers and changed fields"""
+        task = Task(title="Watched")
+        self.storage.create_task(task)
+        self.storage.update_task(task.task_id, {"status": "completed", "title": "Watched"})
+        self.storage.delete_task(task.task_id)
+        
+        self.assertEqual([(e.sequence, e.op, e.task_id) for e in self.events],
+                         [(1, "create", task.task_id), (2, "update", task.task_id),
+                          (3, "delete", task.task_id)])
+        self.assertEqual(self.events[1].changes, {"status": ("pending", "completed")})
+        self.assertIs(self.events[2].task, task)
+        self.assertEqual(self.storage.change_sequence, 3)
+    
+    def test_transactions_publish_on_commit(self):
+        """Test that transactional changes appear at commit and rolled back ones never do"""
+        kept, dropped = Task(title="Kept"), Task(title="Dropped")
+        with self.storage.transaction():
+            self.storage.create_task(kept)
+            try:
+                with self.storage.transaction():
+                    self.storage.create_task(dropped)
+                    raise RuntimeError("abort inner")
+            except RuntimeError:
+                pass
+            self.assertEqual(self.events, [])
+        
+        self.assertEqual([e.task_id for e in self.events], [kept.task_id])
+        
+        with self.assertRaises(RuntimeError):
+            with self.storage.transaction():
+                self.storage.delete_task(kept.task_id)
+                raise RuntimeError("abort")
+        self.assertEqual(len(self.events), 1)
+    
+    def test_resume_from_sequence(self):
+        """Test catching up from a sequence number within the history"""
+        tasks = [Task(title=f"Task {i}") for i in range(7)]
+        for task in tasks:
+            self.storage.create_task(task)
+        
+        self.assertEqual([e.task_id for e in self.storage.changes_since(4)],
+                         [task.task_id for task in tasks[4:]])
+        replayed = []
+        self.storage.subscribe(replayed.append, since=5)
+        self.storage.delete_task(tasks[0].task_id)
+        self.assertEqual([e.sequence for e in replayed], [6, 7, 8])
+        
+        with self.assertRaises(ValueError):
+            self.storage.changes_since(1)
+    
+    def test_watch_async_iterator(self):
+        """Test consuming the feed as an async iterator"""
+        async def scenario():
+            feed = self.storage.watch()
+            first = asyncio.ensure_future(feed.__anext__())
+            await asyncio.sleep(0)
+            task = Task(title="Streamed")
+            self.storage.create_task(task)
+            event = await asyncio.wait_for(first, 1)
+            await feed.aclose()
+            return task, event
+        
+        task, event = asyncio.run(scenario())
+        self.assertEqual((event.op, event.task_id), ("create", task.task_id))
+    
+    def test_changes_from_other_processes(self):
+        """Test that journal records replayed from another writer are published"""
+        writer = TaskStorage(self.storage_file, journal=True, shared=True)
+        reader = TaskStorage(self.storage_file, journal=True, shared=True)
+        events = []
+        reader.subscribe(events.append)
+        
+        task = Task(title="Remote")
+        writer.create_task(task)
+        writer.update_task(task.task_id, {"priority": "urgent"})
+        reader.get_all_tasks()
+        
+        self.assertEqual([e.op for e in events], ["create", "update"])
+        self.assertEqual(events[1].changes["priority"], ("medium", "urgent"))
+
+
+class TestOptimisticConcurrency(unittest.TestCase):
+    """Test cases for per-task versions and expected_version checks"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def _check_conflicts(self, storage):
+        """Exercise versioned updates and deletes against one storage"""
+        task = Task(title="Contended")
+        storage.create_task(task)
+        read = storage.get_task(task.task_id).version
+        self.assertEqual(read, 1)
+        
+        self.assertTrue(storage.update_task(task.task_id, {"status": "in_progress"},
+                                            expected_version=read))
+        with self.assertRaises(VersionConflictError) as conflict:
+            storage.update_task(task.task_id, {"status": "cancelled"}, expected_version=read)
+        self.assertEqual((conflict.exception.expected, conflict.exception.actual), (1, 2))
+        self.assertEqual(storage.get_task(task.task_id).status, "in_progress")
+        
+        with self.assertRaises(VersionConflictError):
+            storage.delete_task(task.task_id, expected_version=1)
+        self.assertTrue(storage.delete_task(task.task_id, expected_version=2))
+        self.assertFalse(storage.update_task(task.task_id, {"title": "Gone"}, expected_version=2))
+    
+    def test_task_storage_versions(self):
+        """Test versions and conflicts in TaskStorage, and that versions persist"""
+        storage_file = os.path.join(self.temp_dir, "versioned.json")
+        storage = TaskStorage(storage_file)
+        self._check_conflicts(storage)
+        
+        task = Task(title="Persisted")
+        storage.create_task(task)
+        storage.update_task(task.task_id, {"priority": "high"})
+        self.assertEqual(TaskStorage(storage_file).get_task(task.task_id).version, 2)
+    
+    def test_failed_check_leaves_transaction_untouched(self):
+        """Test that a conflict inside a transaction rolls back the whole batch"""
+        storage = TaskStorage(os.path.join(self.temp_dir, "versioned.json"))
+        first, second = Task(title="First"), Task(title="Second")
+        storage.create_many([first, second])
+        
+        with self.assertRaises(VersionConflictError):
+            with storage.transaction():
+                storage.update_task(first.task_id, {"status": "completed"}, expected_version=1)
+                storage.update_task(second.task_id, {"status": "completed"}, expected_version=5)
+        self.assertEqual((first.status, first.version), ("pending", 1))
+    
+    def test_binary_codec_keeps_versions(self):
+        """Test that the binary format stores versions and still reads version 1 files"""
+        storage_file = os.path.join(self.temp_dir, "versioned.bin")
+        storage = TaskStorage(storage_file, codec="binary")
+        task = Task(title="Binary")
+        storage.create_task(task)
+        storage.update_task(task.task_id, {"status": "completed"})
+        self.assertEqual(TaskStorage(storage_file).get_task(task.task_id).version, 2)
+        
+        # A version 1 file, written before records carried the task version
+        legacy_file = os.path.join(self.temp_dir, "legacy.bin")
+        header = json.dumps({"task_count": 1}).encode("utf-8")
+        task_id, title = b"legacy-task", b"Old format"
+        record = struct.pack("<BBBqqqIIIIH", 0, 1, 0, 0, 0, 0, len(task_id), len(title), 0, 0, 0)
+        record += task_id + title
+        with open(legacy_file, "wb") as f:
+            f.write(b"GTSK" + bytes([1]) + struct.pack("<I", len(header)) + header)
+            f.write(struct.pack("<I", 0) + struct.pack("<I", len(record)) + record)
+        legacy = TaskStorage(legacy_file).get_task("legacy-task")
+        self.assertEqual((legacy.title, legacy.version), ("Old format", 1))
+    
+    def test_sqlite_versions(self):
+        """Test versions and conflicts in SqliteTaskStorage"""
+        storage = SqliteTaskStorage(os.path.join(self.temp_dir, "versioned.db"))
+        self._check_conflicts(storage)
+        storage.close()
+        
+        # Databases from before the version column are migrated on open
+        legacy_file = os.path.join(self.temp_dir, "legacy.db")
+        conn = sqlite3.connect(legacy_file)
+        conn.execute("CREATE TABLE tasks (task_id TEXT PRIMARY KEY, title TEXT NOT NULL, "
+                     "description TEXT NOT NULL DEFAULT '', status TEXT NOT NULL, "
+                     "priority TEXT NOT NULL, created_at TEXT NOT NULL, updated_at TEXT NOT NULL, "
+                     "due_date TEXT, assigned_to TEXT, tags TEXT NOT NULL DEFAULT '[]', "
+                     "tag_text TEXT NOT NULL DEFAULT '')")
+        conn.execute("INSERT INTO tasks VALUES ('old', 'Old', '', 'pending', 'low', "
+                     "'2030-01-01T00:00:00', '2030-01-01T00:00:00', NULL, NULL, '[]', '')")
+        conn.commit()
+        conn.close()
+        legacy = SqliteTaskStorage(legacy_file)
+        self.assertEqual(legacy.get_task("old").version, 1)
+        self.assertTrue(legacy.update_task("old", {"status": "completed"}, expected_version=1))
+        self.assertEqual(legacy.get_task("old").version, 2)
+        legacy.close()
+
+
+class TestTaskStorageArchive(unittest.TestCase):
+    """Test cases for archiving closed tasks to the cold store"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "archived.json")
+        self.later = datetime.now() + timedelta(days=31)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def _populate(self, storage):
+        """Create one task per status and return them by status"""
+        tasks = {}
+        for status in ("pending", "in_progress", "completed", "cancelled"):
+            task = Task(title=f"Quarterly {status} report", tags=["finance"])
+            storage.create_task(task)
+            storage.update_task(task.task_id, {"status": status})
+            tasks[status] = task
+        return tasks
+    
+    def test_archive_moves_closed_tasks(self):
+        """Test that old completed and cancelled tasks leave the working set"""
+        storage = TaskStorage(self.storage_file, journal=True)
+        tasks = self._populate(storage)
+        
+        self.assertEqual(storage.archive_tasks(older_than_days=30), 0)
+        self.assertEqual(storage.archive_tasks(older_than_days=30, now=self.later), 2)
+        self.assertEqual(len(storage.get_all_tasks()), 2)
+        self.assertEqual(storage.get_tasks_by_status("completed"), [])
+        self.assertTrue(os.path.exists(self.storage_file + ".archive.gz"))
+        
+        reopened = TaskStorage(self.storage_file, journal=True)
+        completed_id = tasks["completed"].task_id
+        self.assertIsNone(reopened.get_task(completed_id))
+        archived = reopened.get_task(completed_id, include_archived=True)
+        self.assertEqual(archived.title, "Quarterly completed report")
+        self.assertEqual(archived.version, 2)
+    
+    def test_search_includes_archived_on_demand(self):
+        """Test that search_tasks reaches the cold store only when asked"""
+        for full_text_index in (False, True):
+            with self.subTest(full_text_index=full_text_index):
+                storage_file = os.path.join(self.temp_dir, f"search-{full_text_index}.json")
+                storage = TaskStorage(storage_file, full_text_index=full_text_index)
+                tasks = self._populate(storage)
+                storage.archive_tasks(older_than_days=30, now=self.later)
+                
+                self.assertEqual(len(storage.search_tasks("quarter")), 2)
+                found = storage.search_tasks("quarter", include_archived=True)
+                self.assertEqual({task.task_id for task in found},
+                                 {task.task_id for task in tasks.values()})
+                self.assertEqual(storage.search_tasks("nothing", include_archived=True), [])
+    
+    def test_restore_task(self):
+        """Test that a restored task is back in the working set and not archived"""
+        storage = TaskStorage(self.storage_file)
+        tasks = self._populate(storage)
+        storage.archive_tasks(older_than_days=30, now=self.later)
+        cancelled_id = tasks["cancelled"].task_id
+        
+        self.assertTrue(storage.restore_task(cancelled_id))
+        self.assertFalse(storage.restore_task(cancelled_id))
+        self.assertEqual(storage.get_task(cancelled_id).status, "cancelled")
+        self.assertEqual(len(storage.archive), 1)
+        
+        reopened = TaskStorage(self.storage_file)
+        self.assertIsNotNone(reopened.get_task(cancelled_id))
+        self.assertNotIn(cancelled_id, reopened.archive)
+        self.assertEqual(len(reopened.search_tasks("report", include_archived=True)), 4)
+    
+    def test_archive_policy_and_torn_member(self):
+        """Test archive_after_days on open and recovery from a torn append"""
+        storage = TaskStorage(self.storage_file)
+        tasks = self._populate(storage)
+        for task in tasks.values():
+            task.updated_at -= timedelta(days=10)
+        storage.save_tasks()
+        with open(self.storage_file + ".archive.gz", 'ab') as f:
+            f.write(b"\x1f\x8b\x08 torn")
+        
+        policed = TaskStorage(self.storage_file, archive_after_days=7)
+        self.assertEqual(len(policed.get_all_tasks()), 2)
+        self.assertEqual(len(policed.archive), 2)
+        self.assertIsNotNone(policed.get_task(tasks["completed"].task_id, include_archived=True))
+        with self.assertRaises(ValueError):
+            TaskStorage(self.storage_file).archive_tasks()
+
+
+class TestTaskStorageBackups(unittest.TestCase):
+    """Test cases for compressed and incremental backups"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = TaskStorage(os.path.join(self.temp_dir, "backed_up.json"))
+        for i in range(20):
+            self.storage.create_task(Task(title=f"Task {i}", description="x" * 200))
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def _path(self, name):
+        """Path of a file in the temporary directory"""
+        return os.path.join(self.temp_dir, name)
+    
+    def test_compressed_full_backup(self):
+        """Test zlib and lzma backups are smaller and restore every task"""
+        plain = self._path("plain.json")
+        self.assertTrue(self.storage.backup_tasks(plain))
+        for compression in ("zlib", "lzma"):
+            with self.subTest(compression=compression):
+                backup = self._path(f"full.{compression}")
+                self.assertTrue(self.storage.backup_tasks(backup, compression=compression))
+                self.assertLess(os.path.getsize(backup), os.path.getsize(plain) / 5)
+                
+                restored = TaskStorage(self._path(f"restored-{compression}.json"))
+                self.assertTrue(restored.restore_backup(backup))
+                self.assertEqual([task.to_dict() for task in restored.get_all_tasks()],
+                                 [task.to_dict() for task in self.storage.get_all_tasks()])
+        self.assertFalse(self.storage.backup_tasks(self._path("bad"), compression="zip"))
+    
+    def test_incremental_chain(self):
+        """Test that deltas hold only changed tasks and replay updates and deletes"""
+        tasks = self.storage.get_all_tasks()
+        base = self._path("base.zlib")
+        self.assertTrue(self.storage.backup_tasks(base, compression="zlib"))
+        
+        self.storage.update_task(tasks[0].task_id, {"status": "completed"})
+        self.storage.delete_task(tasks[1].task_id)
+        added = Task(title="Added later")
+        self.storage.create_task(added)
+        first = self._path("delta-1.zlib")
+        self.assertTrue(self.storage.backup_tasks(first, parent=base))
+        self.assertEqual(read_backup_header(first)["task_count"], 2)
+        
+        self.storage.update_task(added.task_id, {"priority": "urgent"})
+        second = self._path("delta-2.lzma")
+        self.assertTrue(self.storage.backup_tasks(second, parent=first, compression="lzma"))
+        self.assertEqual(read_backup_header(second)["task_count"], 1)
+        
+        restored = TaskStorage(self._path("restored.json"), journal=True)
+        restored.create_task(Task(title="Overwritten"))
+        self.assertTrue(restored.restore_backup(second))
+        self.assertEqual([task.to_dict() for task in restored.get_all_tasks()],
+                         [task.to_dict() for task in self.storage.get_all_tasks()])
+        self.assertEqual(restored.get_task(added.task_id).priority, "urgent")
+        self.assertEqual(len(TaskStorage(self._path("restored.json"), journal=True).get_all_tasks()), 20)
+    
+    def test_incremental_after_restore(self):
+        """Test that a delta taken after a restore captures the restored tasks"""
+        task = self.storage.get_all_tasks()[0]
+        self.storage.update_task(task.task_id, {"title": "v1"})
+        first = self._path("b1.zlib")
+        self.storage.backup_tasks(first, compression="zlib")
+        self.storage.update_task(task.task_id, {"title": "v2"})
+        second = self._path("b2.zlib")
+        self.storage.backup_tasks(second, parent=first)
+        
+        self.assertTrue(self.storage.restore_backup(first))
+        third = self._path("b3.zlib")
+        self.assertTrue(self.storage.backup_tasks(third, parent=second))
+        self.assertTrue(self.storage.restore_backup(third))
+        self.assertEqual(self.storage.get_task(task.task_id).title, "v1")
+        
+        # Back at version 3, as in b2, but with different contents
+        self.storage.update_task(task.task_id, {"title": "v3"})
+        fourth = self._path("b4.zlib")
+        self.assertTrue(self.storage.backup_tasks(fourth, parent=second))
+        restored = TaskStorage(self._path("restored.json"))
+        self.assertTrue(restored.restore_backup(fourth))
+        self.assertEqual(restored.get_task(task.task_id).title, "v3")
+        
+        fifth = self._path("b5.zlib")
+        self.assertTrue(self.storage.backup_tasks(fifth, parent=fourth))
+        self.assertEqual(read_backup_header(fifth)["task_count"], 0)
+    
+    def test_incremental_with_reused_task_id(self):
+        """Test that a task recreated under the same id and version is backed up"""
+        storage = TaskStorage(self._path("reused.json"))
+        storage.create_task(Task(task_id="fixed", title="A"))
+        base = self._path("base.zlib")
+        storage.backup_tasks(base, compression="zlib")
+        storage.delete_task("fixed")
+        storage.create_task(Task(task_id="fixed", title="B"))
+        
+        delta = self._path("delta.zlib")
+        self.assertTrue(storage.backup_tasks(delta, parent=base))
+        self.assertEqual(read_backup_header(delta)["task_count"], 1)
+        self.assertTrue(storage.restore_backup(delta))
+        self.assertEqual(storage.get_task("fixed").title, "B")
+    
+    def test_incremental_after_restore_and_reopen(self):
+        """Test that a restore is still accounted for after reopening the store"""
+        task = self.storage.get_all_tasks()[0]
+        self.storage.update_task(task.task_id, {"title": "c1"})
+        first = self._path("b1.zlib")
+        self.storage.backup_tasks(first, compression="zlib")
+        self.storage.update_task(task.task_id, {"title": "c2"})
+        second = self._path("b2.zlib")
+        self.storage.backup_tasks(second, parent=first)
+        self.assertTrue(self.storage.restore_backup(first))
+        
+        reopened = TaskStorage(self.storage.storage_file)
+        reopened.update_task(task.task_id, {"title": "c2-prime"})
+        third = self._path("b3.zlib")
+        self.assertTrue(reopened.backup_tasks(third, parent=second))
+        restored = TaskStorage(self._path("restored.json"))
+        self.assertTrue(restored.restore_backup(third))
+        self.assertEqual(restored.get_task(task.task_id).title, "c2-prime")
+    
+    def test_restore_rejects_broken_chain(self):
+        """Test that a missing or truncated link leaves the store untouched"""
+        base = self._path("base.zlib")
+        delta = self._path("delta.zlib")
+        self.storage.backup_tasks(base, compression="zlib")
+        self.storage.backup_tasks(delta, parent=base)
+        restored = TaskStorage(self._path("restored.json"))
+        restored.create_task(Task(title="Kept"))
+        
+        with open(base, 'rb') as f:
+            data = f.read()
+        with open(base, 'wb') as f:
+            f.write(data[:len(data) // 2])
+        self.assertFalse(restored.restore_backup(delta))
+        os.remove(base)
+        self.assertFalse(restored.restore_backup(delta))
+        self.assertEqual([task.title for task in restored.get_all_tasks()], ["Kept"])
+    
+    def test_restore_plain_backup(self):
+        """Test restoring a snapshot copy publishes a reset"""
+        backup = self._path("plain.json")
+        self.storage.backup_tasks(backup)
+        restored = TaskStorage(self._path("restored.json"))
+        events = []
+        restored.subscribe(events.append)
+        self.assertTrue(restored.restore_backup(backup))
+        self.assertEqual(len(restored.get_all_tasks()), 20)
+        self.assertEqual([event.op for event in events], ["reset"])
+
+
+class TestTaskStorageNdjson(unittest.TestCase):
+    """Test cases for NDJSON export and import"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.export_file = os.path.join(self.temp_dir, "tasks.ndjson")
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_round_trip(self):
+        """Test that an export imports into another store unchanged"""
+        source = TaskStorage(os.path.join(self.temp_dir, "source.json"))
+        for i in range(25):
+            source.create_task(Task(title=f"Migrated {i}", tags=["ü"], priority="high"))
+        self.assertTrue(source.export_ndjson(self.export_file))
+        with open(self.export_file) as f:
+            self.assertEqual(len(f.readlines()), 25)
+        
+        target = TaskStorage(os.path.join(self.temp_dir, "target.json"), journal=True)
+        self.assertEqual(target.import_ndjson(self.export_file, batch_size=7), 25)
+        self.assertEqual([task.to_dict() for task in target.get_all_tasks()],
+                         [task.to_dict() for task in source.get_all_tasks()])
+        self.assertEqual(target.import_ndjson(self.export_file), 0)
+        reopened = TaskStorage(os.path.join(self.temp_dir, "target.json"), journal=True)
+        self.assertEqual(len(reopened.get_all_tasks()), 25)
+    
+    def test_import_is_one_write(self):
+        """Test that a whole import is persisted with a single commit"""
+        with open(self.export_file, 'w') as f:
+            for i in range(50):
+                f.write(json.dumps(Task(title=f"Line {i}").to_dict()) + "\n")
+            f.write("\n")
+        storage = TaskStorage(os.path.join(self.temp_dir, "single.json"))
+        with patch.object(storage, 'save_tasks', wraps=storage.save_tasks) as save:
+            self.assertEqual(storage.import_ndjson(self.export_file, batch_size=10), 50)
+        self.assertEqual(save.call_count, 1)
+    
+    def test_invalid_line_rolls_back(self):
+        """Test that a bad record aborts the import without partial results"""
+        with open(self.export_file, 'w') as f:
+            f.write(json.dumps(Task(title="Valid").to_dict()) + "\n")
+            f.write(json.dumps({"title": "Bad", "status": "unknown"}) + "\n")
+        storage = TaskStorage(os.path.join(self.temp_dir, "rolled_back.json"))
+        events = []
+        storage.subscribe(events.append)
+        self.assertEqual(storage.import_ndjson(self.export_file), 0)
+        self.assertEqual(storage.get_all_tasks(), [])
+        self.assertEqual(events, [])
+        self.assertEqual(storage.import_ndjson(os.path.join(self.temp_dir, "missing.ndjson")), 0)
+
+
+class TestTaskStorageSnapshots(unittest.TestCase):
+    """Test cases for copy-on-write read snapshots"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = TaskStorage(os.path.join(self.temp_dir, "snapshots.json"))
+        self.tasks = [Task(title=f"Task {i}", tags=["base"]) for i in range(10)]
+        self.storage.create_many(self.tasks)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_snapshot_is_point_in_time(self):
+        """Test that later writes do not show through an existing snapshot"""
+        view = self.storage.snapshot()
+        self.assertIsInstance(view, TaskSnapshot)
+        self.storage.update_task(self.tasks[0].task_id, {"status": "completed", "tags": ["new"]})
+        self.storage.delete_task(self.tasks[1].task_id)
+        self.storage.create_task(Task(title="Later"))
+        
+        self.assertEqual(len(view), 10)
+        self.assertEqual(view[self.tasks[0].task_id].status, "pending")
+        self.assertEqual(view[self.tasks[0].task_id].tags, ["base"])
+        self.assertIn(self.tasks[1].task_id, view)
+        
+        current = self.storage.snapshot()
+        self.assertEqual(len(current), 10)
+        self.assertEqual(current[self.tasks[0].task_id].status, "completed")
+        self.assertNotIn(self.tasks[1].task_id, current)
+        self.assertGreater(current.generation, view.generation)
+    
+    def test_snapshots_share_unchanged_tasks(self):
+        """Test that only changed tasks are copied again"""
+        first = self.storage.snapshot()
+        self.assertIs(self.storage.snapshot(), first)
+        self.assertIsNot(first[self.tasks[0].task_id], self.tasks[0])
+        
+        self.storage.update_task(self.tasks[0].task_id, {"priority": "high"})
+        second = self.storage.snapshot()
+        self.assertIsNot(second, first)
+        self.assertIsNot(second[self.tasks[0].task_id], first[self.tasks[0].task_id])
+        self.assertIs(second[self.tasks[5].task_id], first[self.tasks[5].task_id])
+        self.assertEqual(list(second), list(first))
+    
+    def test_rollback_and_reload(self):
+        """Test snapshots after a rolled back transaction and a reload"""
+        first = self.storage.snapshot()
+        with self.assertRaises(RuntimeError):
+            with self.storage.transaction():
+                self.storage.update_task(self.tasks[2].task_id, {"title": "Undone"})
+                raise RuntimeError("abort")
+        self.assertEqual(self.storage.snapshot()[self.tasks[2].task_id].title, "Task 2")
+        
+        self.storage.load_tasks()
+        reloaded = self.storage.snapshot()
+        self.assertIsNot(reloaded, first)
+        self.assertEqual(len(reloaded.query(tags="base", order_by="-title")), 10)
+        self.assertEqual(reloaded.query(title="Task 3")[0].task_id, self.tasks[3].task_id)
+    
+    def test_readers_scan_while_writer_runs(self):
+        """Test that reader threads see consistent views during writes"""
+        storage = TaskStorage(os.path.join(self.temp_dir, "busy.json"), durability="manual")
+        storage.create_many(self.tasks)
+        errors = []
+        stop = threading.Event()
+        
+        def write():
+            for i in range(300):
+                task = self.tasks[i % 10]
+                storage.update_task(task.task_id, {"tags": ["a", "b"] if i % 2 else ["base"]})
+            stop.set()
+        
+        def read():
+            try:
+                while not stop.is_set():
+                    view = storage.snapshot()
+                    self.assertEqual(len(view), 10)
+                    for task in view.values():
+                        self.assertIn(task.tags, (["a", "b"], ["base"]))
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        threads.append(threading.Thread(target=write))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        storage.close()
+        self.assertEqual(errors, [])
+
+
+class TestTaskStorageAggregate(unittest.TestCase):
+    """Test cases for grouped aggregation"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = TaskStorage(os.path.join(self.temp_dir, "aggregated.json"))
+        self.now = datetime(2026, 3, 2, 12, 0)
+        rng = random.Random(7)
+        tasks = []
+        for i in range(200):
+            tasks.append(Task(
+                title=f"Task {i}",
+                status=rng.choice(["pending", "in_progress", "completed"]),
+                priority=rng.choice(["low", "medium", "high"]),
+                assigned_to=rng.choice(["alice", "bob", None]),
+                tags=rng.sample(["api", "ui", "db"], rng.randint(0, 2)),
+                created_at=self.now - timedelta(hours=rng.randint(1, 500)),
+                due_date=rng.choice([None, self.now + timedelta(days=rng.randint(0, 20))])))
+        self.storage.create_many(tasks)
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_counts_match_a_scan(self):
+        """Test index-answered counts against counting by hand"""
+        tasks = self.storage.get_all_tasks()
+        rows = self.storage.aggregate(["priority", "status"])
+        expected = {}
+        for task in tasks:
+            key = (task.priority, task.status)
+            expected[key] = expected.get(key, 0) + 1
+        self.assertEqual({(row["priority"], row["status"]): row["count"] for row in rows}, expected)
+        self.assertEqual([row["priority"] for row in rows][0], "low")
+        
+        open_rows = self.storage.aggregate("assigned_to", where={"status__ne": "completed"})
+        self.assertEqual(open_rows[-1]["assigned_to"], None)
+        self.assertEqual(sum(row["count"] for row in open_rows),
+                         sum(1 for task in tasks if task.status != "completed"))
+        
+        tag_rows = self.storage.aggregate("tags", where={"assigned_to": "alice"})
+        self.assertEqual({row["tags"]: row["count"] for row in tag_rows},
+                         {tag: sum(1 for task in tasks if task.assigned_to == "alice" and tag in task.tags)
+                          for tag in ("api", "db", "ui")})
+    
+    def test_age_metrics(self):
+        """Test min, max and average ages per group"""
+        rows = self.storage.aggregate("status", ["count", "min_age", "max_age", "avg_age"],
+                                      now=self.now)
+        for row in rows:
+            ages = [(self.now - task.created_at).total_seconds()
+                    for task in self.storage.get_all_tasks() if task.status == row["status"]]
+            self.assertEqual(row["count"], len(ages))
+            self.assertAlmostEqual(row["min_age"], min(ages))
+            self.assertAlmostEqual(row["max_age"], max(ages))
+            self.assertAlmostEqual(row["avg_age"], sum(ages) / len(ages), places=3)
+        
+        total, = self.storage.aggregate(metrics="max_age", now=self.now)
+        self.assertAlmostEqual(total["max_age"], max(row["max_age"] for row in rows))
+        empty = TaskStorage(os.path.join(self.temp_dir, "empty.json"))
+        self.assertEqual(empty.aggregate(metrics=["count", "avg_age"]), [{"count": 0, "avg_age": None}])
+    
+    def test_due_week_groups(self):
+        """Test grouping by ISO due week, with undated tasks last"""
+        rows = self.storage.aggregate(["due_week"], where={"priority": "high"})
+        self.assertIsNone(rows[-1]["due_week"])
+        self.assertEqual(rows[0]["due_week"], "2026-W10")
+        self.assertEqual(sum(row["count"] for row in rows), len(self.storage.filter_tasks(priority="high")))
+    
+    def test_invalid_arguments(self):
+        """Test unknown group keys and metrics"""
+        with self.assertRaises(ValueError):
+            self.storage.aggregate("title")
+        with self.assertRaises(ValueError):
+            self.storage.aggregate("status", metrics=["median_age"])
+
+
+class TestTaskStorageFuzzySearch(unittest.TestCase):
+    """Test cases for trigram-based fuzzy search"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.titles = ["Team meeting notes", "Prepare quarterly report", "Fix login bug",
+                       "Review pull request", "Plan team offsite"]
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir)
+    
+    def _storage(self, name, **options):
+        """Create a storage holding one task per title"""
+        storage = TaskStorage(os.path.join(self.temp_dir, name), **options)
+        storage.create_many([Task(title=title, tags=["Backend"] if "bug" in title else [])
+                             for title in self.titles])
+        return storage
+    
+    def test_typos_are_ranked(self):
+        """Test that misspelled queries find the intended task first"""
+        storage = self._storage("fuzzy.json", trigram_index=True)
+        results = storage.fuzzy_search("meetng")
+        self.assertEqual(results[0][0].title, "Team meeting notes")
+        self.assertLess(results[0][1], 1.0)
+        self.assertEqual(storage.fuzzy_search("quartely reprot")[0][0].title,
+                         "Prepare quarterly report")
+        self.assertEqual(storage.fuzzy_search("backnd")[0][0].title, "Fix login bug")
+        self.assertEqual(storage.fuzzy_search("zzzz"), [])
+    
+    def test_substring_hits_score_highest(self):
+        """Test verbatim substrings, including ones too short for trigrams"""
+        storage = self._storage("substring.json", trigram_index=True)
+        results = storage.fuzzy_search("team")
+        self.assertEqual([(task.title, score) for task, score in results[:2]],
+                         [("Team meeting notes", 1.0), ("Plan team offsite", 1.0)])
+        self.assertEqual(storage.fuzzy_search("eeti")[0][1], 1.0)
+        self.assertIn("Fix login bug", [task.title for task, _ in storage.fuzzy_search("bu")])
+        self.assertEqual(len(storage.fuzzy_search("team", limit=1)), 1)
+        with self.assertRaises(ValueError):
+            storage.fuzzy_search("team", threshold=0)
+    
+    def test_index_matches_scan(self):
+        """Test that indexed candidates give the same results as a full scan"""
+        rng = random.Random(3)
+        words = ["alpha", "beta", "gamma", "delta", "omega", "sigma", "kappa", "lambda"]
+        indexed = TaskStorage(os.path.join(self.temp_dir, "indexed.json"),
+                              trigram_index=True, durability="manual")
+        scanned = TaskStorage(os.path.join(self.temp_dir, "scanned.json"), durability="manual")
+        for i in range(300):
+            task = Task(title=" ".join(rng.sample(words, 3)), tags=rng.sample(words, 1))
+            indexed.create_task(task)
+            scanned.create_task(Task.from_dict(task.to_dict()))
+        victim = next(iter(indexed.tasks))
+        for storage in (indexed, scanned):
+            storage.update_task(victim, {"title": "Renamed entirely", "tags": []})
+        
+        for query in ("gama", "sigma kapa", "lambd", "omeg delta", "renamd"):
+            for threshold in (0.2, 0.4, 0.6):
+                expected = [(task.task_id, score) for task, score in scanned.fuzzy_search(query, threshold)]
+                actual = [(task.task_id, score) for task, score in indexed.fuzzy_search(query, threshold)]
+                self.assertEqual(actual, expected, (query, threshold))
+        indexed.close()
+        scanned.close()
+
+
+class TestSqliteTaskStorage(unittest.TestCase):
+    """Test cases for SqliteTaskStorage class"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage_file = os.path.join(self.temp_dir, "test_tasks.db")
+        self.storage = SqliteTaskStorage(self.storage_file)
+        
+        self.sample_task = Task(
+            title="Sample Task",
+            description="A sample task for testing",
+            priority="high",
+            assigned_to="alice",
+            tags=["backend", "api"]
+        )
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.storage.close()
+        shutil.rmtree(self.temp_dir)
+    
+    def test_create_and_get_task(self):
+        """Test round-tripping a task through the database"""
+        self.assertTrue(self.storage.create_task(self.sample_task))
+        self.assertFalse(self.storage.create_task(self.sample_task))
+        
+        retrieved = self.storage.get_task(self.sample_task.task_id)
+        self.assertEqual(retrieved.to_dict(), self.sample_task.to_dict())
+    
+    def test_wal_mode(self):
+        """Test that the database runs in WAL mode"""
+        mode = self.storage._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+    
+    def test_update_and_delete_task(self):
+        """Test updating and deleting a task"""
+        self.storage.create_task(self.sample_task)
+        self.storage.update_task(self.sample_task.task_id, {"status": "completed", "tags": ["docs"]})
+        
+        updated = self.storage.get_task(self.sample_task.task_id)
+        self.assertEqual(updated.status, "completed")
+        self.assertEqual(self.storage.filter_tasks(tags="docs"), [updated])
+        self.assertEqual(self.storage.filter_tasks(tags="api"), [])
+        
+        self.assertTrue(self.storage.delete_task(self.sample_task.task_id))
+        self.assertFalse(self.storage.delete_task(self.sample_task.task_id))
+        self.assertIsNone(self.storage.get_task(self.sample_task.task_id))
+    
+    def test_search_and_filter(self):
+        """Test search and filter match TaskStorage semantics"""
+        self.storage.create_task(self.sample_task)
+        self.storage.create_task(Task(title="Other Task", priority="low"))
+        
+        self.assertEqual(len(self.storage.search_tasks("SAMPLE")), 1)
+        self.assertEqual(len(self.storage.search_tasks("backend")), 1)
+        self.assertEqual(len(self.storage.filter_tasks(priority="high", assigned_to="alice")), 1)
+        self.assertEqual(len(self.storage.filter_tasks(assigned_to=None)), 1)
+        self.assertEqual(len(self.storage.filter_tasks(tags=["api", "missing"])), 1)
+    
+    def test_search_non_ascii(self):
+        """Test that search folds non-ASCII case like TaskStorage"""
+        task = Task(title="Überprüfung der Straße", tags=["ÉQUIPE"])
+        self.storage.create_task(task)
+        reference = TaskStorage(os.path.join(self.temp_dir, "reference.json"))
+        reference.create_task(Task.from_dict(task.to_dict()))
+        
+        for query in ("über", "ÜBERPRÜFUNG", "straße", "équipe"):
+            self.assertEqual([t.task_id for t in self.storage.search_tasks(query)],
+                             [t.task_id for t in reference.search_tasks(query)], query)
+            self.assertEqual(len(self.storage.search_tasks(query)), 1, query)
+    
+    def test_statistics_and_persistence(self):
+        """Test statistics and reopening the database"""
+        overdue = Task(title="Late Task", due_date=datetime.now() - timedelta(days=1))
+        self.storage.create_task(self.sample_task)
+        self.storage.create_task(overdue)
+        self.storage.close()
+        
+        self.storage = SqliteTaskStorage(self.storage_file)
+        stats = self.storage.get_statistics()
+        self.assertEqual(stats["total_tasks"], 2)
+        self.assertEqual(stats["by_priority"], {"high": 1, "medium": 1})
+        self.assertEqual(stats["overdue_tasks"], 1)
+
+
 class TestAgentCollaborator(unittest.TestCase):
     """Test cases for AgentCollaborator class"""
     